@@ -3,7 +3,10 @@ __version__ = "0.3.1"
 import sys
 
 
-if "pytest" not in sys.modules:
+# Only set up the add-on when it is loaded by Anki, which imports `aqt` and creates
+# its main window beforehand. This allows importing the add-on's modules elsewhere
+# e.g. in tests and benchmarks.
+if getattr(sys.modules.get("aqt"), "mw", None) is not None:
     from .src.addon import AnkiMarker
     from .src.helpers import ConfigError, show_info
 
@@ -1,32 +1,338 @@
 from __future__ import annotations
 
 import functools
+import html
+import pathlib
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future
+from typing import TypeVar
 
 import anki
 import anki.hooks
 import aqt
 import aqt.gui_hooks
 import aqt.utils
+from anki.cards import Card
+from anki.collection import Collection, OpChanges
+from anki.errors import NotFoundError
+from anki.notes import Note
+from anki.scheduler.v3 import Scheduler as V3Scheduler
 from anki.template import TemplateRenderContext
 from aqt.browser.previewer import BrowserPreviewer
 from aqt.clayout import CardLayout
-from aqt.editor import EditorWebView
-from aqt.qt.qt6 import QMenu
+from aqt.editor import Editor, EditorWebView
+from aqt.main import AnkiQt
+from aqt.operations import CollectionOp, QueryOp
+from aqt.qt.qt6 import QAction, QMenu
 from aqt.reviewer import Reviewer
 from aqt.webview import WebContent
 
-from .config import Config
-from .helpers import Defaults, InvalidMarkup, Key, escape_quotes, show_info
-from .processor import Processor
+from .audit import AuditResult, audit_notes
+from .bulk import BulkResult, mark_notes, process_notes
+from .bundle import write_bundle
+from .cache import DiskCache, FieldCache
+from .core import Config, ParsedField, Processor, build_script
+from .dialogs import AuditDialog, BulkDialog, MarkTermsDialog, MetricsDialog
+from .helpers import (
+    ConfigError,
+    Defaults,
+    InvalidMarkup,
+    Key,
+    escape_quotes,
+    show_info,
+    show_tooltip,
+)
+from .metrics import Metrics
+from .prerender import find_filtered_fields, notetype_templates, prerender
+from .store import RenderStore
+from .watcher import FileWatcher
+
+
+# The results reported by bulk operations while they progress.
+R = TypeVar("R", BulkResult, AuditResult)
 
 
 class AnkiMarker:
     def __init__(self) -> None:
-        self._config = Config()
-        self._processor = Processor(markers=self._config.markers)
+        config = Config()
+        # The config and the `Processor` built from it, replaced together in a single
+        # assignment, so code running on any thread never pairs one config with
+        # another's processor. See `Config`.
+        self._current = (config, Processor(marker_set=config.marker_set))
+        # Parsed fields shared by the `marked` and `unmarked` filters.
+        self._field_cache = FieldCache(
+            capacity=self._config.render_cache_size, load=self._load
+        )
+        self._disk_cache = DiskCache(
+            path=Defaults.DISK_CACHE, capacity=self._config.disk_cache_size
+        )
+        self._metrics = Metrics(enabled=self._config.metrics)
+        # Fields rendered when their note was saved, see `Config.render_on_save`.
+        self._store = RenderStore(
+            fingerprint=self._config.marker_set.fingerprint,
+            capacity=Defaults.RENDER_STORE_SIZE,
+        )
+        # The current profile's stored fields, while they're read off the main thread.
+        self._store_loading: Future[RenderStore] | None = None
+        # The ids of notes saved since their fields were last stored.
+        self._saved_notes: set[int] = set()
+        # Set while notes are updated in bulk, see `AnkiMarker._update_in_bulk`.
+        self._updating_in_bulk = False
+        self._watcher = FileWatcher(
+            paths=[Defaults.MARKERS_JSON, Defaults.MARKERS_CSS_FILE]
+        )
+        # The digest of `bundle.css`, appended to its URL so web views can cache it
+        # for as long as it's unchanged.
+        self._css_digest: str | None = None
+        # The fingerprint of the markers `markers.js` was last generated from.
+        self._script_fingerprint: str | None = None
+        # Incremented whenever the review queue changes, cancelling any pre-rendering
+        # of the previous one.
+        self._prerender_generation = 0
+
+    @property
+    def _config(self) -> Config:
+        return self._current[0]
+
+    @property
+    def _processor(self) -> Processor:
+        return self._current[1]
+
+    @property
+    def bundle_css(self) -> str:
+        return f"{Defaults.BUNDLE_CSS}?v={self._css_digest}"
+
+    @property
+    def markers_js(self) -> str:
+        # The fingerprint changes with the markers, so web views never use a stale
+        # copy.
+        return f"{Defaults.MARKERS_JS}?v={self._script_fingerprint}"
+
+    @property
+    def store_path(self) -> pathlib.Path | None:
+        """Returns where the current profile's rendered fields are saved, if a
+        profile is open."""
+
+        if aqt.mw is None or aqt.mw.pm.name is None:
+            return None
+
+        return Defaults.RENDERED / f"{aqt.mw.pm.name}.json"
+
+    def write_bundle(self) -> None:
+        """Bundles `main.css` and `markers.css` into `bundle.css`, so web views load
+        a single, minified stylesheet."""
+
+        self._css_digest = write_bundle(
+            paths=[Defaults.MAIN_CSS_FILE, Defaults.MARKERS_CSS_FILE],
+            path=Defaults.BUNDLE_CSS_FILE,
+        )
+
+    def write_script(self) -> None:
+        """Generates `markers.js` from the current markers unless it's up to date."""
+
+        marker_set = self._config.marker_set
+
+        if self._script_fingerprint == marker_set.fingerprint:
+            return
+
+        Defaults.MARKERS_JS_FILE.write_text(
+            build_script(marker_set=marker_set), encoding="utf-8"
+        )
+
+        self._script_fingerprint = marker_set.fingerprint
+
+    def reload(self) -> None:
+        """Reloads `markers.json` and `markers.css` if either changed since the last
+        time they were checked."""
+
+        changed = self._watcher.poll()
+
+        if Defaults.MARKERS_JSON in changed:
+            self._reload_config()
+
+        if Defaults.MARKERS_CSS_FILE in changed:
+            self._reload_css()
+
+    def _reload_config(self) -> None:
+        try:
+            config = Config()
+        except ConfigError as error:
+            show_tooltip(f"{error} Keeping the previous configuration.")
+            return
+
+        # Hooks read `self._processor` once per call, and it's built from the new
+        # config before being swapped in, so they never use a partially loaded one.
+        self._current = (config, Processor(marker_set=config.marker_set))
+        self._prerender_generation += 1
+        self._metrics.enabled = config.metrics
+        self._store.reset(fingerprint=config.marker_set.fingerprint)
+        self._field_cache.reset(
+            fingerprint=config.marker_set.fingerprint,
+            capacity=config.render_cache_size,
+        )
+
+        # Entries of other markers are never returned, and are evicted over time.
+        if config.disk_cache_size != self._disk_cache.capacity:
+            self.save()
+            self._disk_cache.close()
+            self._disk_cache = DiskCache(
+                path=Defaults.DISK_CACHE, capacity=config.disk_cache_size
+            )
+
+        show_tooltip(f"Reloaded {Key.MARKERS_JSON}.")
+
+    def _render(
+        self,
+        processor: Processor,
+        field_text: str,
+        field_name: str,
+        context: TemplateRenderContext,
+    ) -> str:
+        """Returns the rendering of a field stored when its note was saved, otherwise
+        renders it."""
+
+        note_id = context.note().id
+
+        if self._config.render_on_save and note_id:
+
+            rendered = self._store.get(
+                note_id=note_id, field_name=field_name, field_text=field_text
+            )
+
+            if rendered is not None:
+                return rendered
+
+        return self._field_cache.parse(
+            processor=processor, field_text=field_text, field=(note_id, field_name)
+        ).render()
+
+    def _load(
+        self, processor: Processor, field_text: str
+    ) -> dict[str, str | InvalidMarkup]:
+        marker_set = processor.marker_set
+
+        if not marker_set.find_characters(string=field_text):
+            return {}
+
+        return self._disk_cache.get(
+            fingerprint=marker_set.fingerprint, string=field_text
+        )
+
+    def save(self, in_background: bool = False) -> None:
+        """Writes the fields processed or used since the last call to the disk cache,
+        in one transaction, optionally off the main thread."""
+
+        # Copied here, as fields keep being processed on the main thread.
+        entries = [
+            (fingerprint, parsed.string, dict(parsed.results))
+            for fingerprint, parsed in self._field_cache.take_unsaved()
+        ]
+
+        if not entries:
+            return
+
+        disk_cache = self._disk_cache
+
+        if in_background and aqt.mw is not None:
+            aqt.mw.taskman.run_in_background(
+                lambda: disk_cache.put(entries=entries), uses_collection=False
+            )
+        else:
+            disk_cache.put(entries=entries)
+
+    def _update_in_bulk(self, update: Callable[[], BulkResult]) -> BulkResult:
+        """Runs a bulk update of notes without storing their fields as each note is
+        saved, which would render every field a second time. Their stored renderings
+        are simply misses once their text changes."""
+
+        self._updating_in_bulk = True
+
+        try:
+            return update()
+        finally:
+            self._updating_in_bulk = False
+
+    def prerender(self) -> None:
+        """Renders the fields of the current and next few cards in the review queue
+        off the main thread, so showing them, or flipping the current one, is a cache
+        lookup. Cancels any pre-rendering of the previous queue."""
+
+        self._prerender_generation += 1
+        generation = self._prerender_generation
+
+        mw = aqt.mw
+        count = self._config.prerender_cards
+
+        if mw is None or mw.col is None or count <= 0:
+            return
+
+        if not isinstance(mw.col.sched, V3Scheduler):
+            return
+
+        processor = self._processor
+        fingerprint = processor.marker_set.fingerprint
+
+        # The collection is only read here, on the main thread, so the background task
+        # only ever touches strings.
+        fields: list[tuple[str, str]] = []
+
+        for queued_card in mw.col.sched.get_queued_cards(fetch_limit=count + 1).cards:
+
+            note = mw.col.get_note(queued_card.card.note_id)
+            notetype = note.note_type()
+
+            if notetype is None:
+                continue
+
+            templates = notetype_templates(notetype=notetype)
+
+            for filter_name, field_name in find_filtered_fields(templates=templates):
+
+                if field_name not in note:
+                    continue
+
+                if (fingerprint, note[field_name]) not in self._field_cache:
+                    fields.append((filter_name, note[field_name]))
+
+        if not fields:
+            return
+
+        def task() -> list[ParsedField]:
+            return prerender(
+                processor=processor,
+                fields=fields,
+                load=lambda field_text: self._load(
+                    processor=processor, field_text=field_text
+                ),
+                want_cancel=lambda: generation != self._prerender_generation,
+            )
+
+        def on_done(future: Future[list[ParsedField]]) -> None:
+            # Results of replaced markers would never be looked up.
+            if fingerprint != self._processor.marker_set.fingerprint:
+                return
+
+            for parsed in future.result():
+                self._field_cache.add(fingerprint=fingerprint, parsed=parsed)
+
+        mw.taskman.run_in_background(task, on_done, uses_collection=False)
+
+    def _reload_css(self) -> None:
+        self.write_bundle()
+
+        # The reviewer's page is only set once, so point its stylesheet at the new URL.
+        if aqt.mw is not None and aqt.mw.state == "review":
+            aqt.mw.reviewer.web.eval(
+                f"document.querySelectorAll('link[href^=\"{Defaults.BUNDLE_CSS}\"]')"
+                f".forEach((link) => {{ link.href = '{self.bundle_css}'; }});"
+            )
+
+        show_tooltip(f"Reloaded {Key.MARKERS_CSS}.")
 
     def setup(self) -> None:
-        """Registers hooks which append CSS files, field filters and a context-menu."""
+        """Registers hooks which append CSS files, field filters, a context-menu and
+        tools-menu actions, and a timer which reloads the configuration files when they
+        change."""
 
         if aqt.mw is None:
             return
@@ -42,7 +348,9 @@ class AnkiMarker:
         # > from aqt import mw
         # > mw.addonManager.setWebExports(__name__, r"web/.*(css|js)")
 
-        aqt.mw.addonManager.setWebExports(__name__, r".+\.css")
+        aqt.mw.addonManager.setWebExports(__name__, r".+\.(css|js)")
+
+        self.write_bundle()
 
         # Append CSS Stylesheets
 
@@ -57,14 +365,31 @@ class AnkiMarker:
             if not isinstance(context, (CardLayout, BrowserPreviewer, Reviewer)):
                 return
 
-            web_content.css.extend(
+            web_content.css.append(self.bundle_css)
+
+        aqt.gui_hooks.webview_will_set_content.append(hook__append_css)
+
+        def hook__append_preview(
+            web_content: WebContent, context: object | None
+        ) -> None:
+            """Appends marker CSS and the scripts previewing marked fields to the
+            editor."""
+
+            if not isinstance(context, Editor):
+                return
+
+            # Generated here rather than on start-up as building it imports Markdown.
+            self.write_script()
+
+            web_content.css.append(self.bundle_css)
+            web_content.js.extend(
                 [
-                    str(Defaults.MAIN_CSS),
-                    str(Defaults.MARKERS_CSS),
+                    self.markers_js,
+                    str(Defaults.PREVIEW_JS),
                 ]
             )
 
-        aqt.gui_hooks.webview_will_set_content.append(hook__append_css)
+        aqt.gui_hooks.webview_will_set_content.append(hook__append_preview)
 
         # Field Filters
 
@@ -80,10 +405,25 @@ class AnkiMarker:
             if filter_name != Key.MARKED:
                 return field_text
 
+            processor = self._processor
+
             try:
-                return self._processor.render(string=field_text)
-            except InvalidMarkup:
-                return f"{Defaults.NAME}: Field contains invalid markup."
+                return self._metrics.call(
+                    operation=Key.MARKED,
+                    field_name=field_name,
+                    size=len(field_text),
+                    function=lambda: self._render(
+                        processor=processor,
+                        field_text=field_text,
+                        field_name=field_name,
+                        context=context,
+                    ),
+                )
+            except InvalidMarkup as error:
+                return (
+                    f"{Defaults.NAME}: Field contains invalid markup. "
+                    f"{html.escape(str(error))}."
+                )
 
         def hook__unmark_field(
             field_text: str,
@@ -97,10 +437,24 @@ class AnkiMarker:
             if filter_name != Key.UNMARKED:
                 return field_text
 
+            processor = self._processor
+
             try:
-                return self._processor.unmark(string=field_text)
-            except InvalidMarkup:
-                return f"{Defaults.NAME}: Field contains invalid markup."
+                return self._metrics.call(
+                    operation=Key.UNMARKED,
+                    field_name=field_name,
+                    size=len(field_text),
+                    function=lambda: self._field_cache.parse(
+                        processor=processor,
+                        field_text=field_text,
+                        field=(context.note().id, field_name),
+                    ).unmark(),
+                )
+            except InvalidMarkup as error:
+                return (
+                    f"{Defaults.NAME}: Field contains invalid markup. "
+                    f"{html.escape(str(error))}."
+                )
 
         anki.hooks.field_filter.append(hook__render_field)
         anki.hooks.field_filter.append(hook__unmark_field)
@@ -111,6 +465,13 @@ class AnkiMarker:
             """Appends marker actions to the editor context-menu."""
 
             menu.addSeparator()
+            menu.addAction(
+                "Preview",
+                functools.partial(
+                    context_action__preview,
+                    editor=editor,
+                ),
+            )
             menu.addAction(
                 "Unmark",
                 functools.partial(
@@ -130,15 +491,47 @@ class AnkiMarker:
                     ),
                 )
 
+            submenu = menu.addMenu("Mark All")
+
+            if submenu is None:
+                return
+
+            for marker in self._config.markers:
+
+                submenu.addAction(
+                    marker.name,
+                    functools.partial(
+                        context_action__mark_all,
+                        editor=editor,
+                        markup=marker.markup,
+                    ),
+                )
+
         aqt.gui_hooks.editor_will_show_context_menu.append(hook__append_context_menu)
 
+        def editor_field_name(editor: EditorWebView) -> str:
+            """Returns the name of the field being edited, if any."""
+
+            note = editor.editor.note
+            index = editor.editor.currentField
+
+            if note is None or index is None:
+                return ""
+
+            return note.keys()[index]
+
         def context_action__mark(editor: EditorWebView, markup: str) -> None:
             """Marks the selected text within the editor."""
 
             string = editor.selectedText()
 
             try:
-                string = self._processor.mark(string=string, markup=markup)
+                string = self._metrics.call(
+                    operation=Key.MARK,
+                    field_name=editor_field_name(editor=editor),
+                    size=len(string),
+                    function=lambda: self._processor.mark(string=string, markup=markup),
+                )
             except InvalidMarkup:
                 show_info("Selection cannot contain line-breaks or HTML.")
                 return
@@ -149,13 +542,106 @@ class AnkiMarker:
             # Replaces the selected string with marked string.
             editor.eval(f"document.execCommand('inserttext', false, '{string}')")
 
+        def context_action__mark_all(editor: EditorWebView, markup: str) -> None:
+            """Marks every occurrence of the selected text within the fields of the note
+            being edited, as a single undo step. Notes not added yet have no undo
+            steps, so they're only changed in the editor."""
+
+            term = editor.selectedText()
+            note = editor.editor.note
+            processor = self._processor
+
+            if note is None or not term:
+                return
+
+            def on_success(results: list[tuple[str, str, str, int]]) -> None:
+                changed = [
+                    (name, field_text, marked)
+                    for (name, field_text, marked, count) in results
+                    if count
+                ]
+                count = sum(count for (_, _, _, count) in results)
+
+                if not count:
+                    show_tooltip("Found no occurrences which could be marked.")
+                    return
+
+                # The editor keeps writing to the note while marking runs, and those
+                # edits would otherwise be overwritten.
+                if editor.editor.note is not note or any(
+                    note[name] != field_text for (name, field_text, _) in changed
+                ):
+                    show_tooltip(
+                        "The note was edited while marking. Nothing was marked."
+                    )
+                    return
+
+                for name, _, marked in changed:
+                    note[name] = marked
+
+                message = f"Marked {count} occurrences in {len(changed)} fields."
+
+                def on_updated(changes: object = None) -> None:
+                    # Sets every field in one call to the editor.
+                    editor.editor.loadNoteKeepingFocus()
+                    show_tooltip(message)
+
+                # New notes are only saved once they're added.
+                if not note.id:
+                    on_updated()
+                    return
+
+                def update_note(col: Collection) -> OpChanges:
+                    undo_entry = col.add_custom_undo_entry(f"{Defaults.NAME}: Mark All")
+                    col.update_note(note)
+
+                    return col.merge_undo_entries(undo_entry)
+
+                CollectionOp(parent=editor.editor.widget, op=update_note).success(
+                    on_updated
+                ).run_in_background(initiator=editor.editor)
+
+            def on_failure(error: Exception) -> None:
+                if not isinstance(error, InvalidMarkup):
+                    raise error
+
+                show_info("Selection cannot contain line-breaks, HTML or markup.")
+
+            def mark_all() -> None:
+                # Read here, once the editor has saved any pending edits to the note.
+                fields = note.items()
+
+                # Doesn't use the collection, it's only run in the background so marking
+                # large notes doesn't block the editor.
+                QueryOp(
+                    parent=editor.editor.widget,
+                    op=lambda _: [
+                        (
+                            name,
+                            field_text,
+                            *processor.mark_all(
+                                string=field_text, term=term, markup=markup
+                            ),
+                        )
+                        for (name, field_text) in fields
+                    ],
+                    success=on_success,
+                ).failure(on_failure).run_in_background()
+
+            editor.editor.call_after_note_saved(mark_all)
+
         def context_action__unmark(editor: EditorWebView) -> None:
             """Unmarks the selected text within the editor."""
 
             string = editor.selectedText()
 
             try:
-                string = self._processor.unmark(string=string)
+                string = self._metrics.call(
+                    operation=Key.UNMARK,
+                    field_name=editor_field_name(editor=editor),
+                    size=len(string),
+                    function=lambda: self._processor.unmark(string=string),
+                )
             except InvalidMarkup:
                 show_info("Selection cannot contain line-breaks or HTML.")
                 return
@@ -165,3 +651,422 @@ class AnkiMarker:
 
             # Replaces the selected text with unmarked string.
             editor.eval(f"document.execCommand('inserttext', false, '{string}')")
+
+        def context_action__preview(editor: EditorWebView) -> None:
+            """Shows or hides a live preview of the marked field being edited."""
+
+            editor.eval("AnkiMarkerPreview.toggle()")
+
+        # Tools Menu
+
+        def tools_action__process_notes() -> None:
+            """Unmarks or renders the chosen fields of all notes matching a search."""
+
+            mw = aqt.mw
+
+            if mw is None or mw.col is None:
+                return
+
+            field_names = _field_names(col=mw.col)
+
+            dialog = BulkDialog(parent=mw, field_names=field_names)
+
+            if not dialog.exec():
+                return
+
+            # Read the dialog here as widgets cannot be accessed off the main thread.
+            search = dialog.search
+            field_names = dialog.field_names
+            mode = dialog.mode
+
+            if not field_names:
+                show_info("No fields were selected.")
+                return
+
+            on_progress = _progress_callback(
+                mw=mw,
+                label=lambda result: (
+                    f"Processed {result.processed} of {result.notes} notes..."
+                ),
+            )
+
+            def on_success(result: BulkResult) -> None:
+                skipped = ""
+
+                if result.invalid:
+                    skipped = (
+                        f"Skipped {result.invalid} fields containing invalid markup:"
+                    )
+
+                    for note_id, name, error in result.errors[:5]:
+                        skipped += f"\n\nNote {note_id}, field '{name}': {error}."
+
+                    if result.invalid > 5:
+                        skipped += "\n\n..."
+
+                show_info(_bulk_summary(result=result, skipped=skipped))
+
+            CollectionOp(
+                parent=mw,
+                op=lambda col: self._update_in_bulk(
+                    update=lambda: process_notes(
+                        col=col,
+                        processor=self._processor,
+                        search=search,
+                        field_names=field_names,
+                        mode=mode,
+                        on_progress=on_progress,
+                        want_cancel=mw.progress.want_cancel,
+                    )
+                ),
+            ).success(on_success).run_in_background()
+
+        action = QAction(f"{Defaults.NAME}: Process Notes...", aqt.mw)
+        action.triggered.connect(tools_action__process_notes)
+        aqt.mw.form.menuTools.addAction(action)
+
+        def tools_action__mark_terms() -> None:
+            """Marks every occurrence of a list of terms in the chosen fields of all
+            notes matching a search."""
+
+            mw = aqt.mw
+
+            if mw is None or mw.col is None:
+                return
+
+            field_names = _field_names(col=mw.col)
+
+            dialog = MarkTermsDialog(
+                parent=mw, field_names=field_names, markers=self._config.markers
+            )
+
+            if not dialog.exec():
+                return
+
+            # Read the dialog here as widgets cannot be accessed off the main thread.
+            search = dialog.search
+            field_names = dialog.field_names
+            markup = dialog.markup
+            terms = self._processor.compile_terms(
+                terms=dialog.terms, whole_words=dialog.whole_words
+            )
+            skipped = len(set(dialog.terms)) - len(terms)
+
+            if not field_names:
+                show_info("No fields were selected.")
+                return
+
+            if not terms:
+                show_info("No terms that can be marked were entered.")
+                return
+
+            on_progress = _progress_callback(
+                mw=mw,
+                label=lambda result: (
+                    f"Marked {result.processed} of {result.notes} notes..."
+                ),
+            )
+
+            def on_success(result: BulkResult) -> None:
+                message = ""
+
+                if skipped:
+                    message = (
+                        f"Skipped {skipped} terms containing line-breaks, HTML or "
+                        "markup characters."
+                    )
+
+                show_info(_bulk_summary(result=result, skipped=message))
+
+            CollectionOp(
+                parent=mw,
+                op=lambda col: self._update_in_bulk(
+                    update=lambda: mark_notes(
+                        col=col,
+                        processor=self._processor,
+                        search=search,
+                        field_names=field_names,
+                        terms=terms,
+                        markup=markup,
+                        on_progress=on_progress,
+                        want_cancel=mw.progress.want_cancel,
+                    )
+                ),
+            ).success(on_success).run_in_background()
+
+        action = QAction(f"{Defaults.NAME}: Mark Terms...", aqt.mw)
+        action.triggered.connect(tools_action__mark_terms)
+        aqt.mw.form.menuTools.addAction(action)
+
+        def tools_action__audit_notes() -> None:
+            """Checks the fields of all notes passed to the `marked` or `unmarked`
+            filters for invalid markup, without changing them."""
+
+            mw = aqt.mw
+
+            if mw is None or mw.col is None:
+                return
+
+            on_progress = _progress_callback(
+                mw=mw,
+                label=lambda result: (
+                    f"Checked {result.processed} of {result.notes} notes, found "
+                    f"{len(result.issues)} fields containing invalid markup..."
+                ),
+            )
+
+            def on_success(result: AuditResult) -> None:
+                if not result.issues and not result.cancelled:
+                    show_info(
+                        f"Checked {result.fields} fields of {result.notes} notes in "
+                        f"{result.seconds:.1f}s. No invalid markup was found."
+                    )
+                    return
+
+                AuditDialog(parent=mw, result=result).exec()
+
+            QueryOp(
+                parent=mw,
+                op=lambda col: audit_notes(
+                    col=col,
+                    processor=self._processor,
+                    processes=Defaults.AUDIT_PROCESSES,
+                    on_progress=on_progress,
+                    want_cancel=mw.progress.want_cancel,
+                ),
+                success=on_success,
+            ).with_progress(label="Checking notes...").run_in_background()
+
+        action = QAction(f"{Defaults.NAME}: Audit Notes...", aqt.mw)
+        action.triggered.connect(tools_action__audit_notes)
+        aqt.mw.form.menuTools.addAction(action)
+
+        def tools_action__show_metrics() -> None:
+            """Shows the recorded metrics."""
+
+            MetricsDialog(
+                parent=aqt.mw,
+                metrics=self._metrics,
+                processor_stats=self._processor.stats,
+            ).exec()
+
+        action = QAction(f"{Defaults.NAME}: Metrics...", aqt.mw)
+        action.triggered.connect(tools_action__show_metrics)
+        aqt.mw.form.menuTools.addAction(action)
+
+        # Metrics
+
+        def hook__dump_metrics() -> None:
+            """Saves the recorded metrics when the profile closes."""
+
+            if self._metrics.enabled:
+                self._metrics.dump(path=Defaults.METRICS_JSON)
+
+        aqt.gui_hooks.profile_will_close.append(hook__dump_metrics)
+
+        # Render on Save
+
+        def hook__note_saved(note: Note) -> None:
+            """Keeps the id of a note being saved, so its fields are stored once the
+            operation saving it is done. Called on the collection's thread, and also
+            as the editor checks a note's fields, so nothing is rendered here."""
+
+            # New notes only have an id once they're added.
+            if not self._config.render_on_save or not note.id:
+                return
+
+            if self._updating_in_bulk:
+                return
+
+            self._saved_notes.add(note.id)
+
+        anki.hooks.note_will_flush.append(hook__note_saved)
+
+        def hook__render_saved_notes(
+            changes: OpChanges, handler: object | None
+        ) -> None:
+            """Renders and stores the fields of the notes saved by an operation, on
+            the main thread. Fields whose text hasn't changed aren't rendered again."""
+
+            mw = aqt.mw
+
+            if not changes.note_text or mw is None or mw.col is None:
+                return
+
+            note_ids, self._saved_notes = self._saved_notes, set()
+
+            for note_id in note_ids:
+
+                try:
+                    note = mw.col.get_note(note_id)
+                except NotFoundError:
+                    continue
+
+                self._store.update(
+                    processor=self._processor, note_id=note_id, fields=note.items()
+                )
+
+        aqt.gui_hooks.operation_did_execute.append(hook__render_saved_notes)
+
+        def hook__render_added_note(note: Note) -> None:
+            """Renders and stores the fields of a note once it's added."""
+
+            if self._config.render_on_save and note.id:
+                self._store.update(
+                    processor=self._processor, note_id=note.id, fields=note.items()
+                )
+
+        aqt.gui_hooks.add_cards_did_add_note.append(hook__render_added_note)
+
+        def hook__discard_notes(col: Collection, ids: Sequence[int]) -> None:
+            """Removes the stored fields of deleted notes."""
+
+            self._store.discard(note_ids=ids)
+
+        anki.hooks.notes_will_be_deleted.append(hook__discard_notes)
+
+        def hook__load_store() -> None:
+            """Loads the fields stored for the profile being opened off the main
+            thread. Fields stored in the meantime are kept."""
+
+            path = self.store_path
+
+            if aqt.mw is None or not self._config.render_on_save or path is None:
+                return
+
+            fingerprint = self._config.marker_set.fingerprint
+
+            def on_done(future: Future[RenderStore]) -> None:
+                # The profile was closed before its fields were loaded.
+                if future is not self._store_loading:
+                    return
+
+                self._store_loading = None
+
+                loaded = future.result()
+                loaded.merge(store=self._store)
+                self._store = loaded
+
+            self._store_loading = aqt.mw.taskman.run_in_background(
+                lambda: RenderStore.load(
+                    path=path,
+                    fingerprint=fingerprint,
+                    capacity=Defaults.RENDER_STORE_SIZE,
+                ),
+                on_done,
+                uses_collection=False,
+            )
+
+        aqt.gui_hooks.profile_did_open.append(hook__load_store)
+
+        def hook__dump_store() -> None:
+            """Saves the fields stored for the profile being closed."""
+
+            path = self.store_path
+
+            loading, self._store_loading = self._store_loading, None
+            self._saved_notes.clear()
+
+            # Otherwise only the fields stored since opening the profile are saved.
+            if loading is not None:
+                loaded = loading.result()
+                loaded.merge(store=self._store)
+                self._store = loaded
+
+            if self._config.render_on_save and path is not None:
+                self._store.dump(path=path)
+
+            self._store = RenderStore(
+                fingerprint=self._config.marker_set.fingerprint,
+                capacity=Defaults.RENDER_STORE_SIZE,
+            )
+
+        aqt.gui_hooks.profile_will_close.append(hook__dump_store)
+
+        # Disk Cache
+
+        def hook__save_disk_cache() -> None:
+            """Writes the fields processed during the profile to the disk cache."""
+
+            self.save()
+
+        aqt.gui_hooks.profile_will_close.append(hook__save_disk_cache)
+
+        # Writing in batches, off the main thread, keeps reviews free of disk writes,
+        # while losing at most one interval's worth of fields if Anki crashes.
+        aqt.mw.progress.timer(
+            ms=int(Defaults.DISK_CACHE_FLUSH_INTERVAL * 1000),
+            func=lambda: self.save(in_background=True),
+            repeat=True,
+            parent=aqt.mw,
+        )
+
+        # Pre-rendering
+
+        def hook__prerender(card: Card) -> None:
+            """Pre-renders the upcoming cards whenever a question is shown."""
+
+            self.prerender()
+
+        aqt.gui_hooks.reviewer_did_show_question.append(hook__prerender)
+
+        def hook__cancel_prerender() -> None:
+            """Stops pre-rendering once reviewing ends."""
+
+            self._prerender_generation += 1
+
+        aqt.gui_hooks.reviewer_will_end.append(hook__cancel_prerender)
+
+        # Reloading
+
+        if self._config.reload_interval > 0:
+            aqt.mw.progress.timer(
+                ms=int(self._config.reload_interval * 1000),
+                func=self.reload,
+                repeat=True,
+                parent=aqt.mw,
+            )
+
+
+def _field_names(col: Collection) -> list[str]:
+    """Returns the names of the fields of every notetype, sorted."""
+
+    return sorted(
+        {field["name"] for notetype in col.models.all() for field in notetype["flds"]}
+    )
+
+
+def _progress_callback(mw: AnkiQt, label: Callable[[R], str]) -> Callable[[R], None]:
+    """Returns an `on_progress` callback for `process_notes`, `mark_notes` or
+    `audit_notes`, updating the progress window with a label built from each result.
+    The callbacks are called off the main thread, where progress cannot be updated,
+    so the updates are run on the main thread instead."""
+
+    def on_progress(result: R) -> None:
+        text = label(result)
+        value = result.processed
+        maximum = result.notes
+
+        mw.taskman.run_on_main(
+            lambda: mw.progress.update(label=text, value=value, max=maximum)
+        )
+
+    return on_progress
+
+
+def _bulk_summary(result: BulkResult, skipped: str = "") -> str:
+    """Returns the message shown once notes were updated in bulk, followed by what
+    was skipped, if anything."""
+
+    message = (
+        f"Updated {result.updated} of {result.notes} notes in "
+        f"{result.seconds:.1f}s ({result.notes_per_second:.0f} notes/s)."
+    )
+
+    if skipped:
+        message += f" {skipped}"
+
+    if result.cancelled:
+        message += " Cancelled before all notes were processed."
+
+    return message
@@ -0,0 +1,94 @@
+/**
+ * AnkiMarker Preview
+ *
+ * Shows the field being edited rendered with `AnkiMarker.render`, defined in
+ * [addon-dir]/user_files/markers.js, in a panel at the bottom of the editor.
+ * The panel updates as the field is edited, without calling back into Anki.
+ */
+
+"use strict";
+
+var AnkiMarkerPreview = (function () {
+    const ID = "anki-marker-preview";
+
+    let field = null;
+
+    // Returns the editable field an event came from, looking into shadow roots.
+    function findField(event) {
+        const isField = (node) =>
+            node instanceof HTMLElement && node.isContentEditable;
+
+        return event.composedPath().find(isField) || null;
+    }
+
+    function update() {
+        const panel = document.getElementById(ID);
+
+        if (panel === null || field === null) {
+            return;
+        }
+
+        try {
+            panel.innerHTML = AnkiMarker.render(field.innerHTML);
+        } catch (error) {
+            if (!(error instanceof AnkiMarker.InvalidMarkup)) {
+                throw error;
+            }
+
+            panel.textContent =
+                "AnkiMarker: Field contains invalid markup. " +
+                `${error.message}.`;
+        }
+    }
+
+    function onEdit(event) {
+        const target = findField(event);
+
+        if (target !== null) {
+            field = target;
+            update();
+        }
+    }
+
+    function show() {
+        const panel = document.createElement("div");
+
+        panel.id = ID;
+        Object.assign(panel.style, {
+            position: "fixed",
+            left: "0",
+            right: "0",
+            bottom: "0",
+            maxHeight: "33vh",
+            overflow: "auto",
+            padding: "8px",
+            borderTop: "1px solid var(--border, #888)",
+            background: "var(--canvas, inherit)",
+            zIndex: "100",
+        });
+        panel.textContent = "AnkiMarker: Click a field to preview it.";
+
+        document.body.appendChild(panel);
+        document.addEventListener("input", onEdit);
+        document.addEventListener("focusin", onEdit);
+
+        update();
+    }
+
+    function hide() {
+        document.getElementById(ID).remove();
+        document.removeEventListener("input", onEdit);
+        document.removeEventListener("focusin", onEdit);
+    }
+
+    // Shows the panel if it's hidden, otherwise hides it.
+    function toggle() {
+        if (document.getElementById(ID) === null) {
+            show();
+        } else {
+            hide();
+        }
+    }
+
+    return { toggle };
+})();
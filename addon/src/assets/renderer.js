@@ -0,0 +1,159 @@
+/**
+ * AnkiMarker Renderer
+ *
+ * Renders markup into HTML exactly as the add-on does in Python, so that
+ * marked text can be previewed in web views without a round-trip to Anki.
+ * This file only defines `createAnkiMarker`. The add-on appends a call to it
+ * with the active markers to build [addon-dir]/user_files/markers.js.
+ */
+
+"use strict";
+
+function createAnkiMarker(config) {
+    const html = new RegExp(config.html, "su");
+
+    const markers = config.markers.map((marker) => ({
+        name: marker.name,
+        length: marker.markup.length,
+        pattern: new RegExp(marker.pattern, "gu"),
+        tagOpen: marker.tagOpen,
+        tagClose: marker.tagClose,
+    }));
+
+    class InvalidMarkup extends Error {
+        constructor(reason, marker, start, end) {
+            super(
+                `Invalid markup for '${marker}' at ${start}-${end}: ${reason}`
+            );
+            this.name = "InvalidMarkup";
+            this.reason = reason;
+            this.marker = marker;
+            this.start = start;
+            this.end = end;
+        }
+    }
+
+    // Returns why the contents of a markup are invalid, if they are.
+    function validate(contents) {
+        if (contents.includes("\n") || contents.includes("\r")) {
+            return config.reasons.linebreak;
+        }
+
+        if (contents.includes("<") && html.test(contents)) {
+            return config.reasons.html;
+        }
+
+        return null;
+    }
+
+    // Maps an offset in the string returned by the last of `passes` to the
+    // string given to the first. An offset within a replaced markup maps to the
+    // start of the markup, or its end if `end` is true.
+    function mapOffset(passes, offset, end) {
+        for (let index = passes.length - 1; index >= 0; index--) {
+            const edits = passes[index];
+
+            // The last edit starting before the offset, or at it unless `end`
+            // is true, as an end offset is exclusive.
+            let low = 0;
+            let high = edits.length;
+
+            while (low < high) {
+                const middle = (low + high) >> 1;
+
+                const start = edits[middle][0];
+
+                if (end ? start < offset : start <= offset) {
+                    low = middle + 1;
+                } else {
+                    high = middle;
+                }
+            }
+
+            if (low === 0) {
+                continue;
+            }
+
+            const [start, stop, givenStart, givenStop] = edits[low - 1];
+
+            if (offset < stop) {
+                offset = end ? givenStop : givenStart;
+            } else {
+                offset += givenStop - stop;
+            }
+        }
+
+        return offset;
+    }
+
+    // Python counts characters by code point rather than UTF-16 code unit.
+    function codePoints(string, offset) {
+        return Array.from(string.slice(0, offset)).length;
+    }
+
+    // Substitutes each marker's pattern in turn, keeping track of where the
+    // substitutions move the text so that invalid markup can be located.
+    function render(string) {
+        const given = string;
+        const passes = [];
+
+        for (const marker of markers) {
+            const edits = [];
+            const parts = [];
+            let position = 0;
+            let length = 0;
+
+            for (const match of string.matchAll(marker.pattern)) {
+                const start = match.index;
+                const end = start + match[0].length;
+                const contents = match.groups.contents;
+
+                const reason = validate(contents);
+
+                if (reason !== null) {
+                    throw new InvalidMarkup(
+                        reason,
+                        marker.name,
+                        codePoints(given, mapOffset(passes, start, false)),
+                        codePoints(given, mapOffset(passes, end, true))
+                    );
+                }
+
+                parts.push(
+                    string.slice(position, start),
+                    marker.tagOpen,
+                    contents,
+                    marker.tagClose
+                );
+
+                length += start - position;
+                edits.push([
+                    length,
+                    length + marker.tagOpen.length,
+                    start,
+                    start + marker.length,
+                ]);
+
+                length += marker.tagOpen.length + contents.length;
+                edits.push([
+                    length,
+                    length + marker.tagClose.length,
+                    end - marker.length,
+                    end,
+                ]);
+
+                length += marker.tagClose.length;
+                position = end;
+            }
+
+            parts.push(string.slice(position));
+
+            string = parts.join("");
+            passes.push(edits);
+        }
+
+        return string;
+    }
+
+    return { render, InvalidMarkup };
+}
@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import concurrent.futures
+import json
+import multiprocessing
+import pathlib
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+
+from anki.collection import Collection
+
+from .core import MarkerSet, Processor
+from .core.processor import _initialize_worker, _process_chunk, _process_worker_chunk
+from .helpers import Defaults, InvalidMarkup, Key
+from .prerender import find_filtered_fields, notetype_templates
+
+
+# A field to check, as its note id, field name, filter and text.
+AuditField = tuple[int, str, str, str]
+# The index of a field within its chunk and its error.
+Error = tuple[int, InvalidMarkup]
+# The name of the `Processor` method checking a group of fields within a chunk, the
+# indices of the fields and their text.
+Group = tuple[str, list[int], list[str]]
+
+# The name of the `Processor` method each filter processes a field with.
+_FILTER_METHODS = {
+    Key.MARKED: Processor.render.__name__,
+    Key.UNMARKED: Processor.unmark.__name__,
+}
+
+
+@dataclass
+class AuditIssue:
+    """A class used to report a field containing invalid markup."""
+
+    note_id: int
+    field_name: str
+    # The filter the field is passed to, either `Key.MARKED` or `Key.UNMARKED`.
+    filter_name: str
+    error: InvalidMarkup
+    # The invalid markup, shortened to `Defaults.AUDIT_EXCERPT_SIZE` characters.
+    excerpt: str = ""
+
+
+@dataclass
+class AuditResult:
+    """A class used to report the outcome of auditing notes for invalid markup."""
+
+    # The number of notes matching the search.
+    notes: int = 0
+    # The number of notes audited before finishing or being cancelled.
+    processed: int = 0
+    # The number of fields checked, i.e. those passed to the `marked` or `unmarked`
+    # filters and containing markup characters.
+    fields: int = 0
+    issues: list[AuditIssue] = field(default_factory=list)
+    cancelled: bool = False
+    seconds: float = 0.0
+
+    @property
+    def notes_per_second(self) -> float:
+        return self.processed / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "notes": self.notes,
+            "processed": self.processed,
+            "fields": self.fields,
+            "cancelled": self.cancelled,
+            "seconds": self.seconds,
+            "issues": [
+                {
+                    "note": issue.note_id,
+                    "field": issue.field_name,
+                    "filter": issue.filter_name,
+                    "marker": issue.error.marker,
+                    "start": issue.error.start,
+                    "end": issue.error.end,
+                    "reason": issue.error.reason,
+                    "excerpt": issue.excerpt,
+                }
+                for issue in self.issues
+            ],
+        }
+
+    def dump(self, path: pathlib.Path) -> None:
+        """Writes the result to a JSON file."""
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+
+def audit_notes(
+    col: Collection,
+    processor: Processor,
+    search: str = "",
+    processes: int = 0,
+    chunk_size: int = Defaults.BULK_CHUNK_SIZE,
+    on_progress: Callable[[AuditResult], None] | None = None,
+    want_cancel: Callable[[], bool] | None = None,
+) -> AuditResult:
+    """Finds the fields of all notes matching a search which contain invalid markup,
+    leaving the notes untouched.
+
+    Only the fields passed as-is to the `marked` or `unmarked` filters by their note
+    type's templates are checked, the way the filters would process them. Notes are
+    loaded in chunks of `chunk_size`, and only a few chunks are held at once, so
+    memory use stays flat regardless of the size of the collection. Meant to be run
+    as the `op` of an `aqt.operations.QueryOp`, i.e. off the main thread.
+
+    Arguments:
+        col: The collection containing the notes.
+        processor: The `Processor` used to check the fields.
+        search: A search query selecting the notes to audit.
+        processes: The number of worker processes checking chunks in parallel. Zero
+            checks them in this process.
+        chunk_size: The number of notes loaded and checked at once.
+        on_progress: Called after every chunk with the current result.
+        want_cancel: Called before every chunk. Stops auditing when it returns
+            `True`, keeping the issues found so far.
+    """
+
+    note_ids = col.find_notes(search)
+
+    result = AuditResult(notes=len(note_ids))
+    start = time.perf_counter()
+
+    def collect(notes: int, fields: list[AuditField], errors: list[Error]) -> None:
+        for index, error in errors:
+
+            note_id, field_name, filter_name, field_text = fields[index]
+
+            result.issues.append(
+                AuditIssue(
+                    note_id=note_id,
+                    field_name=field_name,
+                    filter_name=filter_name,
+                    error=error,
+                    excerpt=excerpt(string=field_text, error=error),
+                )
+            )
+
+        result.processed += notes
+        result.fields += len(fields)
+        result.seconds = time.perf_counter() - start
+
+        if on_progress is not None:
+            on_progress(result)
+
+    chunks = _iter_chunks(
+        col=col,
+        note_ids=note_ids,
+        marker_set=processor.marker_set,
+        chunk_size=chunk_size,
+    )
+
+    if processes <= 0:
+
+        for notes, fields in chunks:
+
+            if want_cancel is not None and want_cancel():
+                result.cancelled = True
+                break
+
+            collect(notes, fields, _check_fields(processor=processor, fields=fields))
+
+    else:
+
+        # Spawned rather than forked, as forking a process running Qt's threads isn't
+        # safe.
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_initialize_worker,
+            initargs=(processor.marker_set,),
+        ) as executor:
+
+            pending: deque[
+                tuple[
+                    int,
+                    list[AuditField],
+                    list[
+                        tuple[
+                            Group,
+                            concurrent.futures.Future[list[str | InvalidMarkup]] | None,
+                        ]
+                    ],
+                ]
+            ] = deque()
+
+            def check(
+                futures: list[
+                    tuple[
+                        Group,
+                        concurrent.futures.Future[list[str | InvalidMarkup]] | None,
+                    ]
+                ],
+            ) -> list[Error]:
+                errors: list[Error] = []
+
+                for (method, indices, strings), future in futures:
+
+                    results = None
+
+                    # Worker processes can fail to start, e.g. in some builds of Anki,
+                    # in which case the chunks are checked in this process instead.
+                    if future is not None:
+                        try:
+                            results = future.result()
+                        except BrokenProcessPool:
+                            pass
+
+                    if results is None:
+                        results = _process_chunk(
+                            processor=processor, method=method, strings=strings
+                        )
+
+                    errors.extend(_collect_errors(indices=indices, results=results))
+
+                return sorted(errors, key=lambda error: error[0])
+
+            for notes, fields in chunks:
+
+                if want_cancel is not None and want_cancel():
+                    result.cancelled = True
+                    break
+
+                futures = []
+
+                for group in _group_fields(fields):
+
+                    method, _, strings = group
+
+                    try:
+                        future = executor.submit(_process_worker_chunk, method, strings)
+                    except BrokenProcessPool:
+                        future = None
+
+                    futures.append((group, future))
+
+                pending.append((notes, fields, futures))
+
+                # Keeping two chunks per process queued means workers never wait for
+                # the collection, while bounding how many chunks are held at once.
+                while len(pending) > processes * 2:
+                    notes, fields, futures = pending.popleft()
+                    collect(notes, fields, check(futures))
+
+            for notes, fields, futures in pending:
+
+                if result.cancelled and all(
+                    future is None or future.cancel() for _, future in futures
+                ):
+                    continue
+
+                collect(notes, fields, check(futures))
+
+    result.seconds = time.perf_counter() - start
+
+    return result
+
+
+def excerpt(string: str, error: InvalidMarkup) -> str:
+    """Returns the part of a string an `InvalidMarkup` points to, shortened to
+    `Defaults.AUDIT_EXCERPT_SIZE` characters."""
+
+    if error.start is None or error.end is None:
+        return ""
+
+    text = string[error.start : error.end]
+
+    if len(text) > Defaults.AUDIT_EXCERPT_SIZE:
+        text = text[: Defaults.AUDIT_EXCERPT_SIZE - 1] + "…"
+
+    return text
+
+
+def _iter_chunks(
+    col: Collection, note_ids: list[int], marker_set: MarkerSet, chunk_size: int
+) -> Iterator[tuple[int, list[AuditField]]]:
+    """Yields the number of notes in each chunk of notes and their fields to check."""
+
+    filtered = {
+        notetype["id"]: find_filtered_fields(templates=notetype_templates(notetype))
+        for notetype in col.models.all()
+    }
+
+    for index in range(0, len(note_ids), chunk_size):
+
+        chunk = note_ids[index : index + chunk_size]
+        fields: list[AuditField] = []
+
+        for note_id in chunk:
+
+            note = col.get_note(note_id)
+
+            for filter_name, field_name in sorted(filtered.get(note.mid, ())):
+
+                # Fields without markup characters are returned as-is.
+                if field_name in note and marker_set.find_characters(
+                    string=note[field_name]
+                ):
+                    fields.append((note.id, field_name, filter_name, note[field_name]))
+
+        yield (len(chunk), fields)
+
+
+def _group_fields(fields: list[AuditField]) -> list[Group]:
+    """Groups the fields of a chunk by the `Processor` method their filter checks
+    them with."""
+
+    groups: dict[str, tuple[list[int], list[str]]] = {}
+
+    for index, (_, _, filter_name, field_text) in enumerate(fields):
+
+        indices, strings = groups.setdefault(_FILTER_METHODS[filter_name], ([], []))
+        indices.append(index)
+        strings.append(field_text)
+
+    return [(method, indices, strings) for method, (indices, strings) in groups.items()]
+
+
+def _collect_errors(
+    indices: list[int], results: list[str | InvalidMarkup]
+) -> list[Error]:
+    return [
+        (index, result)
+        for index, result in zip(indices, results)
+        if isinstance(result, InvalidMarkup)
+    ]
+
+
+def _check_fields(processor: Processor, fields: list[AuditField]) -> list[Error]:
+    errors: list[Error] = []
+
+    for method, indices, strings in _group_fields(fields):
+
+        results = _process_chunk(processor=processor, method=method, strings=strings)
+        errors.extend(_collect_errors(indices=indices, results=results))
+
+    return sorted(errors, key=lambda error: error[0])
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass, field
+
+from anki.collection import Collection, OpChanges
+from anki.notes import Note
+
+from .core import Processor, TermMatcher
+from .helpers import Defaults, InvalidMarkup, Key
+
+
+@dataclass
+class BulkResult:
+    """A class used to report the outcome of processing notes in bulk."""
+
+    # The number of notes matching the search.
+    notes: int = 0
+    # The number of notes processed before finishing or being cancelled.
+    processed: int = 0
+    # The number of notes whose fields changed and were written back.
+    updated: int = 0
+    # The number of fields left untouched as they contain invalid markup.
+    invalid: int = 0
+    # The note id, field name and error of every field containing invalid markup.
+    errors: list[tuple[int, str, InvalidMarkup]] = field(default_factory=list)
+    cancelled: bool = False
+    seconds: float = 0.0
+    # Allows passing the result straight to an `aqt.operations.CollectionOp`.
+    changes: OpChanges = field(default_factory=OpChanges)
+
+    @property
+    def notes_per_second(self) -> float:
+        return self.processed / self.seconds if self.seconds else 0.0
+
+
+def process_notes(
+    col: Collection,
+    processor: Processor,
+    search: str,
+    field_names: Iterable[str],
+    mode: str,
+    chunk_size: int = Defaults.BULK_CHUNK_SIZE,
+    on_progress: Callable[[BulkResult], None] | None = None,
+    want_cancel: Callable[[], bool] | None = None,
+) -> BulkResult:
+    """Unmarks or renders the given fields of all notes matching a search, writing the
+    results back into the notes.
+
+    Notes are loaded, processed and saved in chunks of `chunk_size` so memory use
+    stays flat regardless of the size of the collection. All the writes are merged
+    into a single undo entry. Meant to be run as the `op` of an `aqt.operations.
+    CollectionOp`, i.e. off the main thread.
+
+    Arguments:
+        col: The collection containing the notes.
+        processor: The `Processor` used to process the fields.
+        search: A search query selecting the notes to process.
+        field_names: The names of the fields to process. Notes without a field are
+            skipped over for that field.
+        mode: Either `Key.MARKED` to render the fields into HTML or `Key.UNMARKED` to
+            strip them of their markup.
+        chunk_size: The number of notes loaded and saved at once.
+        on_progress: Called after every chunk with the current result.
+        want_cancel: Called before every chunk. Stops processing when it returns
+            `True`. Chunks already saved are kept.
+    """
+
+    if mode == Key.MARKED:
+        process_batch = processor.render_batch
+        label = "Render Markup"
+    elif mode == Key.UNMARKED:
+        process_batch = processor.unmark_batch
+        label = "Unmark Markup"
+    else:
+        raise ValueError(f"Unknown mode: '{mode}'.")
+
+    return _update_notes(
+        col=col,
+        search=search,
+        field_names=field_names,
+        process_batch=process_batch,
+        label=label,
+        chunk_size=chunk_size,
+        on_progress=on_progress,
+        want_cancel=want_cancel,
+    )
+
+
+def mark_notes(
+    col: Collection,
+    processor: Processor,
+    search: str,
+    field_names: Iterable[str],
+    terms: TermMatcher,
+    markup: str,
+    chunk_size: int = Defaults.BULK_CHUNK_SIZE,
+    on_progress: Callable[[BulkResult], None] | None = None,
+    want_cancel: Callable[[], bool] | None = None,
+) -> BulkResult:
+    """Surrounds every occurrence of a list of terms in the given fields of all notes
+    matching a search with a markup, writing the results back into the notes. See
+    `Processor.mark_terms` for which occurrences are marked.
+
+    Chunking, undo and cancelling work as in `process_notes`.
+
+    Arguments:
+        col: The collection containing the notes.
+        processor: The `Processor` used to mark the fields.
+        search: A search query selecting the notes to mark.
+        field_names: The names of the fields to mark. Notes without a field are
+            skipped over for that field.
+        terms: The terms to mark. See `Processor.compile_terms`.
+        markup: The markup to surround the terms with.
+        chunk_size: The number of notes loaded and saved at once.
+        on_progress: Called after every chunk with the current result.
+        want_cancel: Called before every chunk. Stops marking when it returns `True`.
+            Chunks already saved are kept.
+    """
+
+    def mark_batch(strings: Iterable[str]) -> list[str]:
+        return [
+            processor.mark_terms(string=string, terms=terms, markup=markup)[0]
+            for string in strings
+        ]
+
+    return _update_notes(
+        col=col,
+        search=search,
+        field_names=field_names,
+        process_batch=mark_batch,
+        label="Mark Terms",
+        chunk_size=chunk_size,
+        on_progress=on_progress,
+        want_cancel=want_cancel,
+    )
+
+
+def _update_notes(
+    col: Collection,
+    search: str,
+    field_names: Iterable[str],
+    process_batch: Callable[..., Sequence[str | InvalidMarkup]],
+    label: str,
+    chunk_size: int,
+    on_progress: Callable[[BulkResult], None] | None,
+    want_cancel: Callable[[], bool] | None,
+) -> BulkResult:
+    """Passes the given fields of all notes matching a search through `process_batch`
+    chunk by chunk, writing the fields that changed back into the notes under a single
+    undo entry named after `label`."""
+
+    field_names = list(field_names)
+    note_ids = col.find_notes(search)
+
+    result = BulkResult(notes=len(note_ids))
+    start = time.perf_counter()
+
+    undo_entry = col.add_custom_undo_entry(f"{Defaults.NAME}: {label}")
+
+    for index in range(0, len(note_ids), chunk_size):
+
+        if want_cancel is not None and want_cancel():
+            result.cancelled = True
+            break
+
+        notes = [
+            col.get_note(note_id) for note_id in note_ids[index : index + chunk_size]
+        ]
+
+        fields: list[tuple[Note, str]] = [
+            (note, name) for note in notes for name in field_names if name in note
+        ]
+
+        processed = process_batch(strings=(note[name] for (note, name) in fields))
+
+        changed: dict[int, Note] = {}
+
+        for (note, name), string in zip(fields, processed):
+
+            if isinstance(string, InvalidMarkup):
+                result.invalid += 1
+                result.errors.append((note.id, name, string))
+                continue
+
+            if string != note[name]:
+                note[name] = string
+                changed[note.id] = note
+
+        if changed:
+            col.update_notes(list(changed.values()))
+            col.merge_undo_entries(undo_entry)
+
+        result.processed += len(notes)
+        result.updated += len(changed)
+        result.seconds = time.perf_counter() - start
+
+        if on_progress is not None:
+            on_progress(result)
+
+    result.seconds = time.perf_counter() - start
+
+    result.changes = col.merge_undo_entries(undo_entry)
+
+    return result
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import pathlib
+import re
+from collections.abc import Iterable
+
+from .helpers import digest
+
+
+# Matches, in order of precedence, a string, a comment or a run of whitespace.
+# Strings are matched so that what looks like a comment or whitespace inside them is
+# left untouched.
+CSS_TOKEN_RE = re.compile(
+    r"""
+        (?P<string>"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')
+        |(?P<comment>/\*.*?\*/)
+        |(?P<whitespace>\s+)
+    """,
+    flags=re.VERBOSE | re.DOTALL,
+)
+
+# Whitespace next to these is never significant.
+CSS_PUNCTUATION = "{};,"
+
+
+def build_bundle(paths: Iterable[pathlib.Path]) -> str:
+    """Returns the stylesheets at the given paths concatenated, in order, and minified.
+    Missing stylesheets are skipped."""
+
+    stylesheets = []
+
+    for path in paths:
+
+        try:
+            stylesheets.append(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            continue
+
+    return minify(css="\n".join(stylesheets))
+
+
+def write_bundle(paths: Iterable[pathlib.Path], path: pathlib.Path) -> str:
+    """Writes the bundle of the stylesheets at the given paths to `path`, unless it's
+    unchanged, and returns a digest of its contents. See `build_bundle`."""
+
+    bundle = build_bundle(paths=paths)
+
+    try:
+        unchanged = path.read_text(encoding="utf-8") == bundle
+    except FileNotFoundError:
+        unchanged = False
+
+    if not unchanged:
+        path.write_text(bundle, encoding="utf-8")
+
+    return digest(string=bundle)
+
+
+def minify(css: str) -> str:
+    """Removes the comments and insignificant whitespace from a stylesheet."""
+
+    # The stylesheet split around strings, comments and whitespace. The latter two
+    # are replaced by `None` as a comment separates what surrounds it, as
+    # whitespace does.
+    pieces: list[str | None] = []
+    position = 0
+
+    for match in CSS_TOKEN_RE.finditer(css):
+
+        pieces.append(css[position : match.start()])
+        pieces.append(match["string"])
+        position = match.end()
+
+    pieces.append(css[position:])
+    pieces = [piece for piece in pieces if piece != ""]
+
+    minified: list[str] = []
+
+    for index, piece in enumerate(pieces):
+
+        if piece is not None:
+            minified.append(piece)
+            continue
+
+        previous = minified[-1][-1] if minified else ""
+        following = next((p[0] for p in pieces[index + 1 :] if p is not None), "")
+
+        if (
+            previous
+            and following
+            and previous != " "
+            and previous not in CSS_PUNCTUATION
+            and following not in CSS_PUNCTUATION
+        ):
+            minified.append(" ")
+
+    return "".join(minified)
@@ -0,0 +1,509 @@
+from __future__ import annotations
+
+import copy
+import json
+import pathlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable, Mapping
+from dataclasses import dataclass
+from typing import Generic, NoReturn, TypeVar
+
+from .core import ParsedField, Processor
+from .helpers import Defaults, InvalidMarkup, digest
+
+
+T = TypeVar("T")
+
+
+@dataclass
+class CacheStats:
+    """A class used to count how a cache is being used."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class RenderCache(Generic[T]):
+    """A size-bounded, least-recently-used cache of processed field text.
+
+    Keys should identify the `MarkerSet.fingerprint` of the markers used, the field
+    text itself and, when caching processed strings, the processing applied. Caching
+    `ParsedField`s instead lets every output of a field share one parse. Fields
+    containing invalid markup are cached too, re-raising their `InvalidMarkup`.
+
+    Arguments:
+        capacity: The maximum number of entries to keep. Zero disables caching.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._entries: OrderedDict[Hashable, T | InvalidMarkup] = OrderedDict()
+        self._stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._stats
+
+    def get(self, key: Hashable, function: Callable[[], T]) -> T | NoReturn:
+        """Returns the cached result for a key, otherwise calls `function` and caches
+        its result. For example:
+
+        cache.get(
+            key=("marked", marker_set.fingerprint, string),
+            function=lambda: processor.render(string=string),
+        )
+        """
+
+        try:
+            result = self._entries[key]
+        except KeyError:
+            pass
+        else:
+            self._stats.hits += 1
+            self._entries.move_to_end(key)
+
+            # Raise a copy so the cached error never holds on to a traceback.
+            if isinstance(result, InvalidMarkup):
+                raise copy.copy(result)
+
+            return result
+
+        self._stats.misses += 1
+
+        try:
+            result = function()
+        except InvalidMarkup as error:
+            self._store(key=key, result=copy.copy(error))
+            raise
+
+        self._store(key=key, result=result)
+
+        return result
+
+    def add(self, key: Hashable, result: T) -> None:
+        """Caches a result computed elsewhere, e.g. ahead of time, unless the key is
+        already cached. Counts as neither a hit nor a miss."""
+
+        if key not in self._entries:
+            self._store(key=key, result=result)
+
+    def items(self) -> list[tuple[Hashable, T | InvalidMarkup]]:
+        """Returns the entries, from least to most recently used."""
+
+        return list(self._entries.items())
+
+    def remove(self, key: Hashable) -> bool:
+        """Removes an entry, returning whether it was cached."""
+
+        return self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        """Removes all entries. Leaves the stats untouched."""
+
+        self._entries.clear()
+
+    def discard(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Removes the entries whose key matches a predicate and returns how many were
+        removed. For example, dropping results of a previous configuration:
+
+        cache.discard(predicate=lambda key: key[0] != marker_set.fingerprint)
+        """
+
+        keys = [key for key in self._entries if predicate(key)]
+
+        for key in keys:
+            del self._entries[key]
+
+        return len(keys)
+
+    def _store(self, key: Hashable, result: T | InvalidMarkup) -> None:
+        if self._capacity <= 0:
+            return
+
+        self._entries[key] = result
+
+        while len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+            self._stats.evictions += 1
+
+
+class FieldCache:
+    """A class used to parse fields for the field filters, keeping the parses in a
+    `RenderCache` keyed by `MarkerSet.fingerprint` and field text, so every output of
+    a field shares one parse.
+
+    On a miss, a field is parsed along with any results `load` returns, e.g. from the
+    `DiskCache`, or if it was last parsed with other text, e.g. while it's being
+    edited, the edit is spliced into its last parse. See `Processor.reparse`. The
+    version it replaces is then removed, so editing a field keeps a single entry for
+    it rather than one per keystroke.
+
+    Parses of fields containing markup characters are kept until taken by
+    `FieldCache.take_unsaved`, to be written to the `DiskCache`. Those spliced from
+    an edit are left out, as versions of a field still being edited, until they're
+    parsed again from the cache, e.g. once the edited card is shown.
+
+    Arguments:
+        capacity: The maximum number of parsed fields to keep. Zero disables caching.
+        load: Returns the results known for a field's text without parsing it.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        load: Callable[[Processor, str], dict[str, str | InvalidMarkup]],
+    ) -> None:
+        self._cache: RenderCache[ParsedField] = RenderCache(capacity=capacity)
+        self._load = load
+        # Parsed fields used since they were last taken.
+        self._unsaved: dict[tuple[str, str], ParsedField] = {}
+        # The last parse of each field of the last note parsed, keyed by note id and
+        # field name.
+        self._last_parsed: dict[tuple[int, str], ParsedField] = {}
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return key in self._cache
+
+    @property
+    def capacity(self) -> int:
+        return self._cache.capacity
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
+
+    def parse(
+        self,
+        processor: Processor,
+        field_text: str,
+        field: tuple[int, str] | None = None,
+    ) -> ParsedField:
+        """Returns the cached parse of a field, otherwise parses it.
+
+        Arguments:
+            processor: The `Processor` used to parse the field.
+            field_text: The field's text.
+            field: The field's note id and name, if known.
+        """
+
+        fingerprint = processor.marker_set.fingerprint
+        key = (fingerprint, field_text)
+        previous = self._last_parsed.get(field) if field is not None else None
+        spliced = False
+
+        def parse() -> ParsedField:
+            nonlocal spliced
+
+            results = self._load(processor, field_text)
+
+            if previous is not None and not results:
+                spliced = True
+                return processor.reparse(previous=previous, string=field_text)
+
+            return processor.parse(string=field_text, results=results)
+
+        parsed = self._cache.get(key=key, function=parse)
+
+        if field is not None:
+
+            # Only the fields of the last note parsed are kept.
+            if any(note_id != field[0] for note_id, _ in self._last_parsed):
+                self._last_parsed.clear()
+
+            self._last_parsed[field] = parsed
+
+            if previous is not None and previous.string != field_text:
+                self._cache.remove(key=(fingerprint, previous.string))
+                self._unsaved.pop((fingerprint, previous.string), None)
+
+        # Fields without markup characters are returned as-is, so aren't worth
+        # keeping on disk.
+        if parsed.characters and not spliced:
+            self._unsaved[key] = parsed
+
+        return parsed
+
+    def add(self, fingerprint: str, parsed: ParsedField) -> None:
+        """Caches a field parsed elsewhere, e.g. ahead of time, unless it's already
+        cached."""
+
+        key = (fingerprint, parsed.string)
+
+        self._cache.add(key=key, result=parsed)
+
+        if parsed.characters:
+            self._unsaved[key] = parsed
+
+    def take_unsaved(self) -> list[tuple[str, ParsedField]]:
+        """Returns the fields parsed or used since the last call, along with the
+        fingerprint of the markers they were parsed with."""
+
+        unsaved, self._unsaved = self._unsaved, {}
+
+        return [(fingerprint, parsed) for (fingerprint, _), parsed in unsaved.items()]
+
+    def reset(self, fingerprint: str, capacity: int) -> None:
+        """Removes the fields parsed with other markers, and all of them if the
+        capacity changed."""
+
+        self._last_parsed.clear()
+
+        if capacity != self._cache.capacity:
+            self._cache = RenderCache(capacity=capacity)
+        else:
+            self._cache.discard(predicate=lambda key: key[0] != fingerprint)
+
+
+class DiskCache:
+    """A size-bounded, least-recently-used cache of processed field text kept in an
+    SQLite database, so it outlives the session.
+
+    Entries are keyed by the `MarkerSet.fingerprint` of the markers used, a digest of
+    the field text and the processing applied, so results of other markers are never
+    returned. The database is only opened once it's first used, and several Anki
+    instances, e.g. with different profiles open, can share it. Any database error,
+    such as another instance holding a lock for too long, is a miss or a skipped
+    write rather than a failure.
+
+    The number of entries is counted once when the database is opened, and kept up
+    to date with this instance's writes. Entries written by other instances are
+    counted the next time it's opened.
+
+    Reads use their own read-only connection and lock, so looking up a field on the
+    main thread never waits for a write in the background to finish. Results longer
+    than `max_size` characters aren't written, as a few huge fields would otherwise
+    take up most of the database.
+
+    Arguments:
+        path: The database file, created if missing.
+        capacity: The maximum number of entries to keep. Zero disables caching.
+        max_size: The maximum length of a result to write.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        capacity: int,
+        max_size: int = Defaults.DISK_CACHE_RESULT_SIZE,
+    ) -> None:
+        self._path = path
+        self._capacity = capacity
+        self._max_size = max_size
+        self._connection: sqlite3.Connection | None = None
+        self._reader: sqlite3.Connection | None = None
+        # The number of entries in the database, see above.
+        self._count = 0
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._stats = CacheStats()
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._stats
+
+    def get(self, fingerprint: str, string: str) -> dict[str, str | InvalidMarkup]:
+        """Returns the results stored for a string, keyed by the processing applied.
+        For example:
+
+        {"marked": 'The <marker class="accent">lazy</marker> dog'}
+        """
+
+        with self._read_lock:
+
+            connection = self._connect_reader()
+
+            if connection is None:
+                return {}
+
+            try:
+                rows = connection.execute(
+                    "SELECT operation, result, error FROM results "
+                    "WHERE fingerprint = ? AND digest = ?",
+                    (fingerprint, digest(string=string)),
+                ).fetchall()
+            except sqlite3.Error:
+                rows = []
+
+        if rows:
+            self._stats.hits += 1
+        else:
+            self._stats.misses += 1
+
+        return {
+            operation: InvalidMarkup(*json.loads(error)) if error else result
+            for operation, result, error in rows
+        }
+
+    def put(
+        self, entries: Iterable[tuple[str, str, Mapping[str, str | InvalidMarkup]]]
+    ) -> None:
+        """Stores the results of processing strings, given as their fingerprint,
+        string and results keyed by the processing applied, marking them as the most
+        recently used. Then evicts the least recently used entries over capacity.
+        Writes everything in a single transaction. Results longer than `max_size`
+        are left out."""
+
+        used = time.time()
+
+        rows = [
+            (
+                fingerprint,
+                digest(string=string),
+                operation,
+                None if isinstance(result, InvalidMarkup) else result,
+                (
+                    json.dumps(result.args)
+                    if isinstance(result, InvalidMarkup)
+                    else None
+                ),
+                used,
+            )
+            for fingerprint, string, results in entries
+            for operation, result in results.items()
+            if isinstance(result, InvalidMarkup) or len(result) <= self._max_size
+        ]
+
+        if not rows:
+            return
+
+        with self._lock:
+
+            connection = self._connect()
+
+            if connection is None:
+                return
+
+            try:
+                with connection:
+
+                    count = self._count
+
+                    for row in rows:
+
+                        # Only new entries are counted, existing ones are updated.
+                        if connection.execute(
+                            "INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                            row,
+                        ).rowcount:
+                            count += 1
+                            continue
+
+                        connection.execute(
+                            "UPDATE results SET result = ?, error = ?, used = ? "
+                            "WHERE fingerprint = ? AND digest = ? AND operation = ?",
+                            (*row[3:], *row[:3]),
+                        )
+
+                    evicted = 0
+
+                    if count > self._capacity:
+                        evicted = connection.execute(
+                            "DELETE FROM results "
+                            "WHERE (fingerprint, digest, operation) IN ("
+                            "SELECT fingerprint, digest, operation FROM results "
+                            "ORDER BY used LIMIT ?)",
+                            (count - self._capacity,),
+                        ).rowcount
+            except sqlite3.Error:
+                return
+
+            # Only once the transaction is committed.
+            self._count = count - evicted
+            self._stats.evictions += evicted
+
+    def close(self) -> None:
+        with self._lock:
+
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+        with self._read_lock:
+
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def _connect_reader(self) -> sqlite3.Connection | None:
+        if self._capacity <= 0:
+            return None
+
+        if self._reader is not None:
+            return self._reader
+
+        try:
+            # Read-only, so reading never creates the database, which is retried
+            # until it's first written to.
+            self._reader = sqlite3.connect(
+                f"{self._path.resolve().as_uri()}?mode=ro",
+                uri=True,
+                timeout=0.25,
+                check_same_thread=False,
+            )
+        except (OSError, sqlite3.Error):
+            return None
+
+        return self._reader
+
+    def _connect(self) -> sqlite3.Connection | None:
+        if self._capacity <= 0:
+            return None
+
+        if self._connection is not None:
+            return self._connection
+
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+
+            # Wait briefly for another instance's write rather than blocking Anki.
+            connection = sqlite3.connect(
+                self._path, timeout=0.25, check_same_thread=False
+            )
+            # Lets other instances read while one writes.
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "fingerprint TEXT, digest TEXT, operation TEXT, result TEXT, "
+                    "error TEXT, used REAL, "
+                    "PRIMARY KEY (fingerprint, digest, operation)"
+                    ") WITHOUT ROWID"
+                )
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS results_used ON results (used)"
+                )
+
+            (self._count,) = connection.execute(
+                "SELECT COUNT(*) FROM results"
+            ).fetchone()
+        except (OSError, sqlite3.Error):
+            # Don't retry on every field, the cache is simply disabled.
+            self._capacity = 0
+            return None
+
+        self._connection = connection
+
+        return connection
@@ -0,0 +1,21 @@
+"""The add-on's text processing engine: parsing the configuration, and marking,
+unmarking and rendering text. Nothing here imports `aqt` or `anki`, so it can be used
+and tested outside of Anki."""
+
+from .config import Config
+from .marker import CompiledMarker, Marker, MarkerSet
+from .processor import ParsedField, Processor
+from .script import build_script
+from .terms import TermMatcher
+
+
+__all__ = [
+    "CompiledMarker",
+    "Config",
+    "Marker",
+    "MarkerSet",
+    "ParsedField",
+    "Processor",
+    "TermMatcher",
+    "build_script",
+]
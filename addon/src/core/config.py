@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import copy
+import itertools
+import json
+from collections.abc import Iterator
+from typing import Any
+
+from ..helpers import ConfigError, Defaults, Key
+from .marker import Marker, MarkerSet
+
+
+# Numbers every `Config` built, see `Config.version`.
+_versions = itertools.count(start=1)
+
+
+class Config:
+    """A class used to store the add-on's configuration.
+
+    A `Config` is an immutable snapshot: it keeps its own copy of the data it's built
+    from and is never modified afterwards, so it can be read from any thread.
+    Reloading the configuration builds a new `Config` which replaces the previous one
+    in a single assignment, while anything holding the previous one, or a `Processor`
+    built from its `marker_set`, keeps using it unchanged.
+
+    During testing, the `data` argument can be supplied to bypass loading the
+    configuration from disk.
+
+    The data structure is as follows:
+
+    {
+        "parent-classname": "my-markers",
+        "render-cache-size": 2048,
+        "disk-cache-size": 50000,
+        "prerender-cards": 5,
+        "reload-interval": 2.0,
+        "metrics": false,
+        "render-on-save": false,
+        "markers": [
+            {
+                "name": "Highlight",
+                "markup": "==",
+                "classname": "highlight"
+            },
+            ...
+        ]
+    }
+
+    The "render-cache-size", "disk-cache-size", "prerender-cards", "reload-interval",
+    "metrics" and "render-on-save" keys are optional.
+    """
+
+    __slots__ = ("_data", "_markers", "_marker_set", "_version")
+
+    def __init__(self, data: dict | None = None) -> None:
+        self._data: dict[str, Any] = (
+            self._load() if data is None else copy.deepcopy(data)
+        )
+        self._validate()
+        self._markers = self._build_markers()
+        self._marker_set = MarkerSet.from_markers(self._markers)
+        self._version = next(_versions)
+
+    @property
+    def version(self) -> int:
+        """Increases with every `Config` built, so the most recent of two is the one
+        with the greater version."""
+        return self._version
+
+    @property
+    def markers(self) -> list[Marker]:
+        # Copies, as `Marker`s are mutable.
+        return copy.deepcopy(list(self._markers))
+
+    @property
+    def marker_set(self) -> MarkerSet:
+        return self._marker_set
+
+    @property
+    def render_cache_size(self) -> int:
+        return self._data.get(Key.RENDER_CACHE_SIZE, Defaults.RENDER_CACHE_SIZE)
+
+    @property
+    def disk_cache_size(self) -> int:
+        return self._data.get(Key.DISK_CACHE_SIZE, Defaults.DISK_CACHE_SIZE)
+
+    @property
+    def prerender_cards(self) -> int:
+        return self._data.get(Key.PRERENDER_CARDS, Defaults.PRERENDER_CARDS)
+
+    @property
+    def reload_interval(self) -> float:
+        return self._data.get(Key.RELOAD_INTERVAL, Defaults.RELOAD_INTERVAL)
+
+    @property
+    def metrics(self) -> bool:
+        return self._data.get(Key.METRICS, Defaults.METRICS)
+
+    @property
+    def render_on_save(self) -> bool:
+        return self._data.get(Key.RENDER_ON_SAVE, Defaults.RENDER_ON_SAVE)
+
+    def _load(self) -> dict:
+        """Loads the add-on's configuration from disk."""
+
+        try:
+            with open(Defaults.MARKERS_JSON) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            raise ConfigError(f"Missing {Key.MARKERS_JSON} in {Defaults.USER_FILES}.")
+        except json.JSONDecodeError:
+            raise ConfigError(
+                f"Cannot read {Key.MARKERS_JSON} in {Defaults.USER_FILES}."
+            )
+
+        return data
+
+    def _validate(self) -> None:
+        """Validates the add-on's configuration."""
+
+        if not isinstance(self._data, dict):
+            raise ConfigError(f"{Key.MARKERS_JSON} must contain an object.")
+
+        if not isinstance(self._data.get(Key.PARENT_CLASSNAME, ""), str):
+            raise ConfigError(f"'{Key.PARENT_CLASSNAME}' must be a string.")
+
+        markers = self._data.get(Key.MARKERS, [])
+
+        if not isinstance(markers, list) or not all(
+            isinstance(marker, dict) for marker in markers
+        ):
+            raise ConfigError(f"'{Key.MARKERS}' must be a list of markers.")
+
+        for marker in markers:
+            for key in [Key.NAME, Key.MARKUP, Key.CLASSNAME]:
+                if not isinstance(marker.get(key, ""), str):
+                    raise ConfigError(f"A marker's '{key}' must be a string.")
+
+        self._validate_count(
+            key=Key.RENDER_CACHE_SIZE, default=Defaults.RENDER_CACHE_SIZE
+        )
+        self._validate_count(key=Key.DISK_CACHE_SIZE, default=Defaults.DISK_CACHE_SIZE)
+        self._validate_count(key=Key.PRERENDER_CARDS, default=Defaults.PRERENDER_CARDS)
+        self._validate_seconds(
+            key=Key.RELOAD_INTERVAL, default=Defaults.RELOAD_INTERVAL
+        )
+
+        if not isinstance(self._data.get(Key.METRICS, Defaults.METRICS), bool):
+            raise ConfigError(f"'{Key.METRICS}' must be either true or false.")
+
+        if not isinstance(
+            self._data.get(Key.RENDER_ON_SAVE, Defaults.RENDER_ON_SAVE), bool
+        ):
+            raise ConfigError(f"'{Key.RENDER_ON_SAVE}' must be either true or false.")
+
+        for (name, markup, _, classname) in self._iter_raw_config():
+
+            if not all([name, markup, classname]):
+                raise ConfigError(
+                    f"All markers require: '{Key.NAME}', '{Key.MARKUP}' and "
+                    f"'{Key.CLASSNAME}'."
+                )
+
+            if markup != markup[0] * len(markup):
+                raise ConfigError(
+                    f"A marker's '{Key.MARKUP}' can only contain one type of character."
+                )
+
+            if markup[0] in Defaults.INVALID_CHARACTERS:
+                raise ConfigError(
+                    f"Marker '{name}' contains an invalid character: '{markup[0]}'. "
+                    f"Invalid characters are: {' '.join(Defaults.INVALID_CHARACTERS)}."
+                )
+
+    def _validate_count(self, key: str, default: int) -> None:
+        """Validates that a key, if set, is a whole number zero or greater."""
+
+        value = self._data.get(key, default)
+
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            raise ConfigError(f"'{key}' must be a whole number zero or greater.")
+
+    def _validate_seconds(self, key: str, default: float) -> None:
+        """Validates that a key, if set, is a number of seconds zero or greater."""
+
+        value = self._data.get(key, default)
+
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+            raise ConfigError(f"'{key}' must be a number of seconds zero or greater.")
+
+    def _build_markers(self) -> tuple[Marker, ...]:
+        """Builds the `Marker`s from the raw config data."""
+
+        markers: list[Marker] = []
+
+        for (name, markup, parent_classname, classname) in self._iter_raw_config():
+
+            classnames = [parent_classname, classname]
+            classnames = list(filter(None, classnames))
+
+            markers.append(
+                Marker(
+                    name=name,
+                    markup=markup,
+                    classnames=classnames,
+                ),
+            )
+
+        return tuple(markers)
+
+    def _iter_raw_config(self) -> Iterator[tuple[str, str, str, str]]:
+        """Iterates through the raw config data and returns a tuple for each marker
+        containing the name, its markup, its parent classname and its classname."""
+
+        parent_classname = self._data.get(Key.PARENT_CLASSNAME, "")
+
+        for marker in self._data.get(Key.MARKERS, []):
+
+            name = marker.get(Key.NAME, "")
+            markup = marker.get(Key.MARKUP, "")
+            classname = marker.get(Key.CLASSNAME, "")
+
+            # ("Highlight", "==", "my-markers", "highlight")
+            yield (name, markup, parent_classname, classname)
@@ -0,0 +1,386 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import types
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass
+
+from ..helpers import Key
+
+
+ALL_RE = re.compile(rf"(?P<{Key.CONTENTS}>.*)", flags=re.DOTALL)
+
+# A placeholder for a marker's contents used when expanding its replacement strings
+# into their opening and closing halves.
+CONTENTS_PLACEHOLDER = "\x00"
+
+
+@dataclass
+class Marker:
+    """A class representing a marker style.
+
+    Used to generate its respective HTML tags, replacement strings for rendering and
+    unmarking text and its regex pattern for capturing text that matches its markup.
+    """
+
+    name: str
+    markup: str
+    classnames: list[str]
+
+    @property
+    def tag_open(self) -> str:
+        """Returns the opening tag. For example:
+
+        <marker class="my-markers highlight">
+        """
+
+        return f"<{Key.MARKER} class=\"{' '.join(self.classnames)}\">"
+
+    @property
+    def tag_close(self) -> str:
+        """Returns the closing tag. For example:
+
+        </marker>
+        """
+
+        return f"</{Key.MARKER}>"
+
+    @property
+    def replacement_render(self) -> str:
+        r"""Returns the replacement string used when rendering. For example:
+
+        <marker class="my-markers highlight">\g<contents><marker>
+
+        Note that '\g<NAME>' is a back-reference to the capture group 'NAME'. So this
+        string will place the contents of the 'contents' capture group inside the
+        marker's opening and closing tags.
+        """
+
+        return rf"{self.tag_open}\g<{Key.CONTENTS}>{self.tag_close}"
+
+    @property
+    def replacement_unmark(self) -> str:
+        r"""Returns the replacement string used when unmarking. For example:
+
+        \g<contents>
+
+        Note that '\g<NAME>' is a back-reference to the capture group 'NAME'. So this
+        string will extract the contents of the 'contents' capture group.
+        """
+
+        return rf"\g<{Key.CONTENTS}>"
+
+    @property
+    def pattern(self) -> re.Pattern:
+        """Returns a regex pattern that captures the text between a symmetrical markup
+        syntax e.g. '~~string~~' would yield 'string'."""
+
+        # markup:  '~'
+        # 'm0' --> '~'
+        # 'mf' --> '~'
+        #
+        # markup:  '~~'
+        # 'm0' --> '~'
+        # 'mf' --> '~~'
+        #
+        # markup:  '~~~'
+        # 'm0' --> '~'
+        # 'mf' --> '~~~'
+        m0 = re.escape(self.markup[0])
+        mf = re.escape(self.markup)
+
+        # 1. Select '~~' only if it's *not* preceded or followed by '~'. This captures
+        # the opening markup ignoring those that do not have the exact markup string
+        # length. Therefore this will *only* capture '~~' and never capture '~~' inside
+        # '~~~'.
+        #
+        #     (?<!~)~~(?!~)
+        #
+        # 2. Lazy select anything that is not '~'. This captures the marked text.
+        #
+        #     ([^~]*?)
+        #
+        # 3. Again select '~~' only if it's *not* preceded or followed by '~'. This is
+        # identical to the first part.
+        #
+        #     (?<!~)~~(?!~)
+        #
+        # markup: '~'   --> (?<!~)~(?!~)([^~]*?)~(?!~)
+        # markup: '~~'  --> (?<!~)~~(?!~)([^~]*?)~~(?!~)
+        # markup: '~~~' --> (?<!~)~~~(?!~)([^~]*?)~~~(?!~)
+        return re.compile(
+            rf"""
+                (?<!{m0}){mf}(?!{m0})
+                (?P<{Key.CONTENTS}>[^{m0}]*?)
+                (?<!{m0}){mf}(?!{m0})
+            """,
+            flags=re.VERBOSE,
+        )
+
+
+@dataclass(frozen=True)
+class CompiledMarker:
+    """An immutable snapshot of a `Marker` with its pattern, tags and replacement
+    strings computed once.
+
+    The `tokens_*` attributes hold the opening and closing halves of the rendered
+    marker split into runs of markup characters and the text between them. See
+    `MarkerSet.tokenize`. `tag_characters` holds the markup characters among them.
+    """
+
+    __slots__ = (
+        "name",
+        "markup",
+        "character",
+        "length",
+        "classnames",
+        "pattern",
+        "tag_open",
+        "tag_close",
+        "replacement_render",
+        "replacement_unmark",
+        "tokens_open",
+        "tokens_close",
+        "tag_characters",
+    )
+
+    name: str
+    markup: str
+    character: str
+    length: int
+    classnames: tuple[str, ...]
+    pattern: re.Pattern
+    tag_open: str
+    tag_close: str
+    replacement_render: str
+    replacement_unmark: str
+    tokens_open: tuple[str, ...]
+    tokens_close: tuple[str, ...]
+    tag_characters: frozenset[str]
+
+
+@dataclass(frozen=True)
+class MarkerSet:
+    """An immutable, precompiled set of `Marker`s used by the `Processor`.
+
+    Built once from the configuration so that processing text never compiles a
+    pattern or formats a string. Its `fingerprint` identifies the markers' names,
+    markups and classnames, and so anything derived from processing text with them.
+    """
+
+    __slots__ = (
+        "markers",
+        "characters",
+        "by_character",
+        "tokenizer",
+        "fingerprint",
+    )
+
+    markers: tuple[CompiledMarker, ...]
+    characters: str
+    by_character: Mapping[str, tuple[CompiledMarker, ...]]
+    tokenizer: re.Pattern | None
+    fingerprint: str
+
+    @classmethod
+    def from_markers(cls, markers: Iterable[Marker]) -> MarkerSet:
+        """Builds a `MarkerSet` from a list of `Marker`s, keeping their order."""
+
+        markers = list(markers)
+
+        characters = "".join(dict.fromkeys(marker.markup[0] for marker in markers))
+
+        # Matches runs of any markup character e.g. '((?=[*~])(?:\*+|~+))'. The
+        # lookahead lets the regex engine skip over text with a single character
+        # test, and the capture group makes `re.split` keep the runs alongside the
+        # text between them.
+        tokenizer = (
+            re.compile(
+                "((?=[{}])(?:{}))".format(
+                    "".join(re.escape(c) for c in characters),
+                    "|".join(f"{re.escape(c)}+" for c in characters),
+                )
+            )
+            if characters
+            else None
+        )
+
+        compiled = tuple(
+            cls._compile(marker=marker, tokenizer=tokenizer) for marker in markers
+        )
+
+        return cls(
+            markers=compiled,
+            characters=characters,
+            by_character=types.MappingProxyType(
+                {
+                    character: tuple(m for m in compiled if m.character == character)
+                    for character in characters
+                }
+            ),
+            tokenizer=tokenizer,
+            fingerprint=hashlib.sha1(
+                json.dumps(
+                    [[m.name, m.markup, m.classnames] for m in compiled]
+                ).encode()
+            ).hexdigest(),
+        )
+
+    def __iter__(self) -> Iterator[CompiledMarker]:
+        return iter(self.markers)
+
+    def __reduce__(self) -> tuple:
+        # The read-only `by_character` lookup cannot be pickled, so a `MarkerSet` is
+        # sent to other processes as its markers and rebuilt there.
+        return (
+            MarkerSet.from_markers,
+            (
+                [
+                    Marker(
+                        name=marker.name,
+                        markup=marker.markup,
+                        classnames=list(marker.classnames),
+                    )
+                    for marker in self.markers
+                ],
+            ),
+        )
+
+    def __len__(self) -> int:
+        return len(self.markers)
+
+    def find_characters(self, string: str) -> frozenset[str]:
+        """Returns the markup characters appearing in a string.
+
+        Searching for each character separately is far faster than a regex searching
+        for all of them, and most strings contain no markup characters at all.
+        """
+
+        return frozenset(filter(string.__contains__, self.characters))
+
+    def find_markers(self, string: str, render: bool) -> tuple[CompiledMarker, ...]:
+        """Returns, in order, the markers which can apply to a string. See
+        `MarkerSet.select_markers`."""
+
+        return self.select_markers(
+            characters=self.find_characters(string=string), render=render
+        )
+
+    def select_markers(
+        self, characters: frozenset[str], render: bool
+    ) -> tuple[CompiledMarker, ...]:
+        """Returns, in order, the markers which can apply to a string containing the
+        given markup characters: those whose character is among them. When
+        rendering, this includes the characters in the tags of the markers applied
+        before them."""
+
+        if not characters:
+            return ()
+
+        present = set(characters)
+
+        markers = []
+
+        for marker in self.markers:
+
+            if marker.character not in present:
+                continue
+
+            markers.append(marker)
+
+            if render:
+                present |= marker.tag_characters
+
+        if len(markers) == len(self.markers):
+            return self.markers
+
+        return tuple(markers)
+
+    def tokenize(self, string: str) -> Iterator[str]:
+        """Splits a string into runs of markup characters and the text between them.
+        For example:
+
+        The ==lazy== dog
+        ['The ', '==', 'lazy', '==', ' dog']
+        """
+
+        return _tokenize(tokenizer=self.tokenizer, string=string)
+
+    def tokenize_chunks(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Tokenizes a string split into chunks, yielding the same tokens as
+        `MarkerSet.tokenize` would for the whole string, except that text may be split
+        across several tokens."""
+
+        # Each token is held back until the next one, as a run of markup characters
+        # at the end of a chunk may continue into the next chunk.
+        previous = ""
+        # The runs merged with `previous`, joined once complete so that a run split
+        # across many chunks takes linear time.
+        merged: list[str] | None = None
+
+        for chunk in chunks:
+
+            for token in self.tokenize(string=chunk):
+
+                if previous[:1] == token[0] and token[0] in self.characters:
+
+                    if merged is None:
+                        merged = [previous]
+
+                    merged.append(token)
+                    continue
+
+                if merged is not None:
+                    yield "".join(merged)
+                    merged = None
+                elif previous:
+                    yield previous
+
+                previous = token
+
+        if merged is not None:
+            yield "".join(merged)
+        elif previous:
+            yield previous
+
+    @staticmethod
+    def _compile(marker: Marker, tokenizer: re.Pattern | None) -> CompiledMarker:
+        replacement_render = marker.replacement_render
+
+        # Expand the replacement exactly as `re.sub` would, then split it around the
+        # contents. The halves are tokenized as they may contain markup characters
+        # e.g. the '=' in 'class="..."', which the following markers must see.
+        expanded = ALL_RE.fullmatch(CONTENTS_PLACEHOLDER).expand(replacement_render)
+        rendered_open, _, rendered_close = expanded.partition(CONTENTS_PLACEHOLDER)
+
+        tokens_open = tuple(_tokenize(tokenizer=tokenizer, string=rendered_open))
+        tokens_close = tuple(_tokenize(tokenizer=tokenizer, string=rendered_close))
+
+        return CompiledMarker(
+            name=marker.name,
+            markup=marker.markup,
+            character=marker.markup[0],
+            length=len(marker.markup),
+            classnames=tuple(marker.classnames),
+            pattern=marker.pattern,
+            tag_open=marker.tag_open,
+            tag_close=marker.tag_close,
+            replacement_render=replacement_render,
+            replacement_unmark=marker.replacement_unmark,
+            tokens_open=tokens_open,
+            tokens_close=tokens_close,
+            tag_characters=frozenset(
+                token[0]
+                for token in tokens_open + tokens_close
+                if tokenizer is not None and tokenizer.fullmatch(token)
+            ),
+        )
+
+
+def _tokenize(tokenizer: re.Pattern | None, string: str) -> Iterator[str]:
+    if tokenizer is None:
+        return iter([string] if string else [])
+
+    return (token for token in tokenizer.split(string) if token)
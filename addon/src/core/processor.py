@@ -0,0 +1,1318 @@
+from __future__ import annotations
+
+import bisect
+import copy
+import functools
+import html
+import itertools
+import re
+import threading
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass
+from typing import NoReturn
+
+from ..helpers import Defaults, InvalidMarkup, Key
+from .marker import CompiledMarker, MarkerSet
+from .terms import TermMatcher
+
+
+LINEBREAK_RE = re.compile(r"(\r\n|\r|\n)")
+
+# Used to find terms outside of tags and entities when marking them.
+TAG_RE = re.compile(r"<[^>]*>")
+ENTITY_RE = re.compile(r"&#?\w+;")
+
+# The size of the blocks two strings are compared in to find an edit.
+EDIT_BLOCK_SIZE = 4096
+
+
+@functools.cache
+def html_re() -> re.Pattern:
+    """Returns the pattern used by Markdown to find inline HTML.
+
+    Importing `markdown` takes longer than importing the rest of the add-on, so it's
+    deferred until the first time the contents of a markup are validated.
+    """
+
+    from markdown.inlinepatterns import HTML_RE
+
+    return re.compile(HTML_RE)
+
+
+@dataclass
+class _Counters:
+    """The counts of a single thread. See `ProcessorStats`."""
+
+    calls: int = 0
+    fast_path: int = 0
+    passes: int = 0
+    skipped_passes: int = 0
+
+
+class ProcessorStats:
+    """A class used to count how much work the `Processor` skips when rendering and
+    unmarking strings.
+
+    A `Processor` can be shared by threads, so each thread counts into its own
+    `_Counters`, which are summed when read. Threads only take the lock the first
+    time they count, when the counters of threads which have since finished are
+    folded into a single total, so the number kept doesn't grow with every batch.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counters: dict[threading.Thread, _Counters] = {}
+        # The counts of the threads which have finished.
+        self._finished = _Counters()
+
+    @property
+    def calls(self) -> int:
+        """The number of strings rendered or unmarked."""
+
+        return self._sum(name="calls")
+
+    @property
+    def fast_path(self) -> int:
+        """The number of strings returned as-is as they contain no markup
+        characters."""
+
+        return self._sum(name="fast_path")
+
+    @property
+    def passes(self) -> int:
+        """The number of passes, one per marker, run over strings."""
+
+        return self._sum(name="passes")
+
+    @property
+    def skipped_passes(self) -> int:
+        """The number of passes, one per marker, skipped over strings."""
+
+        return self._sum(name="skipped_passes")
+
+    def count(self, fast_path: bool, passes: int, skipped_passes: int) -> None:
+        """Counts a string rendered or unmarked."""
+
+        try:
+            counters = self._local.counters
+        except AttributeError:
+            counters = self._local.counters = self._register()
+
+        counters.calls += 1
+        counters.fast_path += fast_path
+        counters.passes += passes
+        counters.skipped_passes += skipped_passes
+
+    def _register(self) -> _Counters:
+        """Returns new counters for the current thread."""
+
+        counters = _Counters()
+
+        with self._lock:
+
+            for thread in [t for t in self._counters if not t.is_alive()]:
+                finished = self._counters.pop(thread)
+                self._finished.calls += finished.calls
+                self._finished.fast_path += finished.fast_path
+                self._finished.passes += finished.passes
+                self._finished.skipped_passes += finished.skipped_passes
+
+            self._counters[threading.current_thread()] = counters
+
+        return counters
+
+    def _sum(self, name: str) -> int:
+        with self._lock:
+            return getattr(self._finished, name) + sum(
+                getattr(counters, name) for counters in self._counters.values()
+            )
+
+
+class Processor:
+    """A class used for processing text by (1) adding markup (2) removing any markup or
+    (3) rendering any markup into HTML.
+
+    Rendering and unmarking scan a string once, splitting it into runs of markup
+    characters and the text between them. Each `Marker` is then applied, in order, as
+    a pass over those tokens. A pass pairs consecutive runs of its character that
+    have the exact length of its markup, which is precisely what `Marker.pattern`
+    matches, so the output is identical to substituting each marker's pattern in
+    turn without re-scanning the string for every marker.
+
+    Markers whose character does not appear in a string are skipped, and a string
+    without any markup characters is returned as-is. See `MarkerSet.find_markers`.
+
+    The contents of each markup are validated as it's paired, so valid strings are
+    scanned once. An invalid string raises an `InvalidMarkup` naming the marker and
+    its offsets in the string.
+
+    Rendering and unmarking take O(n * m) time for a string of length n and m
+    markers, whatever the string contains. Splitting is a single regex scan that
+    never backtracks further than the run it's in. Every pass visits each token once
+    and adds at most two tags per pair, and the contents of a pair, which are
+    validated once, never overlap those of another pair of the same pass. Long runs
+    of markup characters are single tokens, and runs merged after unmarking or
+    across chunks are joined once complete. See `benchmarks` for adversarial inputs.
+
+    A `Processor` can be shared by threads. Its `MarkerSet` is immutable and compiled
+    up front, every call keeps its state in local variables, and its stats are
+    counted per thread. A `ParsedField` shared by threads may compute a result
+    twice, but always to the same value.
+
+    Arguments:
+        marker_set: A `MarkerSet` used to mark, unmark and render text.
+    """
+
+    def __init__(self, marker_set: MarkerSet) -> None:
+        self._marker_set = marker_set
+        self._stats = ProcessorStats()
+
+    @property
+    def marker_set(self) -> MarkerSet:
+        return self._marker_set
+
+    @property
+    def stats(self) -> ProcessorStats:
+        return self._stats
+
+    def mark(self, string: str, markup: str) -> str | NoReturn:
+        """Surrounds a string with a markup. For example:
+
+        The lazy dog
+        ==The lazy dog==
+        """
+
+        self._validate_contents(contents=string)
+
+        return f"{markup}{string}{markup}"
+
+    def mark_all(
+        self, string: str, term: str, markup: str
+    ) -> tuple[str, int] | NoReturn:
+        """Surrounds every occurrence of a term in a field's HTML with a markup in one
+        pass, returning the marked string and the number of occurrences marked. For
+        example, marking `lazy`:
+
+        The lazy dog, the *lazy* cat and the <a title="lazy">fox</a>
+        The ==lazy== dog, the *lazy* cat and the <a title="lazy">fox</a>
+
+        The term is plain text, so it's escaped to match the field's HTML. See
+        `Processor.mark_terms` for which occurrences are marked.
+        """
+
+        self._validate_term(term=term)
+
+        term = html.escape(term, quote=False)
+
+        if not term or term not in string:
+            return string, 0
+
+        return self.mark_terms(
+            string=string, terms=TermMatcher(terms=[term]), markup=markup
+        )
+
+    def compile_terms(
+        self, terms: Iterable[str], whole_words: bool = False
+    ) -> TermMatcher:
+        """Returns a `TermMatcher` finding the given plain text terms in fields' HTML,
+        for `Processor.mark_terms`. Terms which cannot be marked, as they contain
+        line-breaks, HTML or markup characters, are left out."""
+
+        escaped = []
+
+        for term in terms:
+
+            try:
+                self._validate_term(term=term)
+            except InvalidMarkup:
+                continue
+
+            escaped.append(html.escape(term, quote=False))
+
+        return TermMatcher(terms=escaped, whole_words=whole_words)
+
+    def mark_terms(
+        self, string: str, terms: TermMatcher, markup: str
+    ) -> tuple[str, int]:
+        """Surrounds every occurrence of any of the terms in a field's HTML with a
+        markup in one pass, returning the marked string and the number of occurrences
+        marked. See `Processor.compile_terms`.
+
+        Occurrences within HTML tags or entities, within marked text, or next to
+        markup characters or another occurrence are left as-is, as marking them would
+        change what the existing markup renders to. As unpaired markup can still be
+        affected, the result is checked to unmark to the same text and render to just
+        the new markers, otherwise the string is returned as-is, as is a string
+        containing invalid markup.
+        """
+
+        if not terms:
+            return string, 0
+
+        tokens = list(_tokenize_html(marker_set=self._marker_set, string=string))
+        # The runs of markup characters opened but not yet closed by an identical run.
+        opened: set[str] = set()
+        parts: list[str] = []
+        count = 0
+
+        for index, (token, kind) in enumerate(tokens):
+
+            if kind == _RUN:
+                opened ^= {token}
+
+            if kind != _TEXT or opened:
+                parts.append(token)
+                continue
+
+            # Occurrences next to a run of markup characters would join it.
+            after_run = index > 0 and tokens[index - 1][1] == _RUN
+            before_run = index < len(tokens) - 1 and tokens[index + 1][1] == _RUN
+            position = 0
+
+            for start, end in _find_terms(string=token, terms=terms):
+
+                if (
+                    (start == 0 and after_run)
+                    or (end == len(token) and before_run)
+                    or (start == position and position > 0)
+                ):
+                    continue
+
+                parts += [token[position:start], markup, token[start:end], markup]
+                position = end
+                count += 1
+
+            parts.append(token[position:])
+
+        marked = "".join(parts)
+
+        if count and not self._marks_only(
+            string=string, marked=marked, markup=markup, count=count
+        ):
+            return string, 0
+
+        return marked, count
+
+    def _validate_term(self, term: str) -> None | NoReturn:
+        """Validates that a term to be marked contains no line-breaks, HTML or markup
+        characters."""
+
+        self._validate_contents(contents=term)
+
+        if self._marker_set.find_characters(string=term):
+            raise InvalidMarkup(reason=InvalidMarkup.MARKUP)
+
+    def _marks_only(self, string: str, marked: str, markup: str, count: int) -> bool:
+        """Returns whether a string with markups added only differs from the original
+        by `count` new markers with the given markup."""
+
+        tag_open = next(
+            (
+                "".join(marker.tokens_open)
+                for marker in self._marker_set
+                if marker.markup == markup
+            ),
+            None,
+        )
+
+        if tag_open is None:
+            return False
+
+        original = self.parse(string=string)
+        parsed = self.parse(string=marked)
+
+        try:
+            return parsed.unmark() == original.unmark() and (
+                parsed.render().count(tag_open)
+                == original.render().count(tag_open) + count
+            )
+        except InvalidMarkup:
+            return False
+
+    def unmark(self, string: str) -> str | NoReturn:
+        """Strips a marked string of all its markup. For example:
+
+        The ==lazy== dog
+        The lazy dog
+        """
+
+        if self._skip(string=string):
+            return string
+
+        return self.parse(string=string).unmark()
+
+    def render(self, string: str) -> str | NoReturn:
+        """Renders a marked string into its HTML eqivalent. For exmaple:
+
+        The ==lazy== dog.
+        The <marker style="my-markers highlight">lazy</marker> dog
+        """
+
+        if self._skip(string=string):
+            return string
+
+        return self.parse(string=string).render()
+
+    def parse(
+        self,
+        string: str,
+        results: Mapping[str, str | InvalidMarkup] | None = None,
+    ) -> ParsedField:
+        """Parses a string once so that it can be rendered and unmarked without
+        parsing it again. See `ParsedField`."""
+
+        return ParsedField(processor=self, string=string, results=results)
+
+    def reparse(self, previous: ParsedField, string: str) -> ParsedField:
+        """Parses a string which is an edit of a previously parsed string, e.g. a field
+        being typed into, reusing the previous results where possible.
+
+        An edit that's confined to the text between two runs of markup characters and
+        adds or removes no markup characters, line-breaks or HTML leaves every run
+        paired as before. Its results are then the previous results with the edited
+        text spliced in, which costs a copy of the string rather than a walk over its
+        tokens for every marker. Other edits are parsed as with `Processor.parse`.
+
+        To find where the text sits in the results, the returned `ParsedField` keeps
+        the offset of every token in them, so a chain of edits is spliced one after
+        the other. The first edit of a `ParsedField` from `Processor.parse` is
+        always processed in full.
+        """
+
+        edit = _find_edit(previous=previous.string, string=string)
+        field = ParsedField(processor=self, string=string, offsets={})
+
+        # `offsets` is only kept by fields from `Processor.reparse`.
+        if (
+            edit is None
+            or previous._processor is not self
+            or not previous._offsets
+            or self._marker_set.find_characters(string=edit.removed + edit.inserted)
+        ):
+            return field
+
+        tokens = previous.tokens
+        starts = list(itertools.accumulate(map(len, tokens), initial=0))
+        index = bisect.bisect_right(starts, edit.start) - 1
+
+        # Text can be inserted between a run and the text following it.
+        if index == len(tokens) or tokens[index][0] in self._marker_set.characters:
+            index -= 1
+
+        if (
+            index < 0
+            or tokens[index][0] in self._marker_set.characters
+            or edit.start + len(edit.removed) > starts[index + 1]
+        ):
+            return field
+
+        start = edit.start - starts[index]
+        token = tokens[index]
+        token = token[:start] + edit.inserted + token[start + len(edit.removed) :]
+
+        if not token or not _keeps_validity(
+            previous=previous.string,
+            string=string,
+            edit=edit,
+            characters=self._marker_set.characters,
+        ):
+            return field
+
+        delta = len(edit.inserted) - len(edit.removed)
+
+        for key, result in previous._results.items():
+
+            offsets = previous._offsets.get(key)
+
+            if isinstance(result, InvalidMarkup) or offsets is None:
+                continue
+
+            if offsets[index] < 0:
+                continue
+
+            position = offsets[index] + start
+
+            field._results[key] = (
+                result[:position]
+                + edit.inserted
+                + result[position + len(edit.removed) :]
+            )
+            field._offsets[key] = offsets[: index + 1] + [
+                offset + delta if offset >= 0 else offset
+                for offset in offsets[index + 1 :]
+            ]
+
+        field._tokens = (*tokens[:index], token, *tokens[index + 1 :])
+
+        return field
+
+    def iter_unmark(self, chunks: Iterable[str]) -> Iterator[str] | NoReturn:
+        """Unmarks a string given in chunks, yielding the unmarked string in chunks.
+        See `Processor.iter_render`."""
+
+        yield from self._rechunk(
+            self._unmark_tokens(
+                tokens=self._marker_set.tokenize_chunks(chunks=chunks),
+                markers=self._marker_set.markers,
+            )
+        )
+
+    def iter_render(self, chunks: Iterable[str]) -> Iterator[str] | NoReturn:
+        """Renders a string given in chunks, yielding the rendered string in chunks.
+        Joined, the output is identical to `Processor.render` on the whole string.
+
+        Only text that may still be marked is held in memory. Since the contents of a
+        markup cannot contain line-breaks or HTML, an unclosed markup is let through
+        once the text following it contains either. Memory use is therefore bounded
+        by the longest stretch of text without a line-break or HTML tag, not the
+        length of the string.
+
+        Raises `InvalidMarkup` once invalid markup is found, after the output
+        preceding it has been yielded. As the string is no longer available, the
+        error names the marker but not its offsets.
+        """
+
+        yield from self._rechunk(
+            self._render_tokens(
+                tokens=self._marker_set.tokenize_chunks(chunks=chunks),
+                markers=self._marker_set.markers,
+            )
+        )
+
+    def render_batch(
+        self,
+        strings: Iterable[str],
+        processes: int = 0,
+        threads: int = 0,
+        chunk_size: int = Defaults.BATCH_CHUNK_SIZE,
+    ) -> list[str | InvalidMarkup]:
+        """Renders many strings, returning the results in order. A string that
+        contains invalid markup results in its `InvalidMarkup` rather than raising.
+
+        Arguments:
+            strings: The strings to render.
+            processes: The number of worker processes to spread the strings across in
+                chunks of `chunk_size`. Zero renders them in this process.
+            threads: The number of threads to spread the strings across in chunks of
+                `chunk_size`, sharing this `Processor`, if no worker processes are
+                used. Threads only render in parallel on free-threaded builds of
+                Python, but avoid the cost of starting processes and copying strings
+                to them. Zero renders them in the calling thread.
+            chunk_size: The number of strings sent to a worker at once.
+        """
+
+        return self._batch(
+            method=self.render.__name__,
+            strings=strings,
+            processes=processes,
+            threads=threads,
+            chunk_size=chunk_size,
+        )
+
+    def unmark_batch(
+        self,
+        strings: Iterable[str],
+        processes: int = 0,
+        threads: int = 0,
+        chunk_size: int = Defaults.BATCH_CHUNK_SIZE,
+    ) -> list[str | InvalidMarkup]:
+        """Unmarks many strings, returning the results in order. A string that
+        contains invalid markup results in its `InvalidMarkup` rather than raising.
+
+        See `Processor.render_batch` for a description of the arguments.
+        """
+
+        return self._batch(
+            method=self.unmark.__name__,
+            strings=strings,
+            processes=processes,
+            threads=threads,
+            chunk_size=chunk_size,
+        )
+
+    def _batch(
+        self,
+        method: str,
+        strings: Iterable[str],
+        processes: int,
+        threads: int,
+        chunk_size: int,
+    ) -> list[str | InvalidMarkup]:
+        if processes <= 0 and threads <= 0:
+            return _process_chunk(processor=self, method=method, strings=strings)
+
+        # Deferred as it's only needed for batches, and slows importing the add-on.
+        import concurrent.futures
+
+        chunks = _chunk(iterable=strings, size=chunk_size)
+
+        if processes <= 0:
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+                results = executor.map(
+                    functools.partial(_process_chunk, self, method),
+                    chunks,
+                )
+
+                return [result for chunk in results for result in chunk]
+
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_initialize_worker,
+            initargs=(self._marker_set,),
+        ) as executor:
+            results = executor.map(
+                _process_worker_chunk,
+                itertools.repeat(method),
+                chunks,
+            )
+
+            return [result for chunk in results for result in chunk]
+
+    def _process(
+        self, parsed: ParsedField, render: bool, offsets: list[int] | None = None
+    ) -> str | InvalidMarkup:
+        """Renders or unmarks a parsed string, returning rather than raising any
+        `InvalidMarkup`.
+
+        If given, `offsets` is filled with the offset in the result of each of the
+        string's tokens that's text, and -1 for the others. See `Processor.reparse`.
+        """
+
+        if not parsed.characters:
+            self._skip(string="")
+            _fill_offsets(
+                offsets=offsets,
+                tokens=parsed.tokens,
+                output=None,
+                characters=self._marker_set.characters,
+            )
+            return parsed.string
+
+        markers = self._marker_set.select_markers(
+            characters=parsed.characters, render=render
+        )
+        self._stats.count(
+            fast_path=not markers,
+            passes=len(markers),
+            skipped_passes=len(self._marker_set.markers) - len(markers),
+        )
+
+        if not markers:
+            _fill_offsets(
+                offsets=offsets,
+                tokens=parsed.tokens,
+                output=None,
+                characters=self._marker_set.characters,
+            )
+            return parsed.string
+
+        process_tokens = self._render_tokens if render else self._unmark_tokens
+
+        try:
+            if offsets is None:
+                return "".join(process_tokens(tokens=parsed.tokens, markers=markers))
+
+            output = list(process_tokens(tokens=parsed.tokens, markers=markers))
+        except InvalidMarkup as error:
+            return self._locate(
+                error=error, string=parsed.string, markers=markers, render=render
+            )
+
+        _fill_offsets(
+            offsets=offsets,
+            tokens=parsed.tokens,
+            output=output,
+            characters=self._marker_set.characters,
+        )
+
+        return "".join(output)
+
+    def _skip(self, string: str) -> bool:
+        """Returns whether a string contains none of the markup characters, counting
+        it as a fast path call if so. Saves parsing strings that are returned as-is."""
+
+        if self._marker_set.find_characters(string=string):
+            return False
+
+        self._stats.count(
+            fast_path=True, passes=0, skipped_passes=len(self._marker_set.markers)
+        )
+
+        return True
+
+    def _unmark_tokens(
+        self, tokens: Iterable[str], markers: Iterable[CompiledMarker]
+    ) -> Iterator[str]:
+        for index, marker in enumerate(markers):
+
+            # Removing markup can leave two runs of the same character side by side
+            # e.g. unmarking '=*=*=' leaves '==='. These must be seen as a single
+            # run by the following passes.
+            if index:
+                tokens = self._coalesce(tokens=tokens)
+
+            tokens = self._pair(
+                tokens=tokens,
+                character=marker.character,
+                length=marker.length,
+                tag_open=(),
+                tag_close=(),
+                name=marker.name,
+            )
+
+        return iter(tokens)
+
+    def _render_tokens(
+        self, tokens: Iterable[str], markers: Iterable[CompiledMarker]
+    ) -> Iterator[str]:
+        for marker in markers:
+
+            tokens = self._pair(
+                tokens=tokens,
+                character=marker.character,
+                length=marker.length,
+                tag_open=marker.tokens_open,
+                tag_close=marker.tokens_close,
+                name=marker.name,
+            )
+
+        return iter(tokens)
+
+    @staticmethod
+    def _rechunk(
+        tokens: Iterable[str], size: int = Defaults.STREAM_CHUNK_SIZE
+    ) -> Iterator[str]:
+        """Joins tokens into chunks of at least `size` characters."""
+
+        chunk: list[str] = []
+        length = 0
+
+        for token in tokens:
+
+            chunk.append(token)
+            length += len(token)
+
+            if length >= size:
+                yield "".join(chunk)
+                chunk.clear()
+                length = 0
+
+        if chunk:
+            yield "".join(chunk)
+
+    @staticmethod
+    def _coalesce(tokens: Iterable[str]) -> Iterator[str]:
+        """Merges neighbouring runs of the same markup character."""
+
+        previous = ""
+        # The tokens merged with `previous`, joined once complete so that merging
+        # many runs takes linear time.
+        merged: list[str] | None = None
+
+        for token in tokens:
+
+            if previous and previous[0] == token[0]:
+
+                if merged is None:
+                    merged = [previous]
+
+                merged.append(token)
+                continue
+
+            if merged is not None:
+                yield "".join(merged)
+                merged = None
+            elif previous:
+                yield previous
+
+            previous = token
+
+        if merged is not None:
+            yield "".join(merged)
+        elif previous:
+            yield previous
+
+    def _pair(
+        self,
+        tokens: Iterable[str],
+        character: str,
+        length: int,
+        tag_open: tuple[str, ...],
+        tag_close: tuple[str, ...],
+        name: str,
+    ) -> Iterator[str]:
+        """Replaces each pair of consecutive runs of a markup character, both of the
+        given length, with an opening and closing tag.
+
+        This mirrors how `Marker.pattern` scans a string: a run is only a markup if it
+        is exactly as long as the markup, its contents cannot contain the markup
+        character, so the closing markup is always the next run of that character,
+        and once a pair is matched, scanning resumes after its closing markup.
+        """
+
+        # The opening run followed by the tokens seen since.
+        pending: list[str] | None = None
+        # The length of the tokens following the opening run and the length at which
+        # they are checked for line-breaks and HTML.
+        size = 0
+        limit = Defaults.STREAM_BUFFER_SIZE
+        # Why an opening run was let through as the tokens following it are invalid
+        # contents. Closing it would raise.
+        invalid: str | None = None
+
+        for token in tokens:
+
+            if token[0] != character:
+
+                if pending is None:
+                    yield token
+                    continue
+
+                pending.append(token)
+                size += len(token)
+
+                # Bound the memory used by an opening run that is never closed.
+                if size > limit:
+
+                    try:
+                        self._validate_contents(contents="".join(pending[1:]))
+                    except InvalidMarkup as error:
+                        yield from pending
+                        pending = None
+                        invalid = error.reason
+                    else:
+                        limit *= 2
+
+                continue
+
+            if invalid is not None:
+
+                if len(token) == length:
+                    raise InvalidMarkup(reason=invalid, marker=name)
+
+                invalid = None
+
+            elif pending is not None:
+
+                if len(token) == length:
+
+                    contents = pending[1:]
+
+                    self._validate_contents(contents="".join(contents), marker=name)
+
+                    yield from tag_open
+                    yield from contents
+                    yield from tag_close
+
+                    pending = None
+                    continue
+
+                yield from pending
+                pending = None
+
+            if len(token) == length:
+                pending = [token]
+                size = 0
+                limit = Defaults.STREAM_BUFFER_SIZE
+            else:
+                yield token
+
+        if pending is not None:
+            yield from pending
+
+    @staticmethod
+    def _locate(
+        error: InvalidMarkup,
+        string: str,
+        markers: Iterable[CompiledMarker],
+        render: bool,
+    ) -> InvalidMarkup:
+        """Returns the `InvalidMarkup` raised by processing a string with its marker
+        and offsets filled in.
+
+        The pass raising an error may not be the first marker to find invalid markup,
+        as passes run interleaved. As this only runs for invalid strings, it instead
+        substitutes each marker's pattern in turn, exactly as the original
+        implementation did, keeping track of where the substitutions move the text.
+        """
+
+        # For every marker applied, the spans of the markups it replaced. Each as
+        # (start, end) in the string it returned and (start, end) in the string it was
+        # given.
+        passes: list[list[tuple[int, int, int, int]]] = []
+
+        for marker in markers:
+
+            tag_open = "".join(marker.tokens_open) if render else ""
+            tag_close = "".join(marker.tokens_close) if render else ""
+
+            edits: list[tuple[int, int, int, int]] = []
+            parts: list[str] = []
+            # The end of the previous match in the given string and the length of
+            # the string returned so far.
+            position = 0
+            length = 0
+
+            for match in marker.pattern.finditer(string):
+
+                start, end = match.span()
+                contents = match[Key.CONTENTS]
+
+                try:
+                    Processor._validate_contents(contents=contents, marker=marker.name)
+                except InvalidMarkup as invalid:
+                    return InvalidMarkup(
+                        reason=invalid.reason,
+                        marker=marker.name,
+                        start=_map_offset(passes=passes, offset=start, end=False),
+                        end=_map_offset(passes=passes, offset=end, end=True),
+                    )
+
+                parts += [string[position:start], tag_open, contents, tag_close]
+
+                length += start - position
+                edits.append(
+                    (length, length + len(tag_open), start, start + marker.length)
+                )
+
+                length += len(tag_open) + len(contents)
+                edits.append(
+                    (length, length + len(tag_close), end - marker.length, end)
+                )
+
+                length += len(tag_close)
+                position = end
+
+            parts.append(string[position:])
+
+            string = "".join(parts)
+            passes.append(edits)
+
+        return error
+
+    @staticmethod
+    def _validate_contents(contents: str, marker: str | None = None) -> None | NoReturn:
+        """Validates that the contents of a markup do not contain line-breaks or
+        HTML."""
+
+        # Either pattern needs one of these characters to match. Testing for them
+        # first is several times faster than searching with the patterns.
+
+        # https://stackoverflow.com/a/20056634
+        if ("\n" in contents or "\r" in contents) and LINEBREAK_RE.search(contents):
+            raise InvalidMarkup(reason=InvalidMarkup.LINEBREAK, marker=marker)
+
+        if "<" in contents and html_re().search(contents):
+            raise InvalidMarkup(reason=InvalidMarkup.HTML, marker=marker)
+
+
+# The `Processor` used by a worker process. See `Processor.render_batch`.
+_worker_processor: Processor | None = None
+
+
+def _initialize_worker(marker_set: MarkerSet) -> None:
+    global _worker_processor
+
+    _worker_processor = Processor(marker_set=marker_set)
+
+
+def _process_worker_chunk(method: str, strings: list[str]) -> list[str | InvalidMarkup]:
+    assert _worker_processor is not None
+
+    return _process_chunk(processor=_worker_processor, method=method, strings=strings)
+
+
+def _process_chunk(
+    processor: Processor, method: str, strings: Iterable[str]
+) -> list[str | InvalidMarkup]:
+    function = getattr(processor, method)
+    results: list[str | InvalidMarkup] = []
+
+    for string in strings:
+
+        try:
+            results.append(function(string=string))
+        except InvalidMarkup as error:
+            results.append(error.with_traceback(None))
+
+    return results
+
+
+# The kinds of tokens yielded by `_tokenize_html`.
+_TAG = "tag"
+_RUN = "run"
+_TEXT = "text"
+
+
+def _tokenize_html(marker_set: MarkerSet, string: str) -> Iterator[tuple[str, str]]:
+    """Splits an HTML string into its tags, the runs of markup characters outside of
+    its tags and entities, and the text between them, yielding each token with its
+    kind. Tags are found first, as their attributes may contain markup characters,
+    and entities are kept within the text."""
+
+    characters = marker_set.characters
+    position = 0
+
+    for tag in [*TAG_RE.finditer(string), None]:
+
+        end = tag.start() if tag is not None else len(string)
+        segment = string[position:end]
+        entities = [entity.span() for entity in ENTITY_RE.finditer(segment)]
+        entity = 0
+        offset = 0
+        text: list[str] = []
+
+        for token in marker_set.tokenize(string=segment):
+
+            while entity < len(entities) and entities[entity][1] <= offset:
+                entity += 1
+
+            if token[0] in characters and (
+                entity == len(entities) or entities[entity][0] >= offset + len(token)
+            ):
+
+                if text:
+                    yield ("".join(text), _TEXT)
+                    text.clear()
+
+                yield (token, _RUN)
+
+            else:
+                text.append(token)
+
+            offset += len(token)
+
+        if text:
+            yield ("".join(text), _TEXT)
+
+        if tag is not None:
+            yield (tag[0], _TAG)
+            position = tag.end()
+
+
+def _find_terms(string: str, terms: TermMatcher) -> Iterator[tuple[int, int]]:
+    """Yields the start and end offsets of the terms found in text, outside of its
+    entities."""
+
+    # Offsets within entities, where a match cannot start or end.
+    inside = {
+        offset
+        for entity in ENTITY_RE.finditer(string)
+        for offset in range(entity.start() + 1, entity.end())
+    }
+
+    for start, end in terms.find(string=string):
+        if start not in inside and end not in inside:
+            yield (start, end)
+
+
+@dataclass(frozen=True)
+class _Edit:
+    """The span of a string replaced by an edit."""
+
+    start: int
+    removed: str
+    inserted: str
+
+
+def _find_edit(previous: str, string: str) -> _Edit | None:
+    """Returns the span that differs between two strings, once their common prefix
+    and suffix are removed, or `None` if they're equal."""
+
+    if previous == string:
+        return None
+
+    size = min(len(previous), len(string))
+
+    # Strings are compared in blocks, which is far faster than character by
+    # character.
+    prefix = 0
+
+    while prefix < size:
+
+        block = min(EDIT_BLOCK_SIZE, size - prefix)
+
+        if previous[prefix : prefix + block] != string[prefix : prefix + block]:
+            while previous[prefix] == string[prefix]:
+                prefix += 1
+            break
+
+        prefix += block
+
+    suffix = 0
+    size -= prefix
+
+    while suffix < size:
+
+        block = min(EDIT_BLOCK_SIZE, size - suffix)
+
+        if (
+            previous[len(previous) - suffix - block : len(previous) - suffix]
+            != string[len(string) - suffix - block : len(string) - suffix]
+        ):
+            while previous[-suffix - 1] == string[-suffix - 1]:
+                suffix += 1
+            break
+
+        suffix += block
+
+    return _Edit(
+        start=prefix,
+        removed=previous[prefix : len(previous) - suffix],
+        inserted=string[prefix : len(string) - suffix],
+    )
+
+
+def _keeps_validity(previous: str, string: str, edit: _Edit, characters: str) -> bool:
+    """Returns whether an edit leaves the validity of the contents of every markup
+    around it unchanged.
+
+    Contents are invalid if they contain a line-break or HTML. As the contents of
+    valid markup never span these, the contents around the edit are confined to the
+    text between the nearest line-breaks and HTML before and after it, as long as
+    those contain no markup characters themselves. That text only needs checking for
+    HTML the edit may have created.
+    """
+
+    changed = edit.removed + edit.inserted
+
+    if "\n" in changed or "\r" in changed or "<" in changed or ">" in changed:
+        return False
+
+    end = edit.start + len(edit.removed)
+
+    window_start = (
+        max(previous.rfind("\n", 0, edit.start), previous.rfind("\r", 0, edit.start))
+        + 1
+    )
+    window_end = min(
+        (
+            position
+            for position in (previous.find("\n", end), previous.find("\r", end))
+            if position >= 0
+        ),
+        default=len(previous),
+    )
+
+    # The nearest HTML ending before the edit, found by trying each '<' in turn.
+    position = edit.start
+
+    while (position := previous.rfind("<", window_start, position)) >= 0:
+
+        match = html_re().match(previous, position, window_end)
+
+        if match is not None and match.end() <= edit.start:
+
+            # A run of markup characters within the HTML could start contents
+            # inside it.
+            if _contains_any(string=match[0], characters=characters):
+                return False
+
+            window_start = match.end()
+            break
+
+    # The nearest HTML starting after the edit.
+    match = html_re().search(previous, end, window_end)
+
+    if match is not None:
+
+        if _contains_any(string=match[0], characters=characters):
+            return False
+
+        window_end = match.start()
+
+    window_end += len(edit.inserted) - len(edit.removed)
+
+    return html_re().search(string, window_start, window_end) is None
+
+
+def _contains_any(string: str, characters: str) -> bool:
+    return any(character in string for character in characters)
+
+
+def _fill_offsets(
+    offsets: list[int] | None,
+    tokens: tuple[str, ...],
+    output: list[str] | None,
+    characters: str,
+) -> None:
+    """Fills `offsets` with the offset of each text token in the output tokens, or in
+    the string if they're the same. See `Processor._process`."""
+
+    if offsets is None:
+        return
+
+    starts = itertools.accumulate(map(len, tokens), initial=0)
+
+    if output is None:
+        offsets.extend(itertools.islice(starts, len(tokens)))
+        return
+
+    # Text tokens are passed through processing as-is, so are found by identity.
+    # Single characters are shared by all strings, so cannot be told apart from
+    # those of the markers' tags.
+    indexes = {
+        id(token): index
+        for index, token in enumerate(tokens)
+        if len(token) > 1 and token[0] not in characters
+    }
+    offsets.extend([-1] * len(tokens))
+    position = 0
+
+    for token in output:
+
+        index = indexes.get(id(token))
+
+        if index is not None:
+            offsets[index] = position
+
+        position += len(token)
+
+
+def _chunk(iterable: Iterable[str], size: int) -> Iterator[list[str]]:
+    iterator = iter(iterable)
+
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+class ParsedField:
+    """A string split once into runs of markup characters and the text between them,
+    which is then rendered, unmarked or analysed.
+
+    Rendering and unmarking can pair runs differently, as rendered tags may contain
+    markup characters and unmarking leaves runs side by side, so each is a separate
+    walk over the same tokens. Both results, including any `InvalidMarkup`, are kept,
+    so a cached `ParsedField` is rendered and unmarked at most once. The string is
+    only split once a result is needed, so results known beforehand, e.g. read from
+    a persistent cache, cost nothing. The tokens, which take several times the
+    memory of the string, are dropped once both results are known, unless they're
+    kept for `Processor.reparse`.
+
+    Arguments:
+        processor: The `Processor` parsing the string.
+        string: The string to parse.
+        results: Results already known for the string, keyed by `Key.MARKED` and
+            `Key.UNMARKED`.
+        offsets: Where each token sits in each result, keyed like `results`, used by
+            `Processor.reparse` to splice edits into the results. `None` doesn't
+            keep track of them.
+    """
+
+    __slots__ = (
+        "string",
+        "characters",
+        "_tokens",
+        "_processor",
+        "_results",
+        "_offsets",
+    )
+
+    def __init__(
+        self,
+        processor: Processor,
+        string: str,
+        results: Mapping[str, str | InvalidMarkup] | None = None,
+        offsets: dict[str, list[int]] | None = None,
+    ) -> None:
+        self.string = string
+        # The markup characters appearing in the string.
+        self.characters = processor.marker_set.find_characters(string=string)
+        self._tokens: tuple[str, ...] | None = None
+        self._processor = processor
+        self._results: dict[str, str | InvalidMarkup] = dict(results or {})
+        self._offsets = offsets
+
+    @property
+    def tokens(self) -> tuple[str, ...]:
+        """Returns the string's tokens, see `MarkerSet.tokenize`. Without markup
+        characters, that's the string."""
+
+        # Read once, as another thread may drop them in the meantime.
+        tokens = self._tokens
+
+        if tokens is None:
+            tokens = (
+                tuple(self._processor.marker_set.tokenize(string=self.string))
+                if self.characters
+                else (self.string,)
+                if self.string
+                else ()
+            )
+            self._tokens = tokens
+
+        return tokens
+
+    @property
+    def results(self) -> dict[str, str | InvalidMarkup]:
+        """Returns the results so far, keyed by `Key.MARKED` and `Key.UNMARKED`."""
+
+        return dict(self._results)
+
+    def render(self) -> str | NoReturn:
+        return self._result(render=True)
+
+    def unmark(self) -> str | NoReturn:
+        return self._result(render=False)
+
+    def _result(self, render: bool) -> str | NoReturn:
+        key = Key.MARKED if render else Key.UNMARKED
+
+        try:
+            result = self._results[key]
+        except KeyError:
+
+            if self._offsets is None:
+                result = self._processor._process(parsed=self, render=render)
+            else:
+                offsets: list[int] = []
+                result = self._processor._process(
+                    parsed=self, render=render, offsets=offsets
+                )
+                self._offsets[key] = offsets
+
+            self._results[key] = result
+
+            done = Key.MARKED in self._results and Key.UNMARKED in self._results
+
+            # Only fields from `Processor.reparse` are spliced into.
+            if done and self._offsets is None:
+                self._tokens = None
+
+        # Raise a copy so the kept error never holds on to a traceback.
+        if isinstance(result, InvalidMarkup):
+            raise copy.copy(result)
+
+        return result
+
+
+def _map_offset(
+    passes: list[list[tuple[int, int, int, int]]], offset: int, end: bool
+) -> int:
+    """Maps an offset in the string returned by the last of `passes` to the string
+    given to the first. An offset within a replaced markup maps to the start of the
+    markup, or its end if `end` is true. See `Processor._locate`."""
+
+    for edits in reversed(passes):
+
+        starts = [edit[0] for edit in edits]
+
+        # An end offset is exclusive, so it's not within a markup starting there.
+        if end:
+            index = bisect.bisect_left(starts, offset) - 1
+        else:
+            index = bisect.bisect_right(starts, offset) - 1
+
+        if index < 0:
+            continue
+
+        start, stop, given_start, given_stop = edits[index]
+
+        if offset < stop:
+            offset = given_stop if end else given_start
+        else:
+            offset += given_stop - stop
+
+    return offset
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import json
+import re
+
+from ..helpers import Defaults, InvalidMarkup
+from .marker import CompiledMarker, MarkerSet
+from .processor import html_re
+
+
+# Matches a possessive quantifier's '+' e.g. the second '+' in '[a-z]++'.
+POSSESSIVE_RE = re.compile(r"(?<!\\)([*+?}])\+")
+
+
+def build_script(marker_set: MarkerSet) -> str:
+    """Returns the source of a JavaScript renderer for a `MarkerSet`: the contents of
+    `renderer.js` followed by a call to its `createAnkiMarker` with the markers'
+    patterns and tags. It defines `AnkiMarker.render`, which returns the same HTML as
+    `Processor.render` and throws an `AnkiMarker.InvalidMarkup` with the same message
+    as `InvalidMarkup` would have. For example:
+
+    AnkiMarker.render("The ==lazy== dog")
+    'The <marker class="my-markers highlight">lazy</marker> dog'
+    """
+
+    config = {
+        "html": _translate_pattern(pattern=html_re().pattern),
+        "reasons": {
+            "linebreak": InvalidMarkup.LINEBREAK,
+            "html": InvalidMarkup.HTML,
+        },
+        "markers": [
+            {
+                "name": marker.name,
+                "markup": marker.markup,
+                "pattern": _marker_pattern(marker=marker),
+                "tagOpen": "".join(marker.tokens_open),
+                "tagClose": "".join(marker.tokens_close),
+            }
+            for marker in marker_set
+        ],
+    }
+
+    return (
+        f"{Defaults.RENDERER_JS_FILE.read_text(encoding='utf-8')}\n"
+        f"var AnkiMarker = createAnkiMarker({json.dumps(config, indent=4)});\n"
+        "\n"
+        'if (typeof module !== "undefined") {\n'
+        "    module.exports = AnkiMarker;\n"
+        "}\n"
+    )
+
+
+def _marker_pattern(marker: CompiledMarker) -> str:
+    """Returns `Marker.pattern` written for JavaScript's 'u' flag, under which
+    escaping a character is only allowed for regex syntax. Every markup character is
+    written as a code point instead."""
+
+    m0 = _escape(string=marker.character)
+    mf = _escape(string=marker.markup)
+
+    return rf"(?<!{m0}){mf}(?!{m0})(?<contents>[^{m0}]*?)(?<!{m0}){mf}(?!{m0})"
+
+
+def _translate_pattern(pattern: str) -> str:
+    """Returns a Python regex pattern as a JavaScript one.
+
+    Recent versions of Markdown write `HTML_RE` with possessive quantifiers, which
+    JavaScript doesn't support. These are only there to prevent backtracking, and
+    `HTML_RE` is only used to test whether a string contains HTML, so dropping them
+    finds the same strings. See `tests/test_script.py`.
+    """
+
+    return POSSESSIVE_RE.sub(r"\1", pattern)
+
+
+def _escape(string: str) -> str:
+    return "".join(rf"\u{{{ord(character):x}}}" for character in string)
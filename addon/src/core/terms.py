@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable
+
+
+class TermMatcher:
+    """A class used to find many terms in a string at once with an Aho-Corasick
+    automaton, so the cost of searching grows with the length of the string rather
+    than with the number of terms.
+
+    Matches are leftmost-longest and never overlap: of the terms found at the same
+    position, the longest one is kept, and searching resumes after it. For example,
+    with the terms `lazy`, `lazy dog` and `dog`:
+
+    The lazy dog and the dog
+    [(4, 12), (21, 24)]
+
+    Arguments:
+        terms: The terms to find. Empty and duplicate terms are ignored.
+        whole_words: Whether to only find terms which aren't part of a longer word,
+            e.g. not `cat` in `concatenate`.
+    """
+
+    __slots__ = ("_terms", "_whole_words", "_goto", "_fail", "_outputs")
+
+    def __init__(self, terms: Iterable[str], whole_words: bool = False) -> None:
+        self._terms = tuple(dict.fromkeys(term for term in terms if term))
+        self._whole_words = whole_words
+
+        # The trie of the terms. Each state maps the characters following it to the
+        # next state, and the root is state 0.
+        goto: list[dict[str, int]] = [{}]
+        # The length of the term ending at each state, if any.
+        ends = [0]
+
+        for term in self._terms:
+
+            state = 0
+
+            for character in term:
+
+                following = goto[state].get(character)
+
+                if following is None:
+                    following = goto[state][character] = len(goto)
+                    goto.append({})
+                    ends.append(0)
+
+                state = following
+
+            ends[state] = len(term)
+
+        # For each state, the state of its longest proper suffix in the trie and the
+        # lengths of the terms ending there, longest first.
+        fail = [0] * len(goto)
+        outputs: list[tuple[int, ...]] = [()] * len(goto)
+
+        queue = deque(goto[0].values())
+
+        for state in queue:
+            outputs[state] = (ends[state],) if ends[state] else ()
+
+        while queue:
+
+            state = queue.popleft()
+
+            for character, following in goto[state].items():
+
+                suffix = fail[state]
+
+                while suffix and character not in goto[suffix]:
+                    suffix = fail[suffix]
+
+                fail[following] = goto[suffix].get(character, 0)
+                outputs[following] = (
+                    (ends[following],) if ends[following] else ()
+                ) + outputs[fail[following]]
+
+                queue.append(following)
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = outputs
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    @property
+    def terms(self) -> tuple[str, ...]:
+        return self._terms
+
+    def find(self, string: str) -> list[tuple[int, int]]:
+        """Returns the start and end offsets of the terms found in a string."""
+
+        if not self._terms:
+            return []
+
+        matches: list[tuple[int, int]] = []
+
+        # A single term is faster to find with `str.find`.
+        if len(self._terms) == 1:
+
+            (term,) = self._terms
+            start = string.find(term)
+
+            while start != -1:
+                matches.append((start, start + len(term)))
+                start = string.find(term, start + 1)
+
+        else:
+
+            goto = self._goto
+            fail = self._fail
+            outputs = self._outputs
+            state = 0
+
+            for index, character in enumerate(string, start=1):
+
+                while state and character not in goto[state]:
+                    state = fail[state]
+
+                state = goto[state].get(character, 0)
+
+                for length in outputs[state]:
+                    matches.append((index - length, index))
+
+            matches.sort(key=lambda match: (match[0], -match[1]))
+
+        selected: list[tuple[int, int]] = []
+        position = 0
+
+        for start, end in matches:
+
+            if start < position:
+                continue
+
+            if self._whole_words and not _is_whole_word(string, start, end):
+                continue
+
+            selected.append((start, end))
+            position = end
+
+        return selected
+
+
+def _is_word_character(character: str) -> bool:
+    return character.isalnum() or character == "_"
+
+
+def _is_whole_word(string: str, start: int, end: int) -> bool:
+    """Returns whether the text between two offsets isn't part of a longer word."""
+
+    if start > 0 and _is_word_character(string[start - 1]):
+        if _is_word_character(string[start]):
+            return False
+
+    if end < len(string) and _is_word_character(string[end]):
+        if _is_word_character(string[end - 1]):
+            return False
+
+    return True
@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import aqt
+from aqt.qt.qt6 import (
+    QCheckBox,
+    QComboBox,
+    QDialog,
+    QDialogButtonBox,
+    QFormLayout,
+    QLabel,
+    QLineEdit,
+    QListWidget,
+    QListWidgetItem,
+    QPlainTextEdit,
+    Qt,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+from .audit import AuditResult
+from .core import Marker
+from .core.processor import ProcessorStats
+from .helpers import Defaults, Key
+from .metrics import PERCENTILES, Metrics
+
+
+class BulkDialog(QDialog):
+    """A dialog used to choose which notes and fields to unmark or render in bulk.
+
+    Arguments:
+        parent: The parent window.
+        field_names: The field names to choose from.
+    """
+
+    MODES = {
+        "Unmark": Key.UNMARKED,
+        "Render into HTML": Key.MARKED,
+    }
+
+    def __init__(self, parent: QWidget, field_names: list[str]) -> None:
+        super().__init__(parent)
+
+        self.setWindowTitle(f"{Defaults.NAME}: Process Notes")
+
+        self._search = QLineEdit("deck:current")
+
+        self._mode = QComboBox()
+        self._mode.addItems(list(self.MODES))
+
+        self._fields = QListWidget()
+
+        for name in field_names:
+            item = QListWidgetItem(name)
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Unchecked)
+            self._fields.addItem(item)
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+        )
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QFormLayout(self)
+        layout.addRow("Search", self._search)
+        layout.addRow("Action", self._mode)
+        layout.addRow("Fields", self._fields)
+        layout.addRow(buttons)
+
+    @property
+    def search(self) -> str:
+        return self._search.text()
+
+    @property
+    def mode(self) -> str:
+        return self.MODES[self._mode.currentText()]
+
+    @property
+    def field_names(self) -> list[str]:
+        items = (self._fields.item(row) for row in range(self._fields.count()))
+
+        return [
+            item.text()
+            for item in items
+            if item is not None and item.checkState() == Qt.CheckState.Checked
+        ]
+
+
+class MarkTermsDialog(QDialog):
+    """A dialog used to choose which terms to mark in which notes and fields, and with
+    which marker.
+
+    Arguments:
+        parent: The parent window.
+        field_names: The field names to choose from.
+        markers: The markers to choose from.
+    """
+
+    def __init__(
+        self, parent: QWidget, field_names: list[str], markers: list[Marker]
+    ) -> None:
+        super().__init__(parent)
+
+        self.setWindowTitle(f"{Defaults.NAME}: Mark Terms")
+
+        self._markers = {marker.name: marker for marker in markers}
+
+        self._search = QLineEdit("deck:current")
+
+        self._marker = QComboBox()
+        self._marker.addItems(list(self._markers))
+
+        self._fields = QListWidget()
+
+        for name in field_names:
+            item = QListWidgetItem(name)
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Unchecked)
+            self._fields.addItem(item)
+
+        self._terms = QPlainTextEdit()
+        self._terms.setPlaceholderText("One term per line")
+
+        self._whole_words = QCheckBox("Whole words only")
+        self._whole_words.setChecked(True)
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+        )
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QFormLayout(self)
+        layout.addRow("Search", self._search)
+        layout.addRow("Marker", self._marker)
+        layout.addRow("Fields", self._fields)
+        layout.addRow("Terms", self._terms)
+        layout.addRow("", self._whole_words)
+        layout.addRow(buttons)
+
+    @property
+    def search(self) -> str:
+        return self._search.text()
+
+    @property
+    def markup(self) -> str:
+        return self._markers[self._marker.currentText()].markup
+
+    @property
+    def field_names(self) -> list[str]:
+        items = (self._fields.item(row) for row in range(self._fields.count()))
+
+        return [
+            item.text()
+            for item in items
+            if item is not None and item.checkState() == Qt.CheckState.Checked
+        ]
+
+    @property
+    def terms(self) -> list[str]:
+        lines = (line.strip() for line in self._terms.toPlainText().splitlines())
+
+        return [line for line in lines if line]
+
+    @property
+    def whole_words(self) -> bool:
+        return self._whole_words.isChecked()
+
+
+class MetricsDialog(QDialog):
+    """A dialog showing the recorded metrics, with buttons to reset them or save them
+    to `Defaults.METRICS_JSON`.
+
+    Arguments:
+        parent: The parent window.
+        metrics: The metrics to show.
+        processor_stats: The stats of the `Processor` used by the field filters.
+    """
+
+    COLUMNS = [
+        ("Operation", None),
+        ("Field", None),
+        ("Calls", "calls"),
+        ("Invalid", "invalid"),
+        ("Total ms", "seconds"),
+        ("Mean ms", "mean_seconds"),
+        *[(f"p{percent} ms", f"p{percent}_seconds") for percent in PERCENTILES],
+        ("Max ms", "max_seconds"),
+        ("Mean chars", "mean_characters"),
+        ("Max chars", "max_characters"),
+    ]
+
+    def __init__(
+        self,
+        parent: QWidget,
+        metrics: Metrics,
+        processor_stats: ProcessorStats,
+    ) -> None:
+        super().__init__(parent)
+
+        self._metrics = metrics
+        self._processor_stats = processor_stats
+
+        self.setWindowTitle(f"{Defaults.NAME}: Metrics")
+
+        self._status = QLabel()
+        self._processor_status = QLabel()
+
+        self._table = QTableWidget(0, len(self.COLUMNS))
+        self._table.setHorizontalHeaderLabels([label for (label, _) in self.COLUMNS])
+        self._table.setSortingEnabled(True)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        reset = buttons.addButton("Reset", QDialogButtonBox.ButtonRole.ResetRole)
+        reset.clicked.connect(self._reset)
+        save = buttons.addButton("Save JSON", QDialogButtonBox.ButtonRole.ActionRole)
+        save.clicked.connect(self._save)
+        buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self._status)
+        layout.addWidget(self._table)
+        layout.addWidget(self._processor_status)
+        layout.addWidget(buttons)
+
+        self.resize(900, 400)
+        self._refresh()
+
+    def _refresh(self) -> None:
+        rows = [
+            (operation, field_name, metric)
+            for operation, fields in self._metrics.to_dict().items()
+            for field_name, metric in fields.items()
+        ]
+
+        self._table.setSortingEnabled(False)
+        self._table.setRowCount(len(rows))
+
+        for row, (operation, field_name, metric) in enumerate(rows):
+            for column, (_, key) in enumerate(self.COLUMNS):
+
+                if key is None:
+                    value = operation if column == 0 else field_name
+                elif key.endswith("seconds"):
+                    value = metric[key] * 1000
+                else:
+                    value = metric[key]
+
+                item = QTableWidgetItem()
+                # Set numbers as data so the columns sort numerically.
+                if isinstance(value, float):
+                    item.setData(Qt.ItemDataRole.DisplayRole, round(value, 3))
+                else:
+                    item.setData(Qt.ItemDataRole.DisplayRole, value)
+
+                self._table.setItem(row, column, item)
+
+        self._table.setSortingEnabled(True)
+
+        if self._metrics.enabled:
+            self._status.setText(f"Recording. {len(rows)} operations and fields.")
+        else:
+            self._status.setText(
+                f"Not recording. Set '{Key.METRICS}' to true in {Key.MARKERS_JSON}."
+            )
+
+        stats = self._processor_stats
+
+        self._processor_status.setText(
+            f"Of {stats.calls} fields rendered or unmarked since loading "
+            f"{Key.MARKERS_JSON}, {stats.fast_path} contained no markup characters. "
+            f"{stats.skipped_passes} of {stats.passes + stats.skipped_passes} marker "
+            f"passes were skipped."
+        )
+
+    def _reset(self) -> None:
+        self._metrics.reset()
+        self._refresh()
+
+    def _save(self) -> None:
+        self._metrics.dump(path=Defaults.METRICS_JSON)
+        self._status.setText(f"Saved to {Defaults.METRICS_JSON}.")
+
+
+class AuditDialog(QDialog):
+    """A dialog showing the fields found to contain invalid markup, with buttons to
+    browse their notes or save the report to `Defaults.AUDIT_JSON`.
+
+    Arguments:
+        parent: The parent window.
+        result: The result of the audit.
+    """
+
+    COLUMNS = ["Note", "Field", "Filter", "Marker", "Start", "End", "Reason", "Markup"]
+
+    def __init__(self, parent: QWidget, result: AuditResult) -> None:
+        super().__init__(parent)
+
+        self._result = result
+
+        self.setWindowTitle(f"{Defaults.NAME}: Audit")
+
+        message = (
+            f"Checked {result.fields} fields of {result.processed} of {result.notes} "
+            f"notes in {result.seconds:.1f}s. Found {len(result.issues)} fields "
+            f"containing invalid markup."
+        )
+
+        if result.cancelled:
+            message += " Cancelled before all notes were checked."
+
+        self._status = QLabel(message)
+
+        table = QTableWidget(len(result.issues), len(self.COLUMNS))
+        table.setHorizontalHeaderLabels(self.COLUMNS)
+
+        for row, issue in enumerate(result.issues):
+
+            values = [
+                issue.note_id,
+                issue.field_name,
+                issue.filter_name,
+                issue.error.marker or "",
+                issue.error.start if issue.error.start is not None else "",
+                issue.error.end if issue.error.end is not None else "",
+                issue.error.reason,
+                issue.excerpt,
+            ]
+
+            for column, value in enumerate(values):
+
+                item = QTableWidgetItem()
+                # Set numbers as data so the columns sort numerically.
+                item.setData(Qt.ItemDataRole.DisplayRole, value)
+                table.setItem(row, column, item)
+
+        table.setSortingEnabled(True)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        browse = buttons.addButton("Browse", QDialogButtonBox.ButtonRole.ActionRole)
+        browse.clicked.connect(self._browse)
+        browse.setEnabled(bool(result.issues))
+        save = buttons.addButton("Save JSON", QDialogButtonBox.ButtonRole.ActionRole)
+        save.clicked.connect(self._save)
+        buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self._status)
+        layout.addWidget(table)
+        layout.addWidget(buttons)
+
+        self.resize(900, 400)
+
+    def _browse(self) -> None:
+        note_ids = sorted({issue.note_id for issue in self._result.issues})
+
+        aqt.dialogs.open(
+            "Browser",
+            aqt.mw,
+            search=(f"nid:{','.join(str(note_id) for note_id in note_ids)}",),
+        )
+
+    def _save(self) -> None:
+        self._result.dump(path=Defaults.AUDIT_JSON)
+        self._status.setText(f"Saved to {Defaults.AUDIT_JSON}.")
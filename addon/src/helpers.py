@@ -1,8 +1,13 @@
+from __future__ import annotations
+
+import hashlib
 import os
 import pathlib
+import sys
+from typing import Any, Callable, Generic, TypeVar
+
 
-import aqt
-import aqt.utils
+T = TypeVar("T")
 
 
 def is_development_mode() -> bool:
@@ -14,9 +19,26 @@ def is_development_mode() -> bool:
 def show_info(message: str) -> None:
     """Shows the user a message related to this add-on."""
 
+    import aqt.utils
+
     aqt.utils.showInfo(f"{Defaults.NAME}: {message}")
 
 
+def show_tooltip(message: str) -> None:
+    """Briefly shows the user a message related to this add-on without interrupting
+    them."""
+
+    import aqt.utils
+
+    aqt.utils.tooltip(f"{Defaults.NAME}: {message}")
+
+
+def digest(string: str) -> str:
+    """Returns a short digest identifying a string, e.g. a field's text."""
+
+    return hashlib.blake2b(string.encode("utf-8"), digest_size=16).hexdigest()
+
+
 def escape_quotes(string: str) -> str:
     """Escapes single and double quotes within a string."""
 
@@ -26,6 +48,24 @@ def escape_quotes(string: str) -> str:
     return string
 
 
+class lazy_attribute(Generic[T]):
+    """A decorator turning a method into a class attribute computed on first access
+    and then stored on the class, replacing the decorator."""
+
+    def __init__(self, function: Callable[[Any], T]) -> None:
+        self._function = function
+        self._name = function.__name__
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self._name = name
+
+    def __get__(self, instance: object, owner: type) -> T:
+        value = self._function(owner)
+        setattr(owner, self._name, value)
+
+        return value
+
+
 class ConfigError(Exception):
     """The exception raised when the addon's configuration is missing, has JSON syntax
     errors, is missing keys, or has other general configuration errors."""
@@ -35,27 +75,84 @@ class ConfigError(Exception):
 
 class InvalidMarkup(Exception):
     """The exception raised when a string to be processed i.e. marked, unmarked or
-    rendered, contains line-breaks or HTML."""
+    rendered, contains line-breaks or HTML, or when a term to be marked contains
+    markup characters.
 
-    pass
+    Arguments:
+        reason: Either `InvalidMarkup.LINEBREAK`, `InvalidMarkup.HTML` or
+            `InvalidMarkup.MARKUP`.
+        marker: The name of the marker whose contents are invalid, if any.
+        start: The offset in the processed string at which the invalid markup
+            starts, including its opening markup, if known.
+        end: The offset at which the invalid markup ends, if known.
+    """
+
+    LINEBREAK = "contains a line-break"
+    HTML = "contains HTML"
+    MARKUP = "contains markup characters"
+
+    def __init__(
+        self,
+        reason: str = "",
+        marker: str | None = None,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> None:
+        # Passing every argument on keeps the exception picklable and copyable.
+        super().__init__(reason, marker, start, end)
+
+        self.reason = reason
+        self.marker = marker
+        self.start = start
+        self.end = end
+
+    def __str__(self) -> str:
+        message = "Invalid markup"
+
+        if self.marker is not None:
+            message += f" for '{self.marker}'"
+
+        if self.start is not None and self.end is not None:
+            message += f" at {self.start}-{self.end}"
+
+        if self.reason:
+            message += f": {self.reason}"
+
+        return message
 
 
 class Key:
     """A class defining re-usable strings."""
 
     ASSETS = "assets"
+    AUDIT_JSON = "audit.json"
+    BUNDLE_CSS = "bundle.css"
     CLASSNAME = "classname"
     CONTENTS = "contents"
+    DISK_CACHE_SIZE = "disk-cache-size"
+    DISK_CACHE_SQLITE = "cache.sqlite3"
     MAIN_CSS = "main.css"
+    MARK = "mark"
     MARKED = "marked"
     MARKER = "marker"
     MARKERS = "markers"
     MARKERS_JSON = "markers.json"
     MARKERS_CSS = "markers.css"
+    MARKERS_JS = "markers.js"
     MARKUP = "markup"
+    METRICS = "metrics"
+    METRICS_JSON = "metrics.json"
     NAME = "name"
     PARENT_CLASSNAME = "parent-classname"
+    PREVIEW_JS = "preview.js"
+    PRERENDER_CARDS = "prerender-cards"
+    RELOAD_INTERVAL = "reload-interval"
+    RENDER_CACHE_SIZE = "render-cache-size"
+    RENDER_ON_SAVE = "render-on-save"
+    RENDERED = "rendered"
+    RENDERER_JS = "renderer.js"
     SRC = "src"
+    UNMARK = "unmark"
     UNMARKED = "unmarked"
     USER_FILES = "user_files" if not is_development_mode() else "user_files_dev"
 
@@ -69,9 +166,14 @@ class Defaults:
     # are located. Anki expects this to be: `/_addons/[addon-name]/`. Hard-
     # coding the name can result in missing web assets as depending on how the
     # add-on is installed, its name will be different.
-    NAME_INTERNAL = (
-        aqt.mw.addonManager.addonFromModule(__name__) if aqt.mw is not None else NAME
-    )
+    #
+    # Resolved lazily as the add-on manager only exists once Anki has started, and
+    # so that importing this module doesn't import `aqt`.
+    @lazy_attribute
+    def NAME_INTERNAL(cls) -> str:
+        mw = getattr(sys.modules.get("aqt"), "mw", None)
+
+        return mw.addonManager.addonFromModule(__name__) if mw is not None else cls.NAME
 
     # [path-to-addon]
     ADDON_ROOT = pathlib.Path(__file__).parent.parent
@@ -80,11 +182,97 @@ class Defaults:
     # [path-to-addon]/user_files/markers.json
     MARKERS_JSON = USER_FILES / Key.MARKERS_JSON
 
+    # [path-to-addon]/src/assets/main.css
+    MAIN_CSS_FILE = ADDON_ROOT / Key.SRC / Key.ASSETS / Key.MAIN_CSS
+    # [path-to-addon]/user_files/markers.css
+    MARKERS_CSS_FILE = USER_FILES / Key.MARKERS_CSS
+    # [path-to-addon]/user_files/bundle.css, generated from `main.css` and
+    # `markers.css`.
+    BUNDLE_CSS_FILE = USER_FILES / Key.BUNDLE_CSS
+    # [path-to-addon]/user_files/metrics.json
+    METRICS_JSON = USER_FILES / Key.METRICS_JSON
+    # [path-to-addon]/user_files/audit.json
+    AUDIT_JSON = USER_FILES / Key.AUDIT_JSON
+    # [path-to-addon]/user_files/markers.js, generated from `markers.json`.
+    MARKERS_JS_FILE = USER_FILES / Key.MARKERS_JS
+    # [path-to-addon]/user_files/cache.sqlite3
+    DISK_CACHE = USER_FILES / Key.DISK_CACHE_SQLITE
+    # [path-to-addon]/user_files/rendered, holding the fields rendered on save per
+    # profile.
+    RENDERED = USER_FILES / Key.RENDERED
+    # [path-to-addon]/src/assets/renderer.js
+    RENDERER_JS_FILE = ADDON_ROOT / Key.SRC / Key.ASSETS / Key.RENDERER_JS
+
     # /_addons/[addon-name]
-    WEB_ADDON_ROOT = pathlib.Path("/") / "_addons" / NAME_INTERNAL
-    # /_addons/[addon-name]/src/assets/main.css
-    MAIN_CSS = WEB_ADDON_ROOT / Key.SRC / Key.ASSETS / Key.MAIN_CSS
-    # /_addons/[addon-name]/user_files/markers.css
-    MARKERS_CSS = WEB_ADDON_ROOT / Key.USER_FILES / Key.MARKERS_CSS
+    @lazy_attribute
+    def WEB_ADDON_ROOT(cls) -> pathlib.Path:
+        return pathlib.Path("/") / "_addons" / cls.NAME_INTERNAL
+
+    # /_addons/[addon-name]/user_files/bundle.css
+    @lazy_attribute
+    def BUNDLE_CSS(cls) -> pathlib.Path:
+        return cls.WEB_ADDON_ROOT / Key.USER_FILES / Key.BUNDLE_CSS
+
+    # /_addons/[addon-name]/user_files/markers.js
+    @lazy_attribute
+    def MARKERS_JS(cls) -> pathlib.Path:
+        return cls.WEB_ADDON_ROOT / Key.USER_FILES / Key.MARKERS_JS
+
+    # /_addons/[addon-name]/src/assets/preview.js
+    @lazy_attribute
+    def PREVIEW_JS(cls) -> pathlib.Path:
+        return cls.WEB_ADDON_ROOT / Key.SRC / Key.ASSETS / Key.PREVIEW_JS
 
     INVALID_CHARACTERS = r""" & " ' > < \ / ; """.split()
+
+    # The number of processed fields kept in memory.
+    RENDER_CACHE_SIZE = 2048
+
+    # The number of processed fields kept on disk across sessions.
+    DISK_CACHE_SIZE = 50_000
+
+    # The length of the longest processed field written to disk.
+    DISK_CACHE_RESULT_SIZE = 2**20
+
+    # The number of seconds between writing newly processed fields to disk.
+    DISK_CACHE_FLUSH_INTERVAL = 60.0
+
+    # The number of upcoming review cards whose fields are rendered in the background.
+    PRERENDER_CARDS = 5
+
+    # Whether to render fields when their note is saved rather than when displayed.
+    RENDER_ON_SAVE = False
+
+    # The number of fields rendered on save kept per profile.
+    RENDER_STORE_SIZE = 20_000
+
+    # The number of seconds between checking the configuration files for changes.
+    RELOAD_INTERVAL = 2.0
+
+    # Whether to record how long field filters and editor actions take.
+    METRICS = False
+
+    # The number of recent latencies kept per operation and field to estimate
+    # percentiles.
+    METRICS_SAMPLE_SIZE = 1000
+
+    # The number of strings sent to a worker process at once when batch processing.
+    BATCH_CHUNK_SIZE = 512
+
+    # The number of notes loaded and saved at once when processing notes in bulk.
+    BULK_CHUNK_SIZE = 1000
+
+    # The number of worker processes checking notes for invalid markup, leaving one
+    # processor for Anki.
+    AUDIT_PROCESSES = max((os.cpu_count() or 1) - 1, 1)
+
+    # The number of characters of invalid markup shown when reporting it.
+    AUDIT_EXCERPT_SIZE = 60
+
+    # The minimum length of the chunks yielded when rendering or unmarking a string
+    # in chunks.
+    STREAM_CHUNK_SIZE = 2**13
+
+    # The length of text held after an unclosed markup before checking whether it
+    # can still be marked. Doubles after every check.
+    STREAM_BUFFER_SIZE = 2**13
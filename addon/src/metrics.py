@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import json
+import math
+import pathlib
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+from .helpers import Defaults, InvalidMarkup
+
+
+T = TypeVar("T")
+
+PERCENTILES = [50, 90, 99]
+
+
+@dataclass
+class Metric:
+    """A class used to record the calls of one operation on one field."""
+
+    calls: int = 0
+    # The number of calls raising `InvalidMarkup`.
+    invalid: int = 0
+    seconds: float = 0.0
+    characters: int = 0
+    max_seconds: float = 0.0
+    max_characters: int = 0
+    # The latencies of the most recent calls, used to estimate percentiles.
+    samples: deque[float] = field(
+        default_factory=lambda: deque(maxlen=Defaults.METRICS_SAMPLE_SIZE)
+    )
+
+    def record(self, seconds: float, size: int, invalid: bool) -> None:
+        self.calls += 1
+        self.invalid += invalid
+        self.seconds += seconds
+        self.characters += size
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.max_characters = max(self.max_characters, size)
+        self.samples.append(seconds)
+
+    def to_dict(self) -> dict[str, Any]:
+        samples = sorted(self.samples)
+
+        return {
+            "calls": self.calls,
+            "invalid": self.invalid,
+            "seconds": self.seconds,
+            "mean_seconds": self.seconds / self.calls if self.calls else 0.0,
+            "max_seconds": self.max_seconds,
+            **{
+                f"p{percent}_seconds": percentile(samples=samples, percent=percent)
+                for percent in PERCENTILES
+            },
+            "characters": self.characters,
+            "mean_characters": self.characters / self.calls if self.calls else 0.0,
+            "max_characters": self.max_characters,
+        }
+
+
+class Metrics:
+    """A class used to measure how long the add-on's field filters and editor actions
+    take, per operation and field name.
+
+    When disabled, calls pass straight through without being timed or recorded.
+
+    Arguments:
+        enabled: Whether to record calls.
+    """
+
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self._metrics: dict[tuple[str, str], Metric] = {}
+
+    def call(
+        self,
+        operation: str,
+        field_name: str,
+        size: int,
+        function: Callable[[], T],
+    ) -> T:
+        """Returns the result of calling `function`, recording its latency and any
+        `InvalidMarkup` it raises. For example:
+
+        metrics.call(
+            operation="marked",
+            field_name="Front",
+            size=len(string),
+            function=lambda: processor.render(string=string),
+        )
+        """
+
+        if not self.enabled:
+            return function()
+
+        invalid = False
+        start = time.perf_counter()
+
+        try:
+            return function()
+        except InvalidMarkup:
+            invalid = True
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+
+            key = (operation, field_name)
+
+            try:
+                metric = self._metrics[key]
+            except KeyError:
+                metric = self._metrics[key] = Metric()
+
+            metric.record(seconds=seconds, size=size, invalid=invalid)
+
+    def reset(self) -> None:
+        self._metrics.clear()
+
+    def to_dict(self) -> dict[str, dict[str, dict[str, Any]]]:
+        """Returns the recorded metrics keyed by operation and then field name."""
+
+        data: dict[str, dict[str, dict[str, Any]]] = {}
+
+        for (operation, field_name), metric in sorted(self._metrics.items()):
+            data.setdefault(operation, {})[field_name] = metric.to_dict()
+
+        return data
+
+    def dump(self, path: pathlib.Path) -> None:
+        """Writes the recorded metrics to a JSON file."""
+
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    """Returns the nearest-rank percentile of sorted samples."""
+
+    if not samples:
+        return 0.0
+
+    rank = math.ceil(percent / 100 * len(samples))
+
+    return samples[max(rank, 1) - 1]
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any
+
+from .core import ParsedField, Processor
+from .helpers import InvalidMarkup, Key
+
+
+# Matches a field passed as-is to the `marked` or `unmarked` filter, capturing the
+# filter and the field name, e.g. `{{marked:Front}}` or `{{text:unmarked:Back}}`.
+# Filters are applied from right to left, so only the last one receives the field's
+# text rather than the output of another filter.
+FILTER_RE = re.compile(r"\{\{\s*(?:[^{}:]*:)*?(marked|unmarked):([^{}:]+)\}\}")
+
+
+def find_filtered_fields(templates: Iterable[str]) -> set[tuple[str, str]]:
+    """Returns the fields passed as-is to the `marked` or `unmarked` filters in the
+    given card templates, as the filter and field names."""
+
+    return {
+        (match[1], match[2].strip())
+        for template in templates
+        for match in FILTER_RE.finditer(template)
+    }
+
+
+def notetype_templates(notetype: Mapping[str, Any]) -> list[str]:
+    """Returns the front and back templates of every card type of a note type."""
+
+    return [
+        template[side] for template in notetype["tmpls"] for side in ("qfmt", "afmt")
+    ]
+
+
+def prerender(
+    processor: Processor,
+    fields: Iterable[tuple[str, str]],
+    load: Callable[[str], Mapping[str, str | InvalidMarkup]] | None = None,
+    want_cancel: Callable[[], bool] | None = None,
+) -> list[ParsedField]:
+    """Parses, then renders or unmarks fields ahead of them being displayed, so the
+    `ParsedField`s returned can be cached and displaying them is a lookup.
+
+    Only the strings given are touched, never the collection, so this is meant to be
+    run off the main thread. Fields with the same text share a `ParsedField`.
+
+    Arguments:
+        processor: The `Processor` used to process the fields.
+        fields: The fields to process, given as the filter applied, either
+            `Key.MARKED` or `Key.UNMARKED`, and the field text.
+        load: Called with a field's text before parsing it, returning any results
+            already known for it. See `ParsedField`.
+        want_cancel: Called before every field. Stops processing when it returns
+            `True`, returning the fields processed so far.
+    """
+
+    parsed: dict[str, ParsedField] = {}
+
+    for filter_name, field_text in fields:
+
+        if want_cancel is not None and want_cancel():
+            break
+
+        field = parsed.get(field_text)
+
+        if field is None:
+            field = parsed[field_text] = processor.parse(
+                string=field_text,
+                results=load(field_text) if load is not None else None,
+            )
+
+        # Invalid markup is kept by the `ParsedField` like any other result.
+        try:
+            if filter_name == Key.MARKED:
+                field.render()
+            else:
+                field.unmark()
+        except InvalidMarkup:
+            pass
+
+    return list(parsed.values())
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import copy
+import json
+import pathlib
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import NoReturn
+
+from .core import Processor
+from .helpers import InvalidMarkup, digest
+
+
+# A field's note id and name.
+FieldKey = tuple[int, str]
+
+
+class RenderStore:
+    """A class used to keep fields rendered when their note is saved, so displaying
+    them doesn't render them again.
+
+    Entries are keyed by note id and field name, and hold a digest of the field text
+    they were rendered from. A stored result is only returned for identical text, so
+    a note edited elsewhere, or a field filtered before being rendered, is simply a
+    miss. Only fields containing markup characters are stored, as the rest are
+    returned as-is by the `Processor` anyway. Once full, the least recently used
+    fields are removed.
+
+    Fields are stored and looked up on the main thread, but deleted notes are
+    discarded from the collection's thread, so the fields are only accessed under a
+    lock. Fields are rendered outside of it.
+
+    Arguments:
+        fingerprint: The `MarkerSet.fingerprint` of the markers used to render the
+            stored fields.
+        capacity: The maximum number of fields to keep.
+    """
+
+    def __init__(self, fingerprint: str, capacity: int) -> None:
+        self._fingerprint = fingerprint
+        self._capacity = capacity
+        self._entries: OrderedDict[
+            FieldKey, tuple[str, str | InvalidMarkup]
+        ] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def fingerprint(self) -> str:
+        return self._fingerprint
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def get(
+        self, note_id: int, field_name: str, field_text: str
+    ) -> str | None | NoReturn:
+        """Returns the stored rendering of a field if it was rendered from the same
+        text, otherwise `None`. Re-raises the `InvalidMarkup` it was stored with."""
+
+        key = (note_id, field_name)
+        field_digest = digest(string=field_text)
+
+        with self._lock:
+
+            try:
+                stored_digest, result = self._entries[key]
+            except KeyError:
+                return None
+
+            if stored_digest != field_digest:
+                return None
+
+            self._entries.move_to_end(key)
+
+        if isinstance(result, InvalidMarkup):
+            # Raise a copy so the stored error never holds on to a traceback.
+            raise copy.copy(result)
+
+        return result
+
+    def update(
+        self, processor: Processor, note_id: int, fields: Iterable[tuple[str, str]]
+    ) -> None:
+        """Renders and stores the fields, given as names and texts, of a note. Fields
+        already stored with the same text aren't rendered again."""
+
+        for field_name, field_text in fields:
+
+            key = (note_id, field_name)
+
+            if not processor.marker_set.find_characters(string=field_text):
+                with self._lock:
+                    self._entries.pop(key, None)
+                continue
+
+            field_digest = digest(string=field_text)
+
+            with self._lock:
+                entry = self._entries.get(key)
+
+            if entry is not None and entry[0] == field_digest:
+                continue
+
+            result: str | InvalidMarkup
+
+            try:
+                result = processor.render(string=field_text)
+            except InvalidMarkup as error:
+                result = error.with_traceback(None)
+
+            with self._lock:
+                self._store(key=key, entry=(field_digest, result))
+
+    def merge(self, store: RenderStore) -> None:
+        """Adds the fields of another store as the most recently used, e.g. those
+        stored while this one was being loaded. Removes all the fields first if they
+        were rendered with other markers than the other store's."""
+
+        with store._lock:
+            fingerprint = store._fingerprint
+            entries = list(store._entries.items())
+
+        self.reset(fingerprint=fingerprint)
+
+        with self._lock:
+            for key, entry in entries:
+                self._store(key=key, entry=entry)
+
+    def discard(self, note_ids: Iterable[int]) -> None:
+        """Removes the fields of the given notes."""
+
+        note_ids = set(note_ids)
+
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in note_ids]:
+                del self._entries[key]
+
+    def reset(self, fingerprint: str) -> None:
+        """Removes all the fields if they were rendered with other markers."""
+
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                self._entries.clear()
+                self._fingerprint = fingerprint
+
+    def dump(self, path: pathlib.Path) -> None:
+        """Writes the stored fields to a JSON file, from least to most recently
+        used."""
+
+        with self._lock:
+            fingerprint = self._fingerprint
+            items = list(self._entries.items())
+
+        entries = []
+
+        for (note_id, field_name), (field_digest, result) in items:
+
+            entry = {"note": note_id, "field": field_name, "digest": field_digest}
+
+            if isinstance(result, InvalidMarkup):
+                entry["error"] = list(result.args)
+            else:
+                entry["rendered"] = result
+
+            entries.append(entry)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "fields": entries}, f)
+
+    @classmethod
+    def load(cls, path: pathlib.Path, fingerprint: str, capacity: int) -> RenderStore:
+        """Reads the stored fields from a JSON file written by `RenderStore.dump`,
+        keeping the most recently used ones if there are more than `capacity`. A
+        missing or unreadable file, or one written for other markers, is an empty
+        store."""
+
+        store = cls(fingerprint=fingerprint, capacity=capacity)
+
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return store
+
+        if data.get("fingerprint") != fingerprint:
+            return store
+
+        for entry in data.get("fields", [])[-capacity:] if capacity > 0 else []:
+
+            result = (
+                InvalidMarkup(*entry["error"])
+                if "error" in entry
+                else entry["rendered"]
+            )
+
+            store._entries[(entry["note"], entry["field"])] = (entry["digest"], result)
+
+        return store
+
+    def _store(self, key: FieldKey, entry: tuple[str, str | InvalidMarkup]) -> None:
+        """Stores a field, evicting the least recently used ones over capacity. Only
+        called under the lock."""
+
+        if self._capacity <= 0:
+            return
+
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import os
+import pathlib
+from collections.abc import Iterable
+from typing import Optional
+
+
+# A file's modification time in nanoseconds and its size, or `None` if it's missing.
+FileState = Optional[tuple[int, int]]
+
+
+class FileWatcher:
+    """A class used to cheaply detect changes to files by comparing their modification
+    time and size, rather than their contents.
+
+    Arguments:
+        paths: The files to watch. Files are allowed to be missing.
+    """
+
+    def __init__(self, paths: Iterable[pathlib.Path]) -> None:
+        self._states = {path: self._stat(path=path) for path in paths}
+
+    @property
+    def paths(self) -> list[pathlib.Path]:
+        return list(self._states)
+
+    def poll(self) -> list[pathlib.Path]:
+        """Returns the paths which changed since they were last polled. A file that
+        changes while being written to can be returned on consecutive polls."""
+
+        changed = []
+
+        for path, previous in self._states.items():
+
+            state = self._stat(path=path)
+
+            if state != previous:
+                self._states[path] = state
+                changed.append(path)
+
+        return changed
+
+    @staticmethod
+    def _stat(path: pathlib.Path) -> FileState:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        return (stat.st_mtime_ns, stat.st_size)
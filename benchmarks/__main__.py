@@ -0,0 +1,251 @@
+"""Benchmarks the `Processor` and `Config` without Anki.
+
+Usage, from the repository root:
+
+    # Print results as JSON.
+    python -m benchmarks
+
+    # Store a baseline.
+    python -m benchmarks --output benchmarks/baseline.json
+
+    # Compare against the baseline, exiting with 1 if any benchmark's throughput
+    # dropped by more than 10%.
+    python -m benchmarks --baseline benchmarks/baseline.json --threshold 0.1
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import pathlib
+import platform
+import sys
+import timeit
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+
+from addon.src.core.config import Config
+from addon.src.core.marker import MarkerSet
+from addon.src.core.processor import Processor
+
+from .corpus import ADVERSARIAL, Corpus, build_adversarial, build_config
+
+
+# Every corpus varies one parameter of the default corpus.
+CORPORA = [
+    Corpus(),
+    Corpus(length=200),
+    Corpus(length=20_000),
+    Corpus(density=0.0),
+    Corpus(density=0.5),
+    Corpus(markers=1),
+    Corpus(markers=10),
+    Corpus(html=False),
+    Corpus(entities=False),
+]
+
+# Throughput on adversarial fields should stay flat as their length grows.
+ADVERSARIAL_LENGTHS = [1_000, 10_000, 100_000]
+
+SELECTIONS = [20, 200]
+
+CONFIG_SIZES = [1, 10, 50]
+
+
+@dataclass
+class Benchmark:
+    name: str
+    function: Callable[[], object]
+    # The number of characters processed per call, if applicable.
+    size: int = 0
+
+
+@dataclass
+class Result:
+    name: str
+    seconds: float
+    ops_per_second: float
+    chars_per_second: float
+
+
+def parse_render_unmark(processor: Processor, field: str) -> None:
+    parsed = processor.parse(string=field)
+    parsed.render()
+    parsed.unmark()
+
+
+def iter_benchmarks() -> Iterator[Benchmark]:
+    for corpus in CORPORA:
+
+        processor = Processor(marker_set=MarkerSet.from_markers(corpus.build_markers()))
+        field = corpus.build_field()
+
+        # Bind the loop variables to avoid late binding.
+        yield Benchmark(
+            name=f"render[{corpus.name}]",
+            function=lambda p=processor, f=field: p.render(string=f),
+            size=len(field),
+        )
+        yield Benchmark(
+            name=f"unmark[{corpus.name}]",
+            function=lambda p=processor, f=field: p.unmark(string=f),
+            size=len(field),
+        )
+        # Both outputs of a field from one parse, as the field filters do.
+        yield Benchmark(
+            name=f"parse+render+unmark[{corpus.name}]",
+            function=lambda p=processor, f=field: parse_render_unmark(p, f),
+            size=len(field),
+        )
+
+    processor = Processor(marker_set=MarkerSet.from_markers(Corpus().build_markers()))
+
+    for name in ADVERSARIAL:
+        for length in ADVERSARIAL_LENGTHS:
+
+            field = build_adversarial(name=name, length=length)
+
+            yield Benchmark(
+                name=f"render[adversarial={name},length={length}]",
+                function=lambda f=field: processor.render(string=f),
+                size=len(field),
+            )
+            yield Benchmark(
+                name=f"unmark[adversarial={name},length={length}]",
+                function=lambda f=field: processor.unmark(string=f),
+                size=len(field),
+            )
+
+    for length in SELECTIONS:
+
+        selection = Corpus(length=length, density=0.0, html=False).build_field()
+
+        yield Benchmark(
+            name=f"mark[length={length}]",
+            function=lambda s=selection: processor.mark(string=s, markup="=="),
+            size=len(selection),
+        )
+
+    for count in CONFIG_SIZES:
+
+        data = build_config(count=count)
+
+        yield Benchmark(
+            name=f"config[markers={count}]",
+            function=lambda d=data: Config(data=d),
+        )
+
+
+def measure(benchmark: Benchmark, repeat: int) -> Result:
+    """Times a benchmark, keeping the fastest of `repeat` runs. Each run calls the
+    benchmark as many times as fits in roughly 0.2 seconds."""
+
+    timer = timeit.Timer(benchmark.function)
+    number, _ = timer.autorange()
+    seconds = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    return Result(
+        name=benchmark.name,
+        seconds=seconds,
+        ops_per_second=1 / seconds,
+        chars_per_second=benchmark.size / seconds,
+    )
+
+
+def compare(
+    results: list[Result], baseline: dict, threshold: float
+) -> list[tuple[str, float]]:
+    """Returns the name and relative change in throughput of every benchmark that
+    regressed by more than `threshold` compared to the baseline."""
+
+    previous = {result["name"]: result for result in baseline["results"]}
+    regressions = []
+
+    for result in results:
+
+        if result.name not in previous:
+            continue
+
+        change = result.ops_per_second / previous[result.name]["ops_per_second"] - 1
+
+        print(f"{change:+8.1%}  {result.name}", file=sys.stderr)
+
+        if change < -threshold:
+            regressions.append((result.name, change))
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument(
+        "--output",
+        type=pathlib.Path,
+        help="Write the results to this file instead of printing them.",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=pathlib.Path,
+        help="Compare the results to a file previously written with --output.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="The largest allowed drop in throughput e.g. 0.1 for 10%%.",
+    )
+    parser.add_argument(
+        "--filter",
+        default="",
+        help="Only run benchmarks whose name contains this string.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="The number of timed runs per benchmark.",
+    )
+    args = parser.parse_args()
+
+    results = []
+
+    for benchmark in iter_benchmarks():
+
+        if args.filter not in benchmark.name:
+            continue
+
+        result = measure(benchmark=benchmark, repeat=args.repeat)
+        results.append(result)
+
+        print(
+            f"{result.seconds * 1e6:12.2f}us  {result.name}",
+            file=sys.stderr,
+        )
+
+    output = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "results": [dataclasses.asdict(result) for result in results],
+    }
+
+    if args.output is None:
+        print(json.dumps(output, indent=4))
+    else:
+        args.output.write_text(json.dumps(output, indent=4) + "\n")
+
+    if args.baseline is None:
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    regressions = compare(results=results, baseline=baseline, threshold=args.threshold)
+
+    for name, change in regressions:
+        print(f"Regression: {name} ({change:+.1%})", file=sys.stderr)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
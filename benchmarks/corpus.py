@@ -0,0 +1,146 @@
+"""Synthetic, reproducible corpora used to benchmark the `Processor`."""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+
+from addon.src.core.marker import Marker
+from addon.src.helpers import Key
+
+
+# Markups are picked in this order, so a set of N markers always uses the first N.
+MARKUPS = ["*", "~~", "==", "**", "^", "~", "__", "++", "%", "_"]
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud "
+    "exercitation ullamco laboris nisi aliquip ex ea commodo consequat"
+).split()
+
+TAGS = [("<b>", "</b>"), ("<i>", "</i>"), ("<span>", "</span>")]
+ENTITIES = ["&nbsp;", "&amp;", "&lt;", "&#38;", "&#x26;"]
+
+
+@dataclass(frozen=True)
+class Corpus:
+    """The parameters of a synthetic field.
+
+    Arguments:
+        length: The approximate length of the field in characters.
+        density: The fraction of words that are marked.
+        markers: The number of markers configured.
+        html: Whether words are wrapped in HTML tags and lines separated by '<br>'s.
+        entities: Whether HTML entities are mixed in.
+    """
+
+    length: int = 2000
+    density: float = 0.1
+    markers: int = 4
+    html: bool = True
+    entities: bool = True
+
+    @property
+    def name(self) -> str:
+        return (
+            f"length={self.length},density={self.density},markers={self.markers},"
+            f"html={int(self.html)},entities={int(self.entities)}"
+        )
+
+    def build_markers(self) -> list[Marker]:
+        return build_markers(count=self.markers)
+
+    def build_field(self, seed: int = 0) -> str:
+        """Builds a field from random words. Marked words never contain HTML, so the
+        field never contains invalid markup."""
+
+        rng = random.Random(seed)
+        markups = MARKUPS[: self.markers]
+        parts: list[str] = []
+        size = 0
+
+        while size < self.length:
+
+            word = rng.choice(WORDS)
+
+            if self.entities and rng.random() < 0.05:
+                word = f"{word}{rng.choice(ENTITIES)}"
+
+            if rng.random() < self.density:
+                markup = rng.choice(markups)
+                word = f"{markup}{word}{markup}"
+            elif self.html and rng.random() < 0.05:
+                tag_open, tag_close = rng.choice(TAGS)
+                word = f"{tag_open}{word}{tag_close}"
+
+            if self.html and rng.random() < 0.02:
+                word = f"{word}<br>"
+
+            parts.append(word)
+            size += len(word) + 1
+
+        return " ".join(parts)
+
+
+# Repeated to build fields crafted to be slow to scan, for the first four markers:
+# '*', '~~', '==' and '**'. None of them contain invalid markup.
+ADVERSARIAL = {
+    # A single run of a markup character, as in a separator line.
+    "run": "*",
+    # Runs of every length around a markup's, as in ASCII art.
+    "lengths": "~ ~~ ~~~ ~~~~ ",
+    # Openers which are never closed as the next run is longer.
+    "unclosed": "~~ lorem ~~~ ipsum ",
+    # Runs of different characters side by side.
+    "alternating": "*~=",
+    # As many marked words as possible.
+    "dense": "*a*",
+    # Openers followed by text resembling, but not quite, HTML.
+    "tags": "*<b ",
+}
+
+
+def build_adversarial(name: str, length: int) -> str:
+    """Builds an adversarial field of exactly `length` characters."""
+
+    unit = ADVERSARIAL[name]
+
+    return (unit * (length // len(unit) + 1))[:length]
+
+
+def build_markers(count: int) -> list[Marker]:
+    """Builds `count` markers. Beyond the markups in `MARKUPS`, longer runs of the same
+    characters are used."""
+
+    markers = []
+
+    for index in range(count):
+
+        base = MARKUPS[index % len(MARKUPS)]
+        markup = base[0] * (len(base) + 2 * (index // len(MARKUPS)))
+
+        markers.append(
+            Marker(
+                name=f"Marker{index}",
+                markup=markup,
+                classnames=["benchmark", f"marker{index}"],
+            )
+        )
+
+    return markers
+
+
+def build_config(count: int) -> dict:
+    """Builds the raw data of a configuration with `count` markers."""
+
+    return {
+        Key.PARENT_CLASSNAME: "benchmark",
+        Key.MARKERS: [
+            {
+                Key.NAME: marker.name,
+                Key.MARKUP: marker.markup,
+                Key.CLASSNAME: marker.classnames[-1],
+            }
+            for marker in build_markers(count=count)
+        ],
+    }
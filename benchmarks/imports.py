@@ -0,0 +1,86 @@
+"""Measures how long importing the add-on's modules takes in a fresh interpreter.
+
+Usage, from the repository root:
+
+    python -m benchmarks.imports
+
+Each module is imported in a new process with `python -X importtime`, keeping the
+fastest cumulative time of `--repeat` runs. `markdown` and `aqt` are included for
+reference, modules that can't be imported are skipped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+
+
+MODULES = [
+    "addon.src.core",
+    "markdown",
+    "aqt",
+]
+
+
+def measure(module: str, repeat: int) -> float | None:
+    """Returns the fastest cumulative import time of a module in seconds, or `None`
+    if it can't be imported."""
+
+    timings = []
+
+    for _ in range(repeat):
+
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+        )
+
+        if process.returncode != 0:
+            return None
+
+        # Lines are formatted as: "import time: [self] | [cumulative] | [name]", with
+        # times in microseconds.
+        for line in process.stderr.splitlines():
+
+            _, cumulative, name = line.split("|")
+
+            if name.strip() == module:
+                timings.append(int(cumulative) / 1e6)
+
+    return min(timings) if timings else None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.imports")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="The number of timed imports per module.",
+    )
+    args = parser.parse_args()
+
+    results = {}
+
+    for module in MODULES:
+
+        seconds = measure(module=module, repeat=args.repeat)
+
+        if seconds is None:
+            print(f"{'skipped':>14}  {module}", file=sys.stderr)
+            continue
+
+        results[module] = seconds
+
+        print(f"{seconds * 1e3:12.2f}ms  {module}", file=sys.stderr)
+
+    print(json.dumps(results, indent=4))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
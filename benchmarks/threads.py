@@ -0,0 +1,118 @@
+"""Measures how rendering in batches scales with the number of threads sharing one
+`Processor`.
+
+Usage, from the repository root:
+
+    python -m benchmarks.threads
+
+    # Up to 8 threads over 20,000 fields.
+    python -m benchmarks.threads --threads 8 --fields 20000
+
+Each field is a different synthetic field of the default corpus. Throughput only
+grows with the number of threads on free-threaded builds of Python, e.g.
+`python3.13t`, where it should grow nearly linearly up to the number of cores. With
+the GIL it should stay roughly flat.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from addon.src.core.marker import MarkerSet
+from addon.src.core.processor import Processor
+
+from .corpus import Corpus
+
+
+def measure(
+    processor: Processor, fields: list[str], threads: int, repeat: int
+) -> float:
+    """Returns the fastest time of `repeat` runs rendering the fields in batches
+    spread across `threads` threads."""
+
+    timings = []
+
+    for _ in range(repeat):
+
+        start = time.perf_counter()
+        processor.render_batch(strings=fields, threads=threads, chunk_size=64)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.threads")
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="The largest number of threads to measure.",
+    )
+    parser.add_argument(
+        "--fields",
+        type=int,
+        default=5000,
+        help="The number of fields rendered per run.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="The number of timed runs per number of threads.",
+    )
+    args = parser.parse_args()
+
+    corpus = Corpus(length=500)
+    processor = Processor(marker_set=MarkerSet.from_markers(corpus.build_markers()))
+    fields = [corpus.build_field(seed=seed) for seed in range(args.fields)]
+
+    # `sys._is_gil_enabled` only exists from Python 3.13.
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)
+
+    results = []
+
+    for threads in range(1, args.threads + 1):
+
+        seconds = measure(
+            processor=processor, fields=fields, threads=threads, repeat=args.repeat
+        )
+        fields_per_second = len(fields) / seconds
+
+        results.append(
+            {
+                "threads": threads,
+                "seconds": seconds,
+                "fields_per_second": fields_per_second,
+                "speedup": fields_per_second / results[0]["fields_per_second"]
+                if results
+                else 1.0,
+            }
+        )
+
+        print(
+            f"{fields_per_second:12.0f}/s  x{results[-1]['speedup']:.2f}  "
+            f"threads={threads}",
+            file=sys.stderr,
+        )
+
+    output = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "gil": is_gil_enabled(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+
+    print(json.dumps(output, indent=4))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,7 +10,13 @@ cd "$root/addon"
 zip                                       \
     "$root/bundle/AnkiMarker.ankiaddon" * \
     --recurse-paths                       \
-    --exclude "**/.*"                     \
+    --exclude                             \
+        "**/.*"                           \
+        "./user_files/markers.js"         \
+        "./user_files/bundle.css"         \
+        "./user_files/audit.json"         \
+        "./user_files/rendered/*"         \
+        "./user_files/cache.sqlite3*"     \
     --include                             \
         "./src/**.py"                     \
         "./src/assets/**"                 \
@@ -1,7 +1,17 @@
+from __future__ import annotations
+
+import pathlib
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
 import pytest
 
-from addon.src.marker import Marker
-from addon.src.processor import Processor
+from addon.src.core.marker import Marker, MarkerSet
+from addon.src.core.processor import Processor
+
+
+if TYPE_CHECKING:
+    from anki.collection import Collection
 
 
 @pytest.fixture(scope="session")
@@ -32,4 +42,34 @@ def markers() -> list[Marker]:
 
 @pytest.fixture(scope="session")
 def marker(markers: list[Marker]) -> Processor:
-    return Processor(markers=markers)
+    return Processor(marker_set=MarkerSet.from_markers(markers))
+
+
+@pytest.fixture
+def notes() -> list[tuple[str, str]]:
+    """The front and back of each note added to `col`. Overridden by test modules."""
+
+    return []
+
+
+@pytest.fixture
+def col(tmp_path: pathlib.Path, notes: list[tuple[str, str]]) -> Iterator[Collection]:
+    """A collection containing a "Basic" note for each of `notes`."""
+
+    # Deferred so tests which don't need a collection run without Anki installed.
+    from anki.collection import Collection
+
+    col = Collection(str(tmp_path / "collection.anki2"))
+
+    notetype = col.models.by_name("Basic")
+    assert notetype is not None
+
+    for front, back in notes:
+        note = col.new_note(notetype)
+        note["Front"] = front
+        note["Back"] = back
+        col.add_note(note, col.decks.id("Default"))
+
+    yield col
+
+    col.close()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+import pathlib
+
+import pytest
+from anki.collection import Collection
+
+from addon.src.audit import AuditResult, audit_notes
+from addon.src.core.processor import Processor
+from addon.src.helpers import InvalidMarkup, Key
+
+
+@pytest.fixture
+def notes() -> list[tuple[str, str]]:
+    return [
+        ("*ABC* DEF", "*A<b>B</b>C*"),
+        ("ABC *DEF*", "ABC"),
+        ("ABC *DE\nF*", "*ABC*"),
+        ("ABC", "ABC"),
+    ]
+
+
+@pytest.fixture
+def col(col: Collection) -> Collection:
+    notetype = col.models.by_name("Basic")
+    assert notetype is not None
+
+    notetype["tmpls"][0]["qfmt"] = "{{marked:Front}}"
+    notetype["tmpls"][0]["afmt"] = "{{FrontSide}}<hr>{{unmarked:Back}}"
+    col.models.update_dict(notetype)
+
+    # Fields of note types without the filters aren't checked.
+    notetype = col.models.by_name("Basic (and reversed card)")
+    assert notetype is not None
+
+    note = col.new_note(notetype)
+    note["Front"] = "*A<b>B</b>C*"
+    col.add_note(note, col.decks.id("Default"))
+
+    return col
+
+
+def issues(result: AuditResult) -> list[tuple[str, str, str | None, int | None]]:
+    return [
+        (issue.field_name, issue.filter_name, issue.error.marker, issue.error.start)
+        for issue in result.issues
+    ]
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test__audit(col: Collection, marker: Processor, processes: int) -> None:
+    progress: list[int] = []
+
+    def on_progress(result: AuditResult) -> None:
+        progress.append(result.processed)
+
+    result = audit_notes(
+        col=col,
+        processor=marker,
+        processes=processes,
+        chunk_size=2,
+        on_progress=on_progress,
+    )
+
+    assert (result.notes, result.processed, result.fields) == (5, 5, 5)
+    assert progress == [2, 4, 5]
+    assert issues(result) == [
+        ("Back", Key.UNMARKED, "Marker0", 0),
+        ("Front", Key.MARKED, "Marker0", 4),
+    ]
+    assert result.issues[0].error.reason == InvalidMarkup.HTML
+    assert result.issues[0].excerpt == "*A<b>B</b>C*"
+    assert result.issues[1].excerpt == "*DE\nF*"
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test__cancel(col: Collection, marker: Processor, processes: int) -> None:
+    calls = []
+
+    def want_cancel() -> bool:
+        calls.append(None)
+        return len(calls) > 1
+
+    result = audit_notes(
+        col=col,
+        processor=marker,
+        processes=processes,
+        chunk_size=2,
+        want_cancel=want_cancel,
+    )
+
+    assert result.cancelled
+    assert result.processed == 2
+    assert issues(result) == [("Back", Key.UNMARKED, "Marker0", 0)]
+
+
+def test__dump(col: Collection, marker: Processor, tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "audit.json"
+
+    audit_notes(col=col, processor=marker, search="DEF").dump(path=path)
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+
+    assert (data["notes"], data["processed"], data["fields"]) == (2, 2, 3)
+    assert [issue["field"] for issue in data["issues"]] == ["Back"]
+    assert data["issues"][0]["reason"] == InvalidMarkup.HTML
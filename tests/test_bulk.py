@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import pytest
+from anki.collection import Collection
+
+from addon.src.bulk import BulkResult, mark_notes, process_notes
+from addon.src.core.processor import Processor
+from addon.src.helpers import Key
+
+
+@pytest.fixture
+def notes() -> list[tuple[str, str]]:
+    return [
+        ("*ABC* DEF", "*ABC*"),
+        ("ABC *DEF*", "ABC"),
+        ("*ABC\nDEF*", "*ABC*"),
+        ("ABC", "ABC"),
+    ]
+
+
+def fields(col: Collection, name: str) -> list[str]:
+    return sorted(col.get_note(note_id)[name] for note_id in col.find_notes(""))
+
+
+def test__unmark(col: Collection, marker: Processor) -> None:
+    progress: list[int] = []
+
+    def on_progress(result: BulkResult) -> None:
+        progress.append(result.processed)
+
+    result = process_notes(
+        col=col,
+        processor=marker,
+        search="",
+        field_names=["Front"],
+        mode=Key.UNMARKED,
+        chunk_size=3,
+        on_progress=on_progress,
+    )
+
+    assert (result.notes, result.processed, result.updated) == (4, 4, 2)
+    assert result.invalid == 1
+    assert progress == [3, 4]
+
+    assert fields(col, "Front") == ["*ABC\nDEF*", "ABC", "ABC DEF", "ABC DEF"]
+    assert fields(col, "Back") == ["*ABC*", "*ABC*", "ABC", "ABC"]
+
+    # All the chunks are undone in a single step.
+    assert col.undo_status().undo == "AnkiMarker: Unmark Markup"
+
+    col.undo()
+
+    assert fields(col, "Front") == ["*ABC\nDEF*", "*ABC* DEF", "ABC", "ABC *DEF*"]
+
+
+def test__render(col: Collection, marker: Processor) -> None:
+    result = process_notes(
+        col=col,
+        processor=marker,
+        search="Back:ABC",
+        field_names=["Front", "Missing"],
+        mode=Key.MARKED,
+    )
+
+    assert (result.notes, result.updated) == (2, 1)
+    assert (
+        f'ABC <{Key.MARKER} class="parent-marker marker0">DEF</{Key.MARKER}>'
+        in fields(col, "Front")
+    )
+
+
+def test__cancel(col: Collection, marker: Processor) -> None:
+    result = process_notes(
+        col=col,
+        processor=marker,
+        search="",
+        field_names=["Front"],
+        mode=Key.UNMARKED,
+        chunk_size=1,
+        want_cancel=lambda: True,
+    )
+
+    assert result.cancelled
+    assert (result.processed, result.updated) == (0, 0)
+
+
+def test__mark(col: Collection, marker: Processor) -> None:
+    result = mark_notes(
+        col=col,
+        processor=marker,
+        search="",
+        field_names=["Front", "Back"],
+        terms=marker.compile_terms(terms=["ABC", "DEF"]),
+        markup="~",
+        chunk_size=3,
+    )
+
+    assert (result.notes, result.processed, result.updated) == (4, 4, 3)
+    assert fields(col, "Front") == ["*ABC\nDEF*", "*ABC* ~DEF~", "~ABC~", "~ABC~ *DEF*"]
+    assert fields(col, "Back") == ["*ABC*", "*ABC*", "~ABC~", "~ABC~"]
+    assert col.undo_status().undo == "AnkiMarker: Mark Terms"
@@ -0,0 +1,58 @@
+import pathlib
+
+from addon.src.bundle import build_bundle, minify, write_bundle
+
+
+def test__minify() -> None:
+    css = """
+        /* Markers. */
+        marker {
+            margin: 0 auto;
+            font-family: "Noto  Sans /* Bold */", serif;
+        }
+
+        marker.accent::before { content: ' ;  { } '; }
+    """
+
+    assert minify(css=css) == (
+        'marker{margin: 0 auto;font-family: "Noto  Sans /* Bold */",serif;}'
+        "marker.accent::before{content: ' ;  { } ';}"
+    )
+
+
+def test__minify_keeps_significant_whitespace() -> None:
+    assert minify(css="a b,c/**/d{}") == "a b,c d{}"
+    assert minify(css="a  >  b { margin: 0 0 }") == "a > b{margin: 0 0}"
+
+
+def test__build_bundle(tmp_path: pathlib.Path) -> None:
+    first = tmp_path / "first.css"
+    second = tmp_path / "second.css"
+
+    first.write_text("a { color: red; }", encoding="utf-8")
+    second.write_text("b { color: blue; }", encoding="utf-8")
+
+    assert build_bundle(paths=[second, tmp_path / "missing.css", first]) == (
+        "b{color: blue;}a{color: red;}"
+    )
+
+
+def test__write_bundle(tmp_path: pathlib.Path) -> None:
+    stylesheet = tmp_path / "markers.css"
+    bundle = tmp_path / "bundle.css"
+
+    stylesheet.write_text("a { color: red; }", encoding="utf-8")
+
+    digest = write_bundle(paths=[stylesheet], path=bundle)
+    modified = bundle.stat().st_mtime_ns
+
+    assert bundle.read_text(encoding="utf-8") == "a{color: red;}"
+
+    # Unchanged bundles aren't written again.
+    assert write_bundle(paths=[stylesheet], path=bundle) == digest
+    assert bundle.stat().st_mtime_ns == modified
+
+    stylesheet.write_text("a { color: blue; }", encoding="utf-8")
+
+    assert write_bundle(paths=[stylesheet], path=bundle) != digest
+    assert bundle.read_text(encoding="utf-8") == "a{color: blue;}"
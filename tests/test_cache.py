@@ -0,0 +1,295 @@
+import pathlib
+import sqlite3
+import time
+
+import pytest
+
+from addon.src.cache import DiskCache, FieldCache, RenderCache
+from addon.src.core.processor import Processor
+from addon.src.helpers import InvalidMarkup, Key
+
+
+def test__hits_and_misses(marker: Processor) -> None:
+    cache = RenderCache(capacity=8)
+    calls = []
+
+    def render() -> str:
+        calls.append(None)
+        return marker.render(string="*ABC*")
+
+    first = cache.get(key=(Key.MARKED, "0", "*ABC*"), function=render)
+    second = cache.get(key=(Key.MARKED, "0", "*ABC*"), function=render)
+
+    assert first == second
+    assert len(calls) == 1
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+    # A different fingerprint is a different entry.
+    cache.get(key=(Key.MARKED, "1", "*ABC*"), function=render)
+
+    assert len(calls) == 2
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+
+def test__caches_invalid_markup(marker: Processor) -> None:
+    cache = RenderCache(capacity=8)
+    calls = []
+
+    def render() -> str:
+        calls.append(None)
+        return marker.render(string="*ABC\nABC*")
+
+    for _ in range(3):
+        with pytest.raises(InvalidMarkup):
+            cache.get(key=(Key.MARKED, "0", "*ABC\nABC*"), function=render)
+
+    assert len(calls) == 1
+    assert (cache.stats.hits, cache.stats.misses) == (2, 1)
+
+
+def test__evicts_least_recently_used() -> None:
+    cache = RenderCache(capacity=2)
+
+    cache.get(key="a", function=lambda: "A")
+    cache.get(key="b", function=lambda: "B")
+    cache.get(key="a", function=lambda: "A")
+    cache.get(key="c", function=lambda: "C")
+
+    assert len(cache) == 2
+    assert cache.stats.evictions == 1
+
+    # 'b' was the least recently used so it was evicted.
+    cache.get(key="a", function=lambda: "A")
+    cache.get(key="b", function=lambda: "B")
+
+    assert (cache.stats.hits, cache.stats.misses) == (2, 4)
+
+
+def test__zero_capacity() -> None:
+    cache = RenderCache(capacity=0)
+
+    cache.get(key="a", function=lambda: "A")
+    cache.get(key="a", function=lambda: "A")
+
+    assert len(cache) == 0
+    assert (cache.stats.hits, cache.stats.misses) == (0, 2)
+
+
+def test__add() -> None:
+    cache = RenderCache(capacity=2)
+
+    cache.add(key="a", result="A")
+    cache.add(key="a", result="B")
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.get(key="a", function=lambda: "C") == "A"
+    assert (cache.stats.hits, cache.stats.misses) == (1, 0)
+
+
+def test__discard(marker: Processor) -> None:
+    cache = RenderCache(capacity=8)
+
+    for fingerprint in ["0", "1"]:
+        for string in ["*ABC*", "**ABC**"]:
+            cache.get(
+                key=(Key.MARKED, fingerprint, string),
+                function=lambda: marker.render(string=string),
+            )
+
+    assert cache.discard(predicate=lambda key: key[1] != "1") == 2
+    assert len(cache) == 2
+
+    cache.get(key=(Key.MARKED, "1", "*ABC*"), function=lambda: "")
+
+    assert cache.stats.hits == 1
+
+
+def test__field_cache_edits(marker: Processor) -> None:
+    cache = FieldCache(capacity=8, load=lambda processor, field_text: {})
+    fingerprint = marker.marker_set.fingerprint
+
+    cache.parse(processor=marker, field_text="*ABC* DEF", field=(1, "Front"))
+    cache.parse(processor=marker, field_text="GHI", field=(1, "Back"))
+
+    text = "*ABC* DEF"
+
+    # Editing a field replaces its previous version.
+    for character in "JKLMNOP":
+        text += character
+        parsed = cache.parse(processor=marker, field_text=text, field=(1, "Front"))
+
+        assert parsed.render() == marker.render(string=text)
+
+    assert len(cache) == 2
+    assert (fingerprint, text) in cache
+    # Versions being edited aren't written to disk.
+    assert cache.take_unsaved() == []
+
+    # Until they're parsed again, e.g. once the edited card is shown.
+    cache.parse(processor=marker, field_text=text, field=(1, "Front"))
+
+    assert cache.take_unsaved() == [(fingerprint, parsed)]
+
+    # Fields of another note are kept.
+    cache.parse(processor=marker, field_text="*ABC*", field=(2, "Front"))
+    cache.parse(processor=marker, field_text="*ABD*", field=(1, "Front"))
+
+    assert len(cache) == 4
+    assert [parsed.string for _, parsed in cache.take_unsaved()] == [
+        "*ABC*",
+        "*ABD*",
+    ]
+
+
+def test__field_cache_reset(marker: Processor) -> None:
+    cache = FieldCache(capacity=8, load=lambda processor, field_text: {})
+    fingerprint = marker.marker_set.fingerprint
+
+    cache.parse(processor=marker, field_text="*ABC*")
+    cache.add(fingerprint="0", parsed=marker.parse(string="*ABD*"))
+
+    assert len(cache.take_unsaved()) == 2
+
+    cache.reset(fingerprint=fingerprint, capacity=8)
+
+    assert len(cache) == 1
+    assert (fingerprint, "*ABC*") in cache
+
+    cache.reset(fingerprint=fingerprint, capacity=4)
+
+    assert len(cache) == 0
+    assert cache.capacity == 4
+
+
+def test__disk_cache(marker: Processor, tmp_path: pathlib.Path) -> None:
+    cache = DiskCache(path=tmp_path / "cache.sqlite3", capacity=8)
+
+    assert cache.get(fingerprint="0", string="*ABC*") == {}
+
+    parsed = marker.parse(string="*ABC*")
+    parsed.render()
+    invalid = marker.parse(string="*A\nBC*")
+
+    with pytest.raises(InvalidMarkup):
+        invalid.unmark()
+
+    cache.put(
+        entries=[
+            ("0", parsed.string, parsed.results),
+            ("0", invalid.string, invalid.results),
+        ]
+    )
+    cache.close()
+
+    # Read back by another instance, as after restarting.
+    cache = DiskCache(path=tmp_path / "cache.sqlite3", capacity=8)
+
+    assert cache.get(fingerprint="0", string="*ABC*") == {
+        Key.MARKED: marker.render(string="*ABC*")
+    }
+    assert cache.get(fingerprint="1", string="*ABC*") == {}
+
+    (error,) = cache.get(fingerprint="0", string="*A\nBC*").values()
+
+    assert isinstance(error, InvalidMarkup)
+    assert error.reason == InvalidMarkup.LINEBREAK
+
+    # A field parsed with known results is never split.
+    seeded = marker.parse(
+        string="*ABC*", results=cache.get(fingerprint="0", string="*ABC*")
+    )
+
+    assert seeded.render() == marker.render(string="*ABC*")
+    assert seeded._tokens is None
+
+
+def test__disk_cache_evicts_least_recently_used(tmp_path: pathlib.Path) -> None:
+    cache = DiskCache(path=tmp_path / "cache.sqlite3", capacity=2)
+
+    for string in ["a", "b", "a", "c"]:
+        cache.put(entries=[("0", string, {Key.MARKED: string.upper()})])
+        # Ensure each write has a distinct time.
+        time.sleep(0.01)
+
+    assert cache.stats.evictions == 1
+    assert cache.get(fingerprint="0", string="b") == {}
+    assert cache.get(fingerprint="0", string="a") == {Key.MARKED: "A"}
+    assert cache.get(fingerprint="0", string="c") == {Key.MARKED: "C"}
+
+
+def test__disk_cache_counts_existing_entries(tmp_path: pathlib.Path) -> None:
+    cache = DiskCache(path=tmp_path / "cache.sqlite3", capacity=8)
+    cache.put(entries=[("0", string, {Key.MARKED: string}) for string in "abc"])
+    cache.close()
+
+    # Entries already in the database count towards the capacity.
+    cache = DiskCache(path=tmp_path / "cache.sqlite3", capacity=3)
+    cache.put(entries=[("0", "a", {Key.MARKED: "A"})])
+
+    assert cache.stats.evictions == 0
+
+    cache.put(entries=[("0", "d", {Key.MARKED: "D"})])
+
+    assert cache.stats.evictions == 1
+    assert cache.get(fingerprint="0", string="a") == {Key.MARKED: "A"}
+    assert cache.get(fingerprint="0", string="d") == {Key.MARKED: "D"}
+
+
+def test__disk_cache_reads_while_writing(tmp_path: pathlib.Path) -> None:
+    cache = DiskCache(path=tmp_path / "cache.sqlite3", capacity=8, max_size=4)
+    cache.put(
+        entries=[("0", "a", {Key.MARKED: "A"}), ("0", "b", {Key.MARKED: "BBBBB"})]
+    )
+
+    # Results longer than `max_size` aren't written.
+    assert cache.get(fingerprint="0", string="b") == {}
+
+    # Reading doesn't wait for a write holding the lock.
+    with cache._lock:
+        assert cache.get(fingerprint="0", string="a") == {Key.MARKED: "A"}
+
+    cache.close()
+
+
+def test__disk_cache_shared(tmp_path: pathlib.Path) -> None:
+    first = DiskCache(path=tmp_path / "cache.sqlite3", capacity=8)
+    second = DiskCache(path=tmp_path / "cache.sqlite3", capacity=8)
+
+    first.put(entries=[("0", "a", {Key.MARKED: "A"})])
+    second.put(entries=[("0", "b", {Key.MARKED: "B"})])
+
+    assert first.get(fingerprint="0", string="b") == {Key.MARKED: "B"}
+    assert second.get(fingerprint="0", string="a") == {Key.MARKED: "A"}
+
+    # Another instance holding a write lock makes writes skip rather than fail.
+    locker = sqlite3.connect(tmp_path / "cache.sqlite3")
+    locker.execute("BEGIN IMMEDIATE")
+
+    first.put(entries=[("0", "c", {Key.MARKED: "C"})])
+
+    assert first.get(fingerprint="0", string="a") == {Key.MARKED: "A"}
+
+    locker.rollback()
+    locker.close()
+
+    assert first.get(fingerprint="0", string="c") == {}
+
+
+def test__disk_cache_disabled(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "cache.sqlite3"
+
+    cache = DiskCache(path=path, capacity=0)
+    cache.put(entries=[("0", "a", {Key.MARKED: "A"})])
+
+    assert cache.get(fingerprint="0", string="a") == {}
+    assert not path.exists()
+
+    # An unusable path disables the cache.
+    path.mkdir()
+
+    cache = DiskCache(path=path, capacity=8)
+    cache.put(entries=[("0", "a", {Key.MARKED: "A"})])
+
+    assert cache.get(fingerprint="0", string="a") == {}
+    assert cache.capacity == 0
@@ -1,8 +1,11 @@
+import threading
+
 import pytest
 
-from addon.src.config import Config
+from addon.src.core.config import Config
+from addon.src.core.marker import Marker
+from addon.src.core.processor import Processor
 from addon.src.helpers import ConfigError, Key
-from addon.src.marker import Marker
 
 
 def test__valid_config(markers: list[Marker]) -> None:
@@ -125,3 +128,207 @@ def test__asymmetric_markup() -> None:
 
     with pytest.raises(ConfigError):
         Config(data=data)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        [],
+        {Key.MARKERS: ["x"]},
+        {Key.MARKERS: {}},
+        {Key.MARKERS: None},
+        {Key.PARENT_CLASSNAME: 1, Key.MARKERS: []},
+        {Key.MARKERS: [{Key.NAME: "A", Key.MARKUP: 1, Key.CLASSNAME: "a"}]},
+        {Key.MARKERS: [{Key.NAME: ["A"], Key.MARKUP: "*", Key.CLASSNAME: "a"}]},
+        {Key.MARKERS: [{Key.NAME: "A", Key.MARKUP: "*", Key.CLASSNAME: None}]},
+    ],
+)
+def test__invalid_structure(data: object) -> None:
+    with pytest.raises(ConfigError):
+        Config(data=data)  # type: ignore[arg-type]
+
+
+def test__marker_set() -> None:
+    data = {
+        Key.PARENT_CLASSNAME: "parent-marker",
+        Key.MARKERS: [
+            {
+                Key.NAME: "Marker0",
+                Key.MARKUP: "*",
+                Key.CLASSNAME: "marker0",
+            },
+            {
+                Key.NAME: "Marker1",
+                Key.MARKUP: "**",
+                Key.CLASSNAME: "marker1",
+            },
+            {
+                Key.NAME: "Marker2",
+                Key.MARKUP: "~",
+                Key.CLASSNAME: "marker2",
+            },
+        ],
+    }
+
+    marker_set = Config(data=data).marker_set
+
+    assert marker_set.characters == "*~"
+    assert [m.name for m in marker_set.by_character["*"]] == ["Marker0", "Marker1"]
+    assert [m.name for m in marker_set.by_character["~"]] == ["Marker2"]
+
+    marker = marker_set.markers[1]
+
+    assert marker.tag_open == f'<{Key.MARKER} class="parent-marker marker1">'
+    assert marker.pattern.fullmatch("**ABC**")
+
+    with pytest.raises(AttributeError):
+        marker.name = "Marker"  # type: ignore
+
+    with pytest.raises(AttributeError):
+        marker.__dict__
+
+
+@pytest.mark.parametrize("size", [-1, "16", 1.5, True])
+def test__invalid_render_cache_size(size: object) -> None:
+    data = {
+        Key.RENDER_CACHE_SIZE: size,
+        Key.MARKERS: [],
+    }
+
+    with pytest.raises(ConfigError):
+        Config(data=data)
+
+
+@pytest.mark.parametrize("size", [-1, "16", 1.5, False])
+def test__invalid_disk_cache_size(size: object) -> None:
+    data = {
+        Key.DISK_CACHE_SIZE: size,
+        Key.MARKERS: [],
+    }
+
+    with pytest.raises(ConfigError):
+        Config(data=data)
+
+
+@pytest.mark.parametrize("cards", [-1, "5", 2.5, True])
+def test__invalid_prerender_cards(cards: object) -> None:
+    data = {
+        Key.PRERENDER_CARDS: cards,
+        Key.MARKERS: [],
+    }
+
+    with pytest.raises(ConfigError):
+        Config(data=data)
+
+
+@pytest.mark.parametrize("interval", [-1, "2", None, False])
+def test__invalid_reload_interval(interval: object) -> None:
+    data = {
+        Key.RELOAD_INTERVAL: interval,
+        Key.MARKERS: [],
+    }
+
+    with pytest.raises(ConfigError):
+        Config(data=data)
+
+
+@pytest.mark.parametrize("metrics", [0, "true", None])
+def test__invalid_metrics(metrics: object) -> None:
+    data = {
+        Key.METRICS: metrics,
+        Key.MARKERS: [],
+    }
+
+    with pytest.raises(ConfigError):
+        Config(data=data)
+
+
+@pytest.mark.parametrize("render_on_save", [1, "false", None])
+def test__invalid_render_on_save(render_on_save: object) -> None:
+    data = {
+        Key.RENDER_ON_SAVE: render_on_save,
+        Key.MARKERS: [],
+    }
+
+    with pytest.raises(ConfigError):
+        Config(data=data)
+
+
+def marker_data(markup: str, classname: str) -> dict:
+    return {
+        Key.MARKERS: [
+            {
+                Key.NAME: "Marker",
+                Key.MARKUP: markup,
+                Key.CLASSNAME: classname,
+            },
+        ]
+    }
+
+
+def test__snapshot() -> None:
+    data = marker_data(markup="*", classname="before")
+
+    config = Config(data=data)
+    processor = Processor(marker_set=config.marker_set)
+    rendered = processor.render(string="*ABC*")
+
+    # Neither changing the data it was built from, nor building another config, nor
+    # changing the markers returned changes a config.
+    data[Key.MARKERS][0][Key.CLASSNAME] = "after"
+    other = Config(data=marker_data(markup="~", classname="other"))
+    config.markers[0].classnames.append("after")
+
+    assert config.markers == [Marker(name="Marker", markup="*", classnames=["before"])]
+    assert processor.render(string="*ABC*") == rendered
+    assert other.version > config.version
+
+    with pytest.raises(AttributeError):
+        config.extra = None  # type: ignore[attr-defined]
+
+
+def test__concurrent_render_and_reload() -> None:
+    configs = [
+        Config(data=marker_data(markup="*", classname=f"marker{index}"))
+        for index in range(2)
+    ]
+    expected = {
+        config.marker_set.fingerprint: Processor(marker_set=config.marker_set).render(
+            string="*ABC* DEF"
+        )
+        for config in configs
+    }
+
+    # The config and processor swapped together, as the add-on does on reload.
+    current = [(configs[0], Processor(marker_set=configs[0].marker_set))]
+    done = threading.Event()
+    errors: list[str] = []
+
+    def render() -> None:
+        while not done.is_set():
+
+            config, processor = current[0]
+            rendered = processor.render(string="*ABC* DEF")
+
+            if rendered != expected[config.marker_set.fingerprint]:
+                errors.append(rendered)
+
+    def reload() -> None:
+        for index in range(2000):
+            config = Config(
+                data=marker_data(markup="*", classname=f"marker{index % 2}")
+            )
+            current[0] = (config, Processor(marker_set=config.marker_set))
+
+        done.set()
+
+    threads = [threading.Thread(target=render) for _ in range(4)]
+    threads.append(threading.Thread(target=reload))
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
@@ -0,0 +1,13 @@
+import subprocess
+import sys
+
+
+def test__core_imports_without_anki() -> None:
+    # Run in a new interpreter as other tests may have imported these already.
+    code = (
+        "import sys, addon.src.core;"
+        "deferred = {'aqt', 'anki', 'markdown', 'concurrent.futures'};"
+        "assert not deferred & set(sys.modules), sys.modules"
+    )
+
+    subprocess.run([sys.executable, "-c", code], check=True)
@@ -1,7 +1,7 @@
 import pytest
 
+from addon.src.core.processor import Processor
 from addon.src.helpers import InvalidMarkup, Key
-from addon.src.processor import Processor
 
 
 def test__valid_basic(marker: Processor) -> None:
@@ -0,0 +1,71 @@
+import json
+import pathlib
+
+import pytest
+
+from addon.src.core.processor import Processor
+from addon.src.helpers import InvalidMarkup, Key
+from addon.src.metrics import Metrics, percentile
+
+
+def test__disabled(marker: Processor) -> None:
+    metrics = Metrics(enabled=False)
+
+    result = metrics.call(
+        operation=Key.MARKED,
+        field_name="Front",
+        size=5,
+        function=lambda: marker.render(string="*ABC*"),
+    )
+
+    assert result == marker.render(string="*ABC*")
+    assert metrics.to_dict() == {}
+
+
+def test__call(marker: Processor, tmp_path: pathlib.Path) -> None:
+    metrics = Metrics(enabled=True)
+
+    for string in ["*ABC*", "**ABC**", "*<br>*"]:
+        try:
+            metrics.call(
+                operation=Key.MARKED,
+                field_name="Front",
+                size=len(string),
+                function=lambda: marker.render(string=string),
+            )
+        except InvalidMarkup:
+            pass
+
+    with pytest.raises(InvalidMarkup):
+        metrics.call(
+            operation=Key.MARK,
+            field_name="Back",
+            size=1,
+            function=lambda: marker.mark(string="\n", markup="*"),
+        )
+
+    data = metrics.to_dict()
+
+    front = data[Key.MARKED]["Front"]
+    assert (front["calls"], front["invalid"]) == (3, 1)
+    assert (front["characters"], front["max_characters"]) == (18, 7)
+    assert 0 < front["p50_seconds"] <= front["p99_seconds"] == front["max_seconds"]
+
+    assert data[Key.MARK]["Back"]["invalid"] == 1
+
+    path = tmp_path / "metrics.json"
+    metrics.dump(path=path)
+
+    assert json.loads(path.read_text()) == data
+
+    metrics.reset()
+
+    assert metrics.to_dict() == {}
+
+
+@pytest.mark.parametrize(
+    "percent, expected",
+    [(0, 1.0), (50, 2.0), (90, 4.0), (99, 4.0), (100, 4.0)],
+)
+def test__percentile(percent: float, expected: float) -> None:
+    assert percentile(samples=[1.0, 2.0, 3.0, 4.0], percent=percent) == expected
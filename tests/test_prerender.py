@@ -0,0 +1,75 @@
+import pytest
+
+from addon.src.core.processor import Processor
+from addon.src.helpers import InvalidMarkup, Key
+from addon.src.prerender import find_filtered_fields, prerender
+
+
+def test__find_filtered_fields() -> None:
+    templates = [
+        "{{marked:Front}}<br>{{ unmarked:Front }}",
+        "{{FrontSide}}<hr>{{text:marked:Back}}{{marked:text:Extra}}",
+        "{{#Notes}}{{unmarked:Notes}}{{/Notes}}{{unmarkedX:Other}}",
+    ]
+
+    assert find_filtered_fields(templates=templates) == {
+        (Key.MARKED, "Front"),
+        (Key.UNMARKED, "Front"),
+        (Key.MARKED, "Back"),
+        (Key.UNMARKED, "Notes"),
+    }
+
+
+def test__prerender(marker: Processor) -> None:
+    parsed = prerender(
+        processor=marker,
+        fields=[
+            (Key.MARKED, "*ABC*"),
+            (Key.UNMARKED, "*ABC*"),
+            (Key.MARKED, "*ABC\nDEF*"),
+        ],
+    )
+
+    assert [field.string for field in parsed] == ["*ABC*", "*ABC\nDEF*"]
+    assert parsed[0].results == {
+        Key.MARKED: marker.render(string="*ABC*"),
+        Key.UNMARKED: "ABC",
+    }
+
+    with pytest.raises(InvalidMarkup):
+        parsed[1].render()
+
+    assert Key.UNMARKED not in parsed[1].results
+
+
+def test__prerender_load(marker: Processor) -> None:
+    loaded = []
+
+    def load(field_text: str) -> dict[str, str]:
+        loaded.append(field_text)
+        return {Key.MARKED: "Loaded"}
+
+    parsed = prerender(
+        processor=marker,
+        fields=[(Key.MARKED, "*ABC*"), (Key.MARKED, "*ABC*")],
+        load=load,
+    )
+
+    assert loaded == ["*ABC*"]
+    assert parsed[0].render() == "Loaded"
+
+
+def test__prerender_cancel(marker: Processor) -> None:
+    calls = []
+
+    def want_cancel() -> bool:
+        calls.append(None)
+        return len(calls) > 2
+
+    parsed = prerender(
+        processor=marker,
+        fields=[(Key.MARKED, f"*{index}*") for index in range(5)],
+        want_cancel=want_cancel,
+    )
+
+    assert [field.string for field in parsed] == ["*0*", "*1*"]
@@ -0,0 +1,559 @@
+from __future__ import annotations
+
+import concurrent.futures
+import copy
+import pickle
+import random
+import re
+import sys
+import tracemalloc
+from collections.abc import Iterator
+
+import pytest
+
+from addon.src.core.marker import Marker, MarkerSet
+from addon.src.core.processor import LINEBREAK_RE, Processor, html_re
+from addon.src.helpers import Defaults, InvalidMarkup, Key
+
+
+def reference(markers: list[Marker], string: str, replacement: str) -> str:
+    """The original implementation: validate and substitute each marker's pattern in
+    turn."""
+
+    for marker in markers:
+
+        for match in re.finditer(marker.pattern, string):
+
+            if re.search(LINEBREAK_RE, match[Key.CONTENTS]):
+                raise InvalidMarkup
+
+            if html_re().search(match[Key.CONTENTS]):
+                raise InvalidMarkup
+
+        string = re.sub(
+            pattern=marker.pattern,
+            repl=getattr(marker, replacement),
+            string=string,
+        )
+
+    return string
+
+
+def outcome(function, *args) -> str | type[Exception]:
+    try:
+        return function(*args)
+    except InvalidMarkup:
+        return InvalidMarkup
+
+
+CONFIGS = [
+    [
+        Marker(name="Marker0", markup="*", classnames=["parent-marker", "marker0"]),
+        Marker(name="Marker1", markup="**", classnames=["parent-marker", "marker1"]),
+        Marker(name="Marker2", markup="~", classnames=["parent-marker", "marker2"]),
+        Marker(name="Marker3", markup="~~", classnames=["parent-marker", "marker3"]),
+    ],
+    [
+        # The '=' in 'class="..."' and the '-' in the classnames are themselves
+        # markup characters here, so rendered tags affect the following markers.
+        Marker(name="Accent", markup="*", classnames=["my-markers", "accent"]),
+        Marker(name="Highlight", markup="==", classnames=["my-markers", "highlight"]),
+        Marker(name="Equals", markup="=", classnames=["equals"]),
+        Marker(name="Strike", markup="--", classnames=["my-markers", "strike"]),
+        Marker(name="Dash", markup="-", classnames=["dash"]),
+    ],
+    [
+        # Duplicate markups and a marker defined after a longer markup.
+        Marker(name="Bold", markup="**", classnames=["bold"]),
+        Marker(name="Accent", markup="*", classnames=["accent"]),
+        Marker(name="Duplicate", markup="*", classnames=["duplicate"]),
+        Marker(name="Triple", markup="***", classnames=["triple"]),
+    ],
+    [],
+]
+
+# Markup characters found in tags' attributes, but not in the rendered tags.
+ATTRIBUTE_MARKERS = [
+    Marker(name="Accent", markup="*", classnames=["accent"]),
+    Marker(name="Highlight", markup="==", classnames=["highlight"]),
+    Marker(name="Dash", markup="-", classnames=["dash"]),
+]
+
+ALPHABET = ["*", "**", "~", "~~", "=", "==", "-", "a", "b ", " ", "\n", "<p>", "</p>"]
+
+
+@pytest.mark.parametrize("markers", CONFIGS)
+def test__matches_reference(markers: list[Marker]) -> None:
+    processor = Processor(marker_set=MarkerSet.from_markers(markers))
+    rng = random.Random(0)
+
+    for _ in range(2000):
+
+        string = "".join(rng.choices(ALPHABET, k=rng.randint(0, 16)))
+
+        assert outcome(processor.render, string) == outcome(
+            reference, markers, string, "replacement_render"
+        ), string
+
+        assert outcome(processor.unmark, string) == outcome(
+            reference, markers, string, "replacement_unmark"
+        ), string
+
+
+@pytest.mark.parametrize("processes, threads", [(0, 0), (2, 0), (0, 4)])
+def test__batch(processes: int, threads: int) -> None:
+    markers = CONFIGS[0]
+    processor = Processor(marker_set=MarkerSet.from_markers(markers))
+    rng = random.Random(1)
+
+    strings = ["".join(rng.choices(ALPHABET, k=rng.randint(0, 16))) for _ in range(300)]
+
+    rendered = processor.render_batch(
+        strings=strings, processes=processes, threads=threads, chunk_size=64
+    )
+    unmarked = processor.unmark_batch(
+        strings=iter(strings), processes=processes, threads=threads, chunk_size=64
+    )
+
+    assert len(rendered) == len(unmarked) == len(strings)
+
+    for string, render, unmark in zip(strings, rendered, unmarked):
+
+        expected_render = outcome(reference, markers, string, "replacement_render")
+        expected_unmark = outcome(reference, markers, string, "replacement_unmark")
+
+        assert (
+            type(render) if isinstance(render, InvalidMarkup) else render
+        ) == expected_render
+        assert (
+            type(unmark) if isinstance(unmark, InvalidMarkup) else unmark
+        ) == expected_unmark
+
+
+@pytest.mark.parametrize("markers", CONFIGS)
+def test__stream_matches_render(
+    markers: list[Marker], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Tiny sizes exercise letting unclosed markups through and re-chunking.
+    monkeypatch.setattr(Defaults, "STREAM_BUFFER_SIZE", 4)
+    monkeypatch.setattr(Defaults, "STREAM_CHUNK_SIZE", 3)
+
+    processor = Processor(marker_set=MarkerSet.from_markers(markers))
+    rng = random.Random(2)
+
+    for _ in range(2000):
+
+        string = "".join(rng.choices(ALPHABET, k=rng.randint(0, 24)))
+        cuts = sorted(rng.sample(range(len(string) + 1), k=min(len(string), 4)))
+        chunks = [string[i:j] for i, j in zip([0, *cuts], [*cuts, len(string)])]
+
+        assert outcome(
+            lambda: "".join(processor.iter_render(chunks=iter(chunks)))
+        ) == outcome(processor.render, string), chunks
+
+        assert outcome(
+            lambda: "".join(processor.iter_unmark(chunks=iter(chunks)))
+        ) == outcome(processor.unmark, string), chunks
+
+
+def test__stream_memory(marker: Processor) -> None:
+    line = "ABC *ABC* ABC **ABC** ABC<br>"
+    lines = 40_000
+
+    def chunks() -> Iterator[str]:
+        # An unclosed markup that is never closed.
+        yield "~ "
+
+        for _ in range(lines // 1000):
+            yield line * 1000
+
+    tracemalloc.start()
+
+    try:
+        size = sum(len(chunk) for chunk in marker.iter_render(chunks=chunks()))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert size == len(marker.render(string="~ " + line * lines))
+    # The whole string is over 1MB, its rendered form over 4MB.
+    assert peak < 500_000
+
+
+def test__fast_path() -> None:
+    marker = Processor(marker_set=MarkerSet.from_markers(CONFIGS[0]))
+
+    assert marker.render(string="ABC <b>ABC</b> &amp;") == "ABC <b>ABC</b> &amp;"
+    assert marker.unmark(string="") == ""
+    assert marker.render(string="*ABC*") != "*ABC*"
+
+    assert marker.stats.calls == 3
+    assert marker.stats.fast_path == 2
+    assert marker.stats.passes + marker.stats.skipped_passes == 3 * len(
+        marker.marker_set
+    )
+
+
+def test__threads() -> None:
+    # Switching threads as often as possible makes races far more likely.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    markers = CONFIGS[1]
+    processor = Processor(marker_set=MarkerSet.from_markers(markers))
+    rng = random.Random(2)
+
+    strings = ["".join(rng.choices(ALPHABET, k=rng.randint(0, 16))) for _ in range(200)]
+    expected = [
+        outcome(reference, markers, string, "replacement_render") for string in strings
+    ]
+    # Parsed fields shared by every thread, as they are by the render cache.
+    parsed = [processor.parse(string=string) for string in strings]
+
+    def render(index: int) -> list[str | type[Exception]]:
+        return [outcome(field.render) for field in parsed] + [
+            outcome(processor.render, string) for string in strings
+        ]
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(render, range(8)))
+    finally:
+        sys.setswitchinterval(interval)
+
+    for result in results:
+        assert result == expected + expected
+
+    # Every call is counted. A parsed field is rendered at least once, and at most
+    # once by each thread.
+    assert 9 * len(strings) <= processor.stats.calls <= 16 * len(strings)
+
+
+def test__stats_threads() -> None:
+    processor = Processor(marker_set=MarkerSet.from_markers(CONFIGS[0]))
+    strings = ["*a*", "a"] * 100
+
+    # Counts from the threads of earlier batches are kept once they finish.
+    for _ in range(3):
+        processor.render_batch(strings=strings, threads=4, chunk_size=8)
+
+    processor.render(string="*a*")
+
+    assert processor.stats.calls == 601
+    assert processor.stats.fast_path == 300
+    assert processor.stats.passes + processor.stats.skipped_passes == 601 * 4
+
+
+def test__parse() -> None:
+    marker = Processor(marker_set=MarkerSet.from_markers(CONFIGS[0]))
+    string = "The **lazy** dog"
+
+    parsed = marker.parse(string=string)
+
+    assert parsed.tokens == ("The ", "**", "lazy", "**", " dog")
+    assert parsed.render() == marker.render(string=string)
+    assert parsed.unmark() == marker.unmark(string=string)
+    assert parsed.render() is parsed.render()
+
+    # Only the first call to each of `render` and `unmark` walks the tokens.
+    assert marker.stats.calls == 4
+
+    assert marker.parse(string="").tokens == ()
+    assert marker.parse(string="ABC").tokens == ("ABC",)
+
+    # Once both results are known, tokens are only kept to splice edits into.
+    assert parsed._tokens is None
+
+    edited = marker.reparse(previous=parsed, string="The **lazy** dogs")
+    edited.render()
+    edited.unmark()
+
+    assert edited._tokens == ("The ", "**", "lazy", "**", " dogs")
+
+
+def test__parse_invalid_markup() -> None:
+    marker = Processor(marker_set=MarkerSet.from_markers(CONFIGS[0]))
+
+    parsed = marker.parse(string="**A<b>B</b>C**")
+
+    with pytest.raises(InvalidMarkup) as first:
+        parsed.render()
+
+    with pytest.raises(InvalidMarkup) as second:
+        parsed.render()
+
+    assert first.value is not second.value
+    assert str(first.value) == str(second.value)
+    assert marker.stats.calls == 1
+
+
+def test__mark_all() -> None:
+    marker = Processor(marker_set=MarkerSet.from_markers(CONFIGS[0]))
+
+    assert marker.mark_all(
+        string='The lazy dog, the *lazy* cat and the <a title="lazy">fox</a>',
+        term="lazy",
+        markup="~",
+    ) == ('The ~lazy~ dog, the *lazy* cat and the <a title="lazy">fox</a>', 1)
+
+    # Next to markup characters or another occurrence.
+    assert marker.mark_all(string="lazylazy lazy~", term="lazy", markup="~") == (
+        "~lazy~lazy lazy~",
+        1,
+    )
+    # Escaped to match the field's HTML.
+    assert marker.mark_all(string="A &amp; B", term="A & B", markup="*") == (
+        "*A &amp; B*",
+        1,
+    )
+    assert marker.mark_all(string="amp &amp;", term="amp", markup="*") == (
+        "*amp* &amp;",
+        1,
+    )
+    # Unpaired markup the new markers would pair with.
+    assert marker.mark_all(string="*b**b* **ab", term="b", markup="**") == (
+        "*b**b* **ab",
+        0,
+    )
+
+    for term in ["A\nB", "A<b>B</b>", "A*B"]:
+        with pytest.raises(InvalidMarkup):
+            marker.mark_all(string="ABC", term=term, markup="*")
+
+
+def test__mark_all_in_attributes() -> None:
+    marker = Processor(marker_set=MarkerSet.from_markers(ATTRIBUTE_MARKERS))
+
+    # Markup characters within tags neither split them nor open runs.
+    assert marker.mark_all(
+        string='<span class="x">a span b</span>', term="span", markup="*"
+    ) == ('<span class="x">a *span* b</span>', 1)
+    assert marker.mark_all(
+        string='<a href="u">lazy</a> lazy', term="lazy", markup="*"
+    ) == ('<a href="u">*lazy*</a> *lazy*', 2)
+    assert marker.mark_all(
+        string='<a data-x="1">lazy</a> lazy', term="lazy", markup="=="
+    ) == ('<a data-x="1">==lazy==</a> ==lazy==', 2)
+    # Unless rendering pairs them with the new markers.
+    assert marker.mark_all(
+        string='<a data-x="1">lazy</a> lazy', term="lazy", markup="-"
+    ) == ('<a data-x="1">lazy</a> lazy', 0)
+
+
+@pytest.mark.parametrize("markers", CONFIGS[:3])
+def test__mark_all_keeps_markup(markers: list[Marker]) -> None:
+    processor = Processor(marker_set=MarkerSet.from_markers(markers))
+    rng = random.Random(0)
+    alphabet = ALPHABET + ["ab", "&amp;"]
+
+    for _ in range(2000):
+
+        string = "".join(rng.choices(alphabet, k=rng.randint(0, 12)))
+
+        try:
+            unmarked = processor.unmark(string=string)
+            processor.render(string=string)
+        except InvalidMarkup:
+            continue
+
+        for marker in markers:
+
+            marked, count = processor.mark_all(
+                string=string, term="a", markup=marker.markup
+            )
+
+            assert processor.unmark(string=marked) == unmarked
+            assert marked.count("a") == string.count("a")
+            assert len(marked) == len(string) + 2 * count * len(marker.markup)
+
+
+def test__mark_terms(marker: Processor) -> None:
+    terms = marker.compile_terms(
+        terms=["lazy", "lazy dog", "A & B", "A*B", "A\nB", "dog"], whole_words=True
+    )
+
+    assert terms.terms == ("lazy", "lazy dog", "A &amp; B", "dog")
+    assert marker.mark_terms(
+        string="The lazy dog, the lazy cat and the dogs<br>A &amp; B",
+        terms=terms,
+        markup="~",
+    ) == ("The ~lazy dog~, the ~lazy~ cat and the dogs<br>~A &amp; B~", 3)
+    # Within tags, entities and marked text.
+    assert marker.mark_terms(
+        string='<a title="dog">*dog*</a> &lazy;', terms=terms, markup="~"
+    ) == ('<a title="dog">*dog*</a> &lazy;', 0)
+    # Invalid markup.
+    assert marker.mark_terms(string="*dog\n*", terms=terms, markup="~") == (
+        "*dog\n*",
+        0,
+    )
+
+
+def test__mark_terms_in_attributes() -> None:
+    marker = Processor(marker_set=MarkerSet.from_markers(ATTRIBUTE_MARKERS))
+    terms = marker.compile_terms(terms=["lazy", "span", "dog"], whole_words=True)
+
+    assert marker.mark_terms(
+        string='<span class="dog">a span</span> <a href="u" data-x="1">lazy</a> dog',
+        terms=terms,
+        markup="==",
+    ) == (
+        '<span class="dog">a ==span==</span> <a href="u" data-x="1">==lazy==</a> '
+        "==dog==",
+        3,
+    )
+    assert marker.mark_terms(
+        string='<a href="u">lazy</a> *dog*', terms=terms, markup="-"
+    ) == ('<a href="u">-lazy-</a> *dog*', 1)
+
+    # Where rendered tags are themselves markup, tags are left whole.
+    marker = Processor(marker_set=MarkerSet.from_markers(CONFIGS[1]))
+
+    for string in ['<span class="x">a span</span>', '<a data-x="1">lazy</a> lazy']:
+        for markup in ["*", "=", "-"]:
+            marked, count = marker.mark_terms(string=string, terms=terms, markup=markup)
+            assert re.findall(r"<[^>]*>", marked) == re.findall(r"<[^>]*>", string)
+            assert marker.unmark(string=marked) == marker.unmark(string=string)
+
+
+def test__reparse() -> None:
+    marker = Processor(marker_set=MarkerSet.from_markers(CONFIGS[0]))
+
+    # Only fields from `Processor.reparse` keep where their tokens are, so the first
+    # edit is processed in full and the following ones are spliced.
+    parsed = marker.reparse(
+        previous=marker.parse(string="The **lazy** dog"), string="The **lazy** dog."
+    )
+    parsed.render()
+
+    expected = [marker.render(string=f"The **laziest** dog{end}") for end in ".s"]
+    calls = marker.stats.calls
+
+    parsed = marker.reparse(previous=parsed, string="The **laziest** dog.")
+
+    assert parsed.results == {Key.MARKED: expected[0]}
+    assert parsed.tokens == ("The ", "**", "laziest", "**", " dog.")
+
+    parsed = marker.reparse(previous=parsed, string="The **laziest** dogs")
+
+    assert parsed.render() == expected[1]
+    assert marker.stats.calls == calls
+
+    # Edits adding markup characters, line-breaks or HTML are processed in full.
+    for string in ["The **laziest* dogs", "The **lazi\nest** dogs", "The **<b>**"]:
+        assert not marker.reparse(previous=parsed, string=string).results
+
+
+@pytest.mark.parametrize("markers", CONFIGS)
+def test__reparse_matches_parse(markers: list[Marker]) -> None:
+    processor = Processor(marker_set=MarkerSet.from_markers(markers))
+    rng = random.Random(3)
+    alphabet = ALPHABET + ["ab", '<a title="b*">', "<b", ">", "@", "&amp;"]
+    edits = ["a", "bc", " ", "@", "", "<", ">", "\n", "*", "=="]
+
+    for _ in range(300):
+
+        string = "".join(rng.choices(alphabet, k=rng.randint(0, 14)))
+        parsed = processor.parse(string=string)
+
+        for _ in range(8):
+
+            outcome(parsed.render)
+            outcome(parsed.unmark)
+
+            start = rng.randint(0, len(string))
+            end = min(start + rng.choice([0, 0, 1, 2]), len(string))
+            string = string[:start] + rng.choice(edits) + string[end:]
+            parsed = processor.reparse(previous=parsed, string=string)
+
+            assert outcome(parsed.render) == outcome(
+                reference, markers, string, "replacement_render"
+            ), string
+            assert outcome(parsed.unmark) == outcome(
+                reference, markers, string, "replacement_unmark"
+            ), string
+
+
+def test__find_markers() -> None:
+    # Rendering a marker adds '=' and '-' characters through its tag.
+    marker_set = MarkerSet.from_markers(CONFIGS[1])
+    accent, highlight, equals, strike, dash = marker_set.markers
+
+    assert marker_set.find_markers(string="ABC", render=True) == ()
+    assert marker_set.find_markers(string="*ABC*", render=True) == marker_set.markers
+    assert marker_set.find_markers(string="*ABC*", render=False) == (accent,)
+    assert marker_set.find_markers(string="-ABC-", render=True) == (strike, dash)
+    assert marker_set.find_markers(string="-ABC-", render=False) == (strike, dash)
+    assert marker_set.find_markers(string="=ABC=", render=False) == (
+        highlight,
+        equals,
+    )
+
+
+@pytest.mark.parametrize(
+    "string, marker_name, reason, markup",
+    [
+        ("ABC *A<br>B* ABC", "Marker0", InvalidMarkup.HTML, "*A<br>B*"),
+        ("*ABC* **A\nB**", "Marker1", InvalidMarkup.LINEBREAK, "**A\nB**"),
+        # Offsets are in the given string, not one rendered by earlier markers.
+        ("*A* **B** ~~A\nB~~", "Marker3", InvalidMarkup.LINEBREAK, "~~A\nB~~"),
+    ],
+)
+def test__invalid_markup_location(
+    marker: Processor, string: str, marker_name: str, reason: str, markup: str
+) -> None:
+    for function in [marker.render, marker.unmark]:
+
+        with pytest.raises(InvalidMarkup) as info:
+            function(string)
+
+        error = info.value
+
+        assert (error.marker, error.reason) == (marker_name, reason)
+        assert string[error.start : error.end] == markup
+
+
+@pytest.mark.parametrize("markers", CONFIGS[:3])
+def test__invalid_markup_offsets(markers: list[Marker]) -> None:
+    processor = Processor(marker_set=MarkerSet.from_markers(markers))
+    names = {marker.name for marker in markers}
+    rng = random.Random(3)
+
+    for _ in range(2000):
+
+        string = "".join(rng.choices(ALPHABET, k=rng.randint(0, 16)))
+
+        for function in [processor.render, processor.unmark]:
+
+            try:
+                function(string)
+            except InvalidMarkup as error:
+                assert error.marker in names
+                assert error.reason in [InvalidMarkup.LINEBREAK, InvalidMarkup.HTML]
+                assert 0 <= error.start < error.end <= len(string), string
+
+                # Errors are cached and sent between processes.
+                for duplicate in [pickle.loads(pickle.dumps(error)), copy.copy(error)]:
+                    assert str(duplicate) == str(error)
+                    assert duplicate.start == error.start
+
+
+@pytest.mark.parametrize(
+    "unit",
+    ["*", "~ ~~ ~~~ ~~~~ ", "~~ a ~~~ b ", "*~=", "*a*", "*<b ", "**~~*", "=-=--="],
+)
+@pytest.mark.parametrize("markers", CONFIGS[:3])
+def test__adversarial(markers: list[Marker], unit: str) -> None:
+    processor = Processor(marker_set=MarkerSet.from_markers(markers))
+
+    for count in [1, 2, 3, 50, 51]:
+
+        string = unit * count
+
+        assert outcome(processor.render, string) == outcome(
+            reference, markers, string, "replacement_render"
+        ), string
+
+        assert outcome(processor.unmark, string) == outcome(
+            reference, markers, string, "replacement_unmark"
+        ), string
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import json
+import pathlib
+import random
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from addon.src.core.marker import Marker, MarkerSet
+from addon.src.core.processor import Processor, html_re
+from addon.src.core.script import _translate_pattern, build_script
+from addon.src.helpers import InvalidMarkup
+
+
+CONFORMANCE = json.loads(
+    (pathlib.Path(__file__).parent / "conformance.json").read_text(encoding="utf-8")
+)
+
+ALPHABET = ["*", "**", "~", "=", "==", "-", "a", "😀", " ", "\n", "<p>", "</p>", "<"]
+
+# Renders each string in the JSON list read from stdin with the script at the given
+# path, writing the results as JSON.
+DRIVER = """
+const fs = require("fs");
+const AnkiMarker = require(process.argv[1]);
+
+const results = JSON.parse(fs.readFileSync(0, "utf-8")).map((string) => {
+    try {
+        return { rendered: AnkiMarker.render(string) };
+    } catch (error) {
+        return { error: error.message };
+    }
+});
+
+process.stdout.write(JSON.stringify(results));
+"""
+
+requires_node = pytest.mark.skipif(
+    shutil.which("node") is None, reason="Node.js is not installed."
+)
+
+
+def build_markers(config: list[dict]) -> list[Marker]:
+    return [Marker(**data) for data in config]
+
+
+def render(processor: Processor, string: str) -> dict[str, str]:
+    try:
+        return {"rendered": processor.render(string=string)}
+    except InvalidMarkup as error:
+        return {"error": str(error)}
+
+
+def render_javascript(
+    markers: list[Marker], strings: list[str], tmp_path: pathlib.Path
+) -> list[dict[str, str]]:
+    path = tmp_path / "markers.js"
+    path.write_text(build_script(MarkerSet.from_markers(markers)), encoding="utf-8")
+
+    process = subprocess.run(
+        ["node", "-e", DRIVER, str(path)],
+        input=json.dumps(strings),
+        capture_output=True,
+        check=True,
+        encoding="utf-8",
+    )
+
+    return json.loads(process.stdout)
+
+
+def expected(case: dict) -> dict[str, str]:
+    return {key: case[key] for key in ("rendered", "error") if key in case}
+
+
+@pytest.mark.parametrize("index", range(len(CONFORMANCE["configs"])))
+def test__conformance(index: int) -> None:
+    processor = Processor(
+        marker_set=MarkerSet.from_markers(
+            build_markers(config=CONFORMANCE["configs"][index])
+        )
+    )
+
+    for case in CONFORMANCE["cases"]:
+
+        if case["config"] != index:
+            continue
+
+        assert render(processor=processor, string=case["string"]) == expected(case)
+
+
+@requires_node
+@pytest.mark.parametrize("index", range(len(CONFORMANCE["configs"])))
+def test__conformance_javascript(index: int, tmp_path: pathlib.Path) -> None:
+    cases = [case for case in CONFORMANCE["cases"] if case["config"] == index]
+
+    results = render_javascript(
+        markers=build_markers(config=CONFORMANCE["configs"][index]),
+        strings=[case["string"] for case in cases],
+        tmp_path=tmp_path,
+    )
+
+    assert results == [expected(case) for case in cases]
+
+
+@requires_node
+@pytest.mark.parametrize("index", range(len(CONFORMANCE["configs"])))
+def test__matches_processor(index: int, tmp_path: pathlib.Path) -> None:
+    markers = build_markers(config=CONFORMANCE["configs"][index])
+    processor = Processor(marker_set=MarkerSet.from_markers(markers))
+    rng = random.Random(index)
+
+    strings = [
+        "".join(rng.choices(ALPHABET, k=rng.randint(0, 16))) for _ in range(2000)
+    ]
+
+    results = render_javascript(markers=markers, strings=strings, tmp_path=tmp_path)
+
+    for string, result in zip(strings, results):
+        assert result == render(processor=processor, string=string), string
+
+
+def test__translate_pattern() -> None:
+    pattern = re.compile(_translate_pattern(pattern=html_re().pattern))
+    rng = random.Random(0)
+
+    alphabet = list("<>/!-?[]\"'= \tabA@") + ["<!--", "-->", "<![CDATA[", "]]>"]
+
+    for _ in range(20000):
+
+        string = "".join(rng.choices(alphabet, k=rng.randint(0, 12)))
+
+        assert bool(pattern.search(string)) == bool(html_re().search(string)), string
+
+    assert _translate_pattern(pattern=r"a*+b++c?+d{2}+\++") == r"a*b+c?d{2}\++"
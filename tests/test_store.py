@@ -0,0 +1,157 @@
+import pathlib
+
+import pytest
+
+from addon.src.core.processor import Processor
+from addon.src.helpers import InvalidMarkup
+from addon.src.store import RenderStore
+
+
+def test__get(marker: Processor) -> None:
+    store = RenderStore(fingerprint=marker.marker_set.fingerprint, capacity=10)
+    store.update(processor=marker, note_id=1, fields=[("Front", "*ABC*")])
+
+    assert store.get(note_id=1, field_name="Front", field_text="*ABC*") == (
+        marker.render(string="*ABC*")
+    )
+
+    # Different text, note or field.
+    assert store.get(note_id=1, field_name="Front", field_text="*ABD*") is None
+    assert store.get(note_id=2, field_name="Front", field_text="*ABC*") is None
+    assert store.get(note_id=1, field_name="Back", field_text="*ABC*") is None
+
+
+def test__update(marker: Processor) -> None:
+    store = RenderStore(fingerprint=marker.marker_set.fingerprint, capacity=10)
+    store.update(
+        processor=marker, note_id=1, fields=[("Front", "*ABC*"), ("Back", "ABC")]
+    )
+
+    # Fields without markup characters aren't stored.
+    assert len(store) == 1
+
+    # Fields stored with the same text aren't rendered again.
+    calls = marker.stats.calls
+    store.update(processor=marker, note_id=1, fields=[("Front", "*ABC*")])
+
+    assert marker.stats.calls == calls
+
+    store.update(processor=marker, note_id=1, fields=[("Front", "ABC")])
+
+    assert len(store) == 0
+
+
+def test__invalid_markup(marker: Processor) -> None:
+    store = RenderStore(fingerprint=marker.marker_set.fingerprint, capacity=10)
+    store.update(processor=marker, note_id=1, fields=[("Front", "*A<b>B</b>C*")])
+
+    for _ in range(2):
+        with pytest.raises(InvalidMarkup) as error:
+            store.get(note_id=1, field_name="Front", field_text="*A<b>B</b>C*")
+
+        assert error.value.marker == "Marker0"
+
+
+def test__discard_and_reset(marker: Processor) -> None:
+    store = RenderStore(fingerprint=marker.marker_set.fingerprint, capacity=10)
+    store.update(processor=marker, note_id=1, fields=[("Front", "*ABC*")])
+    store.update(processor=marker, note_id=2, fields=[("Front", "*ABC*")])
+
+    store.discard(note_ids=[1])
+
+    assert len(store) == 1
+
+    store.reset(fingerprint=marker.marker_set.fingerprint)
+
+    assert len(store) == 1
+
+    store.reset(fingerprint="0")
+
+    assert len(store) == 0
+    assert store.fingerprint == "0"
+
+
+def test__dump_and_load(marker: Processor, tmp_path: pathlib.Path) -> None:
+    fingerprint = marker.marker_set.fingerprint
+    path = tmp_path / "rendered" / "User 1.json"
+
+    store = RenderStore(fingerprint=fingerprint, capacity=10)
+    store.update(
+        processor=marker,
+        note_id=1,
+        fields=[("Front", "*ABC*"), ("Back", "*A\nBC*")],
+    )
+    store.dump(path=path)
+
+    loaded = RenderStore.load(path=path, fingerprint=fingerprint, capacity=10)
+
+    assert len(loaded) == 2
+    assert loaded.get(note_id=1, field_name="Front", field_text="*ABC*") == (
+        marker.render(string="*ABC*")
+    )
+
+    with pytest.raises(InvalidMarkup) as error:
+        loaded.get(note_id=1, field_name="Back", field_text="*A\nBC*")
+
+    assert error.value.reason == InvalidMarkup.LINEBREAK
+
+    # Written for other markers, or missing.
+    assert len(RenderStore.load(path=path, fingerprint="0", capacity=10)) == 0
+    assert (
+        len(
+            RenderStore.load(
+                path=tmp_path / "missing.json", fingerprint="0", capacity=10
+            )
+        )
+        == 0
+    )
+
+
+def test__capacity(marker: Processor, tmp_path: pathlib.Path) -> None:
+    fingerprint = marker.marker_set.fingerprint
+    path = tmp_path / "User 1.json"
+
+    store = RenderStore(fingerprint=fingerprint, capacity=2)
+    store.update(processor=marker, note_id=1, fields=[("Front", "*ABC*")])
+    store.update(processor=marker, note_id=2, fields=[("Front", "*ABC*")])
+
+    # Using the first note's field makes the second's the least recently used.
+    assert store.get(note_id=1, field_name="Front", field_text="*ABC*") is not None
+
+    store.update(processor=marker, note_id=3, fields=[("Front", "*ABC*")])
+
+    assert len(store) == 2
+    assert store.get(note_id=2, field_name="Front", field_text="*ABC*") is None
+
+    store.dump(path=path)
+
+    # The most recently used fields are loaded first.
+    loaded = RenderStore.load(path=path, fingerprint=fingerprint, capacity=1)
+
+    assert len(loaded) == 1
+    assert loaded.get(note_id=3, field_name="Front", field_text="*ABC*") is not None
+
+    assert len(RenderStore(fingerprint=fingerprint, capacity=0)) == 0
+
+
+def test__merge(marker: Processor) -> None:
+    fingerprint = marker.marker_set.fingerprint
+
+    loaded = RenderStore(fingerprint=fingerprint, capacity=10)
+    loaded.update(
+        processor=marker, note_id=1, fields=[("Front", "*ABC*"), ("Back", "*ABC*")]
+    )
+
+    # Fields stored while loading replace the loaded ones.
+    store = RenderStore(fingerprint=fingerprint, capacity=10)
+    store.update(processor=marker, note_id=1, fields=[("Front", "*ABD*")])
+    loaded.merge(store=store)
+
+    assert len(loaded) == 2
+    assert loaded.get(note_id=1, field_name="Front", field_text="*ABD*") is not None
+
+    # Unless they were rendered with other markers.
+    loaded.merge(store=RenderStore(fingerprint="0", capacity=10))
+
+    assert len(loaded) == 0
+    assert loaded.fingerprint == "0"
@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from addon.src.core.terms import TermMatcher
+
+
+def brute_force(terms: list[str], string: str) -> list[tuple[int, int]]:
+    """Finds the leftmost-longest terms by trying every term at every position."""
+
+    matches = []
+    position = 0
+
+    while position < len(string):
+
+        lengths = [
+            len(term) for term in terms if term and string.startswith(term, position)
+        ]
+
+        if lengths:
+            matches.append((position, position + max(lengths)))
+            position += max(lengths)
+        else:
+            position += 1
+
+    return matches
+
+
+def test__find() -> None:
+    matcher = TermMatcher(terms=["lazy", "lazy dog", "dog", "", "dog"])
+
+    assert len(matcher) == 3
+    assert matcher.find(string="The lazy dog and the dog") == [(4, 12), (21, 24)]
+    assert matcher.find(string="The lazy do") == [(4, 8)]
+    assert TermMatcher(terms=[]).find(string="ABC") == []
+
+
+def test__find_suffixes() -> None:
+    # Terms found through the failure links of longer ones.
+    matcher = TermMatcher(terms=["abcd", "bc", "c"])
+
+    assert matcher.find(string="abce abcd") == [(1, 3), (5, 9)]
+
+
+@pytest.mark.parametrize("whole_words", [False, True])
+def test__find_single(whole_words: bool) -> None:
+    matcher = TermMatcher(terms=["aa"], whole_words=whole_words)
+
+    if whole_words:
+        assert matcher.find(string="aaa aa") == [(4, 6)]
+    else:
+        assert matcher.find(string="aaa aa") == [(0, 2), (4, 6)]
+
+
+def test__find_whole_words() -> None:
+    matcher = TermMatcher(terms=["cat", "con"], whole_words=True)
+
+    assert matcher.find(string="cat concatenate (cat) cat_") == [(0, 3), (17, 20)]
+    # Terms which aren't words themselves are found anywhere.
+    assert TermMatcher(terms=["-"], whole_words=True).find(string="a-b") == [(1, 2)]
+
+
+def test__find_matches_brute_force() -> None:
+    rng = random.Random(0)
+
+    for _ in range(2000):
+
+        terms = [
+            "".join(rng.choices("abc", k=rng.randint(1, 4)))
+            for _ in range(rng.randint(1, 6))
+        ]
+        string = "".join(rng.choices("abc", k=rng.randint(0, 20)))
+
+        assert TermMatcher(terms=terms).find(string=string) == brute_force(
+            terms, string
+        )
@@ -0,0 +1,42 @@
+import os
+import pathlib
+
+from addon.src.watcher import FileWatcher
+
+
+def touch(path: pathlib.Path, contents: str, mtime_ns: int) -> None:
+    path.write_text(contents)
+    # Set the time explicitly as filesystems may not have a fine enough resolution.
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test__poll(tmp_path: pathlib.Path) -> None:
+    json = tmp_path / "markers.json"
+    css = tmp_path / "markers.css"
+
+    touch(path=json, contents="{}", mtime_ns=1_000_000_000)
+
+    watcher = FileWatcher(paths=[json, css])
+
+    assert watcher.poll() == []
+
+    # Same size, different modification time.
+    touch(path=json, contents="[]", mtime_ns=2_000_000_000)
+
+    assert watcher.poll() == [json]
+    assert watcher.poll() == []
+
+    # Same modification time, different size.
+    touch(path=json, contents="{ }", mtime_ns=2_000_000_000)
+
+    assert watcher.poll() == [json]
+
+    # Missing files are watched for being created and deleted.
+    touch(path=css, contents="", mtime_ns=1_000_000_000)
+
+    assert watcher.poll() == [css]
+
+    css.unlink()
+
+    assert watcher.poll() == [css]
+    assert watcher.poll() == []